@@ -1,5 +1,6 @@
 from .client import Client
+from .manager import DeviceManager
 
 __version__ = "0.3.0"
 
-__all__ = ["__version__", "Client"]
+__all__ = ["__version__", "Client", "DeviceManager"]
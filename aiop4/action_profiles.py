@@ -0,0 +1,275 @@
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Iterable, Mapping, Sequence
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .batching import BulkWriteResult
+from .builders import ActionBuilder
+from .encoding import Value
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Group:
+    """Members of an action profile group by member_id, with their weights."""
+
+    members: dict[int, int] = field(default_factory=dict)
+    max_size: int = 0
+
+
+class ActionProfileManager:
+    """ActionProfileManager.
+
+    This class is responsible for managing the members and groups of an action
+    profile of a Client. Changes are made to a local desired model, and commit
+    writes only the member and group updates that differ from what's installed
+    on the device, so adding or removing a member of a group is a single group
+    MODIFY and table entries referencing the group aren't rewritten.
+
+    Updates are written in dependency order: member inserts and modifies, group
+    inserts and modifies, group deletes and then member deletes. Only updates
+    that succeeded are recorded as installed, so a later commit retries the
+    others.
+    """
+
+    def __init__(self, client: "Client", action_profile: str) -> None:
+        """ActionProfileManager."""
+        self.client = client
+        info = client.elems_info.action_profiles[action_profile]
+        self.action_profile_id: int = info.preamble.id
+        self.max_group_size: int = info.max_group_size
+        self.members: dict[int, p4r_pb2.Action] = {}
+        self.groups: dict[int, Group] = {}
+
+        self._installed_members: dict[int, p4r_pb2.Action] = {}
+        self._installed_groups: dict[int, Group] = {}
+        self._action_builders: dict[str, ActionBuilder] = {}
+
+    def build_action(self, action: str, params: Sequence[Value] = ()) -> p4r_pb2.Action:
+        """Build an Action of a P4Info action."""
+        try:
+            builder = self._action_builders[action]
+        except KeyError:
+            builder = ActionBuilder(self.client.elems_info, action)
+            self._action_builders[action] = builder
+        return builder.build(params)
+
+    def set_member(
+        self, member_id: int, action: str, params: Sequence[Value] = ()
+    ) -> None:
+        """Set the action of a member."""
+        self.members[member_id] = self.build_action(action, params)
+
+    def member(self, action: str, params: Sequence[Value] = ()) -> int:
+        """Get the id of the member of an action, adding it if there's none."""
+        built = self.build_action(action, params)
+        for member_id, member_action in self.members.items():
+            if member_action == built:
+                return member_id
+        member_id = max(self.members, default=0) + 1
+        self.members[member_id] = built
+        return member_id
+
+    def delete_member(self, member_id: int) -> None:
+        """Delete a member, raising ValueError if a group references it."""
+        for group_id, group in self.groups.items():
+            if member_id in group.members:
+                raise ValueError(f"Member {member_id} is in group {group_id}")
+        del self.members[member_id]
+
+    def delete_unused_members(self) -> list[int]:
+        """Delete members that no group references, returning their ids."""
+        used = {
+            member_id for group in self.groups.values() for member_id in group.members
+        }
+        unused = [member_id for member_id in self.members if member_id not in used]
+        for member_id in unused:
+            del self.members[member_id]
+        return unused
+
+    def set_group(
+        self,
+        group_id: int,
+        members: Mapping[int, int] | Iterable[int],
+        *,
+        max_size=0,
+    ) -> None:
+        """Set the members of a group, as member ids or weights by member id."""
+        if not isinstance(members, Mapping):
+            members = {member_id: 1 for member_id in members}
+        self._check_members(members)
+        self.groups[group_id] = Group(dict(members), max_size or self.max_group_size)
+
+    def add_to_group(self, group_id: int, member_id: int, weight=1) -> None:
+        """Add a member to a group, creating the group if it doesn't exist."""
+        self._check_members((member_id,))
+        group = self.groups.setdefault(group_id, Group(max_size=self.max_group_size))
+        group.members[member_id] = weight
+
+    def remove_from_group(self, group_id: int, member_id: int) -> None:
+        """Remove a member from a group."""
+        self.groups[group_id].members.pop(member_id, None)
+
+    def delete_group(self, group_id: int) -> None:
+        """Delete a group."""
+        del self.groups[group_id]
+
+    def _check_members(self, member_ids: Iterable[int]) -> None:
+        for member_id in member_ids:
+            if member_id not in self.members:
+                raise ValueError(f"Member {member_id} doesn't exist")
+
+    def member_action(self, member_id: int) -> p4r_pb2.TableAction:
+        """TableAction of table entries pointing to a member."""
+        return p4r_pb2.TableAction(action_profile_member_id=member_id)
+
+    def group_action(self, group_id: int) -> p4r_pb2.TableAction:
+        """TableAction of table entries pointing to a group."""
+        return p4r_pb2.TableAction(action_profile_group_id=group_id)
+
+    def one_shot(
+        self, actions: Iterable[tuple[str, Sequence[Value], int]]
+    ) -> p4r_pb2.TableAction:
+        """TableAction of a one-shot action set of (action, params, weight)."""
+        table_action = p4r_pb2.TableAction()
+        action_set = table_action.action_profile_action_set
+        for action, params, weight in actions:
+            profile_action = action_set.action_profile_actions.add()
+            profile_action.action.CopyFrom(self.build_action(action, params))
+            profile_action.weight = weight
+        return table_action
+
+    def _member_entity(self, member_id: int, action: p4r_pb2.Action) -> p4r_pb2.Entity:
+        entity = p4r_pb2.Entity()
+        member = entity.action_profile_member
+        member.action_profile_id = self.action_profile_id
+        member.member_id = member_id
+        member.action.CopyFrom(action)
+        return entity
+
+    def _group_entity(self, group_id: int, group: Group) -> p4r_pb2.Entity:
+        entity = p4r_pb2.Entity()
+        group_entry = entity.action_profile_group
+        group_entry.action_profile_id = self.action_profile_id
+        group_entry.group_id = group_id
+        group_entry.max_size = group.max_size
+        for member_id, weight in group.members.items():
+            group_entry.members.add(member_id=member_id, weight=weight)
+        return entity
+
+    def pending(self) -> dict[str, list[tuple[int, int]]]:
+        """Pending (update type, id) of members and groups, by commit phase."""
+        Type = p4r_pb2.Update.Type
+        installed_members, installed_groups = (
+            self._installed_members,
+            self._installed_groups,
+        )
+        phases: dict[str, list[tuple[int, int]]] = {
+            "members": [],
+            "groups": [],
+            "group_deletes": [],
+            "member_deletes": [],
+        }
+        for member_id, action in self.members.items():
+            if member_id not in installed_members:
+                phases["members"].append((Type.INSERT, member_id))
+            elif installed_members[member_id] != action:
+                phases["members"].append((Type.MODIFY, member_id))
+        for group_id, group in self.groups.items():
+            if group_id not in installed_groups:
+                phases["groups"].append((Type.INSERT, group_id))
+            elif installed_groups[group_id] != group:
+                phases["groups"].append((Type.MODIFY, group_id))
+        for group_id in installed_groups.keys() - self.groups.keys():
+            phases["group_deletes"].append((Type.DELETE, group_id))
+        for member_id in installed_members.keys() - self.members.keys():
+            phases["member_deletes"].append((Type.DELETE, member_id))
+        return phases
+
+    async def commit(self) -> dict[str, BulkWriteResult]:
+        """Write the pending member and group updates."""
+        results = {}
+        for phase, updates in self.pending().items():
+            if not updates:
+                continue
+            is_member = phase.startswith("member")
+            installed = self._installed_members if is_member else self._installed_groups
+            desired = self.members if is_member else self.groups
+            entities = []
+            for _, _id in updates:
+                if is_member:
+                    action = desired.get(_id, installed.get(_id))
+                    entities.append(self._member_entity(_id, action))
+                else:
+                    group = desired.get(_id, installed.get(_id))
+                    entities.append(self._group_entity(_id, group))
+            result = BulkWriteResult()
+            for op_type in (
+                p4r_pb2.Update.Type.INSERT,
+                p4r_pb2.Update.Type.MODIFY,
+                p4r_pb2.Update.Type.DELETE,
+            ):
+                indexes = [
+                    i for i, (_type, _) in enumerate(updates) if _type == op_type
+                ]
+                if not indexes:
+                    continue
+                op_result = await self.client.write_bulk(
+                    [entities[i] for i in indexes], op_type
+                )
+                for offset, i in enumerate(indexes):
+                    _id = updates[i][1]
+                    if offset in op_result.errors:
+                        result.errors[i] = op_result.errors[offset]
+                    elif op_type == p4r_pb2.Update.Type.DELETE:
+                        installed.pop(_id, None)
+                    elif is_member:
+                        installed[_id] = desired[_id]
+                    else:
+                        group = desired[_id]
+                        installed[_id] = Group(dict(group.members), group.max_size)
+                result.total += op_result.total
+            if not result.ok:
+                log.warning(
+                    f"Failed {len(result.errors)} of {result.total} {phase} updates "
+                    f"of action profile {self.action_profile_id} "
+                    f"of {self.client.host_device}"
+                )
+            results[phase] = result
+        return results
+
+    async def sync(self) -> None:
+        """Replace the local model with the members and groups of the device."""
+        self.members.clear()
+        self.groups.clear()
+        async for entity in self.client.read_entities(
+            p4r_pb2.Entity(
+                action_profile_member=p4r_pb2.ActionProfileMember(
+                    action_profile_id=self.action_profile_id
+                )
+            ),
+            p4r_pb2.Entity(
+                action_profile_group=p4r_pb2.ActionProfileGroup(
+                    action_profile_id=self.action_profile_id
+                )
+            ),
+        ):
+            if entity.WhichOneof("entity") == "action_profile_member":
+                member = entity.action_profile_member
+                self.members[member.member_id] = member.action
+            else:
+                group = entity.action_profile_group
+                self.groups[group.group_id] = Group(
+                    {member.member_id: member.weight for member in group.members},
+                    group.max_size,
+                )
+        self._installed_members = dict(self.members)
+        self._installed_groups = {
+            group_id: Group(dict(group.members), group.max_size)
+            for group_id, group in self.groups.items()
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import inspect
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.rpc import code_pb2
+
+from .batching import BulkWriteResult
+from .shadow import table_entry_key
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+AgingHandler = Callable[[list[p4r_pb2.TableEntry]], Optional[Awaitable[Any]]]
+
+
+class AgingEngine:
+    """AgingEngine.
+
+    This class is responsible for consuming the idle_timeout_notification queue
+    of a Client: expired table entries are deduplicated and batched for up to
+    ``batch_delay`` seconds or ``batch_size`` entries, each batch is passed to
+    the handler if there's one, and then deleted from the device with bulk
+    Write RPCs if ``delete`` is set.
+
+    Deletes are rate limited to ``max_deletes_per_sec`` on average, 0 meaning
+    unlimited. Entries that are already gone (NOT_FOUND) count as deleted.
+    """
+
+    def __init__(
+        self,
+        client: "Client",
+        *,
+        handler: Optional[AgingHandler] = None,
+        delete=True,
+        batch_size=1000,
+        batch_delay=0.05,
+        max_deletes_per_sec=0.0,
+    ) -> None:
+        """AgingEngine."""
+        self.client = client
+        self.handler = handler
+        self.delete = delete
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_deletes_per_sec = max_deletes_per_sec
+
+        self.expired = 0
+        self.deleted = 0
+        self.failed = 0
+
+        self._pending: dict[tuple[int, bytes], p4r_pb2.TableEntry] = {}
+        self._delete_at = 0.0
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def add(self, notification: p4r_pb2.IdleTimeoutNotification) -> int:
+        """Add the expired entries of a notification, returning how many are new."""
+        added = 0
+        for table_entry in notification.table_entry:
+            key = table_entry_key(table_entry)
+            if key not in self._pending:
+                expired = p4r_pb2.TableEntry()
+                expired.table_id = table_entry.table_id
+                expired.match.extend(table_entry.match)
+                expired.priority = table_entry.priority
+                self._pending[key] = expired
+                added += 1
+        self.expired += added
+        return added
+
+    async def flush(self) -> Optional[BulkWriteResult]:
+        """Handle and delete the pending expired entries.
+
+        If the handler or the bulk delete raises, the entries are put back to be
+        retried on the next flush.
+        """
+        if not self._pending:
+            return None
+        pending, self._pending = self._pending, {}
+        try:
+            return await self._flush(list(pending.values()))
+        except BaseException:
+            self._pending = {**pending, **self._pending}
+            raise
+
+    async def _flush(
+        self, entries: list[p4r_pb2.TableEntry]
+    ) -> Optional[BulkWriteResult]:
+        if self.handler:
+            result = self.handler(entries)
+            if inspect.isawaitable(result):
+                await result
+        if not self.delete:
+            return None
+        await self._rate_limit(len(entries))
+        result = await self.client.write_bulk(
+            (p4r_pb2.Entity(table_entry=entry) for entry in entries),
+            p4r_pb2.Update.Type.DELETE,
+            max_updates=self.batch_size,
+        )
+        failed = sum(
+            1
+            for error in result.errors.values()
+            if error.canonical_code != code_pb2.NOT_FOUND
+        )
+        self.failed += failed
+        self.deleted += result.total - failed
+        if failed:
+            log.warning(
+                f"Failed to delete {failed} of {result.total} expired entries "
+                f"of {self.client.host_device}"
+            )
+        return result
+
+    async def _rate_limit(self, num_deletes: int) -> None:
+        if not self.max_deletes_per_sec:
+            return
+        now = time.monotonic()
+        if self._delete_at > now:
+            await asyncio.sleep(self._delete_at - now)
+        self._delete_at = max(now, self._delete_at) + (
+            num_deletes / self.max_deletes_per_sec
+        )
+
+    async def consume(self) -> None:
+        """Consume the idle_timeout_notification queue of the client forever."""
+        queue = self.client.queues["idle_timeout_notification"]
+        loop = asyncio.get_running_loop()
+        while True:
+            msg = await queue.get()
+            self.add(msg.idle_timeout_notification)
+            deadline = loop.time() + self.batch_delay
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    msg = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                self.add(msg.idle_timeout_notification)
+            try:
+                await self.flush()
+            except Exception as exc:
+                log.exception(
+                    f"Failed to age entries of {self.client.host_device}: {exc}"
+                )
+
+    def start(self) -> asyncio.Task:
+        """Start consuming the idle_timeout_notification queue of the client."""
+        if not self._consumer_task or self._consumer_task.done():
+            self._consumer_task = asyncio.create_task(self.consume())
+        return self._consumer_task
+
+    async def stop(self) -> None:
+        """Stop consuming and flush pending expired entries."""
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+        await self.flush()
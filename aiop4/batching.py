@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterable, AsyncIterator, Iterable, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.rpc import code_pb2
+from grpc.aio import AioRpcError
+
+from .exceptions import WriteException
+from .utils import decode_write_errors
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+
+class WriteBatcher:
+    """WriteBatcher.
+
+    This class is responsible for coalescing concurrent entity writes of a
+    Client into a single WriteRequest. A batch is sent as soon as it reaches
+    ``max_updates`` or ``max_bytes``, or ``max_delay`` seconds after its first
+    update was submitted, whichever happens first.
+
+    The updates of a single submit call are never split across WriteRequests,
+    and only CONTINUE_ON_ERROR writes are coalesced, other atomicity modes are
+    sent on their own so a failure can't roll back another caller's updates.
+    """
+
+    def __init__(
+        self,
+        client: "Client",
+        max_updates=1000,
+        max_bytes=1024 * 1024,
+        max_delay=0.001,
+    ) -> None:
+        """WriteBatcher."""
+        self.client = client
+        self.max_updates = max_updates
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+
+        self._pending: list[tuple[list[p4r_pb2.Update], asyncio.Future]] = []
+        self._pending_updates = 0
+        self._pending_bytes = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        updates: list[p4r_pb2.Update],
+        atomicity=p4r_pb2.WriteRequest.Atomicity.CONTINUE_ON_ERROR,
+    ) -> p4r_pb2.WriteResponse:
+        """Submit updates and wait for the WriteRequest they're sent in.
+
+        Raises WriteException with this call's own errors if any of its
+        updates failed.
+        """
+        if atomicity != p4r_pb2.WriteRequest.Atomicity.CONTINUE_ON_ERROR:
+            return await self.client._write_request(*updates, atomicity=atomicity)
+
+        size = sum(update.ByteSize() for update in updates)
+        if self._pending and (
+            self._pending_updates + len(updates) > self.max_updates
+            or self._pending_bytes + size > self.max_bytes
+        ):
+            self._flush()
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((updates, future))
+        self._pending_updates += len(updates)
+        self._pending_bytes += size
+
+        if (
+            self._pending_updates >= self.max_updates
+            or self._pending_bytes >= self.max_bytes
+        ):
+            self._flush()
+        elif not self._timer:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._flush
+            )
+        return await future
+
+    async def flush(self) -> None:
+        """Send any pending updates and wait for all in-flight WriteRequests."""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = []
+        self._pending_updates = 0
+        self._pending_bytes = 0
+        task = asyncio.create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[list[p4r_pb2.Update], asyncio.Future]]):
+        updates = [update for updates, _ in batch for update in updates]
+        try:
+            response = await self.client._write_request(*updates)
+        except AioRpcError as exc:
+            self._resolve_errors(batch, exc, decode_write_errors(exc))
+            return
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for _, future in batch:
+            if not future.done():
+                future.set_result(response)
+
+    @staticmethod
+    def _resolve_errors(
+        batch: list[tuple[list[p4r_pb2.Update], asyncio.Future]],
+        exc: AioRpcError,
+        errors: list[p4r_pb2.Error],
+    ) -> None:
+        """Resolve each future with its own slice of the per-update errors."""
+        if len(errors) != sum(len(updates) for updates, _ in batch):
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        offset = 0
+        for updates, future in batch:
+            end = offset + len(updates)
+            own_errors, offset = errors[offset:end], end
+            if future.done():
+                continue
+            if any(err.canonical_code != code_pb2.OK for err in own_errors):
+                future.set_exception(
+                    WriteException(
+                        f"WriteRequest failed: {exc.details()}", own_errors, exc
+                    )
+                )
+            else:
+                future.set_result(p4r_pb2.WriteResponse())
+
+
+@dataclass
+class BulkWriteResult:
+    """BulkWriteResult.
+
+    Result of a bulk write. ``errors`` maps the position of each failed update,
+    in the order the entities were given, to its p4.v1.Error.
+    """
+
+    total: int = 0
+    errors: dict[int, p4r_pb2.Error] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """Check if every update succeeded."""
+        return not self.errors
+
+    def add_rpc_error(self, offset: int, num_updates: int, exc: AioRpcError) -> None:
+        """Map a failed Write RPC of num_updates updates starting at offset."""
+        errors = decode_write_errors(exc)
+        if len(errors) != num_updates:
+            error = p4r_pb2.Error(
+                canonical_code=exc.code().value[0], message=str(exc.details())
+            )
+            errors = [error] * num_updates
+        for i, error in enumerate(errors, offset):
+            if error.canonical_code != code_pb2.OK:
+                self.errors[i] = error
+
+
+async def iter_update_chunks(
+    entities: Iterable[p4r_pb2.Entity] | AsyncIterable[p4r_pb2.Entity],
+    op_type: int,
+    max_updates=1000,
+    max_bytes=1024 * 1024,
+) -> AsyncIterator[list[p4r_pb2.Update]]:
+    """Chunk entities into lists of updates bounded by max_updates and max_bytes."""
+    chunk: list[p4r_pb2.Update] = []
+    chunk_bytes = 0
+
+    async def aiter_entities() -> AsyncIterator[p4r_pb2.Entity]:
+        if isinstance(entities, AsyncIterable):
+            async for entity in entities:
+                yield entity
+        else:
+            for entity in entities:
+                yield entity
+
+    async for entity in aiter_entities():
+        update = p4r_pb2.Update(type=op_type, entity=entity)
+        size = update.ByteSize()
+        if chunk and (len(chunk) >= max_updates or chunk_bytes + size > max_bytes):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(update)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
@@ -0,0 +1,171 @@
+from typing import Optional, Sequence
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from p4.config.v1.p4info_pb2 import MatchField
+
+from .elems_info import ElementsP4Info
+from .encoding import Value, encode, to_int, to_uint
+
+_MASKED_MATCH_TYPES = (MatchField.MatchType.LPM, MatchField.MatchType.TERNARY)
+
+
+class ActionBuilder:
+    """ActionBuilder.
+
+    This class is responsible for building actions of a P4Info action, with
+    the action and param ids and bitwidths resolved once. Params are given in
+    the order of the action params.
+    """
+
+    def __init__(self, elems_info: ElementsP4Info, action: str) -> None:
+        """ActionBuilder."""
+        action_info = elems_info.actions[action]
+        self.action_id: int = action_info.preamble.id
+        self.params: list[tuple[int, int]] = [
+            (param.id, param.bitwidth) for param in action_info.params
+        ]
+
+    def build(self, params: Sequence[Value] = ()) -> p4r_pb2.Action:
+        """Build an Action."""
+        action = p4r_pb2.Action()
+        self.set(action, params)
+        return action
+
+    def set(self, action: p4r_pb2.Action, params: Sequence[Value] = ()) -> None:
+        """Set the action id and params of an Action.
+
+        Raises ValueError if there isn't a value per action param.
+        """
+        if len(params) != len(self.params):
+            raise ValueError(
+                f"Expected {len(self.params)} action params, got {len(params)}"
+            )
+        action.action_id = self.action_id
+        for (param_id, bitwidth), value in zip(self.params, params):
+            param = action.params.add()
+            param.param_id = param_id
+            param.value = encode(value, bitwidth)
+
+
+class TableEntryBuilder:
+    """TableEntryBuilder.
+
+    This class is responsible for building table entries of a (table, action)
+    pair. Table, match field, action and param ids, match kinds and bitwidths
+    are resolved once, so build only sets values on freshly allocated messages.
+
+    Match values are given in the order of the table match fields:
+
+    - EXACT and OPTIONAL: value
+    - LPM: (value, prefix_len)
+    - TERNARY: (value, mask)
+    - RANGE: (low, high)
+
+    Values can be anything aiop4.encoding.encode accepts, they're encoded as
+    canonical bytestrings of the match field or param bitwidth. LPM and
+    TERNARY values are masked as P4Runtime requires. A None TERNARY, OPTIONAL,
+    LPM or RANGE value, an LPM prefix_len of 0 and a TERNARY mask of 0 are
+    don't care matches, so they're omitted. EXACT matches can't be None.
+
+    Tables with an action profile take a table_action instead, such as the
+    member or group actions of an ActionProfileManager, so action can be None.
+    """
+
+    def __init__(
+        self,
+        elems_info: ElementsP4Info,
+        table: str,
+        action: Optional[str],
+        match_fields: Optional[Sequence[str]] = None,
+    ) -> None:
+        """TableEntryBuilder."""
+        table_info = elems_info.tables[table]
+        self.table_id: int = table_info.preamble.id
+        self.action = ActionBuilder(elems_info, action) if action else None
+
+        match_fields = (
+            match_fields
+            if match_fields is not None
+            else [match_field.name for match_field in table_info.match_fields]
+        )
+        self.match_fields: list[tuple[int, int, int]] = []
+        for name in match_fields:
+            match_field = elems_info.table_match_fields[
+                (table_info.preamble.name, name)
+            ]
+            self.match_fields.append(
+                (match_field.id, match_field.match_type, match_field.bitwidth)
+            )
+
+    def build(
+        self,
+        match_values: Sequence = (),
+        action_params: Sequence[Value] = (),
+        *,
+        priority=0,
+        idle_timeout_ns=0,
+        table_action: Optional[p4r_pb2.TableAction] = None,
+    ) -> p4r_pb2.Entity:
+        """Build a table entry Entity.
+
+        If match_values is empty, the default entry of the table is built,
+        otherwise it must have a value per match field, raising ValueError
+        if it doesn't. If table_action is set, it's used instead of the
+        builder action.
+        """
+        if match_values and len(match_values) != len(self.match_fields):
+            raise ValueError(
+                f"Expected {len(self.match_fields)} match values, "
+                f"got {len(match_values)}"
+            )
+        entity = p4r_pb2.Entity()
+        table_entry = entity.table_entry
+        table_entry.table_id = self.table_id
+
+        for (field_id, match_type, bitwidth), value in zip(
+            self.match_fields, match_values
+        ):
+            if value is None:
+                if match_type == MatchField.MatchType.EXACT:
+                    raise ValueError(f"Match field {field_id} is EXACT, not optional")
+                continue
+            if match_type in _MASKED_MATCH_TYPES and not to_int(value[1]):
+                continue
+            field_match = table_entry.match.add()
+            field_match.field_id = field_id
+            match match_type:
+                case MatchField.MatchType.EXACT:
+                    field_match.exact.value = encode(value, bitwidth)
+                case MatchField.MatchType.LPM:
+                    prefix_len = value[1]
+                    mask = ((1 << prefix_len) - 1) << (bitwidth - prefix_len)
+                    field_match.lpm.value = encode(
+                        to_uint(value[0], bitwidth) & mask, bitwidth
+                    )
+                    field_match.lpm.prefix_len = prefix_len
+                case MatchField.MatchType.TERNARY:
+                    mask = to_uint(value[1], bitwidth)
+                    field_match.ternary.value = encode(
+                        to_uint(value[0], bitwidth) & mask, bitwidth
+                    )
+                    field_match.ternary.mask = encode(mask, bitwidth)
+                case MatchField.MatchType.RANGE:
+                    field_match.range.low = encode(value[0], bitwidth)
+                    field_match.range.high = encode(value[1], bitwidth)
+                case MatchField.MatchType.OPTIONAL:
+                    field_match.optional.value = encode(value, bitwidth)
+                case _:
+                    raise ValueError(f"Unsupported match type {match_type}")
+
+        if table_action is not None:
+            table_entry.action.CopyFrom(table_action)
+        elif self.action:
+            self.action.set(table_entry.action.action, action_params)
+
+        if priority:
+            table_entry.priority = priority
+        if idle_timeout_ns:
+            table_entry.idle_timeout_ns = idle_timeout_ns
+        if not match_values:
+            table_entry.is_default_action = True
+        return entity
@@ -1,17 +1,53 @@
 import asyncio
+import contextvars
+import inspect
 import logging
-from typing import Iterable, Optional
+import time
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    Optional,
+)
 
 import grpc
 import p4.v1.p4runtime_pb2 as p4r_pb2
 import p4.v1.p4runtime_pb2_grpc as p4r_grpc
+from google.protobuf.message import Message
+from google.rpc import code_pb2
 from grpc.aio import AioRpcError
 from p4.config.v1 import p4info_pb2
 
-from aiop4.utils import read_bytes_config, read_p4info_txt
+from aiop4.utils import (
+    decode_write_errors,
+    pipeline_cookie,
+    read_bytes_config,
+    read_p4info,
+)
 
+from .batching import BulkWriteResult, WriteBatcher, iter_update_chunks
+from .builders import TableEntryBuilder
+from .device_config import (
+    DeviceConfig,
+    load_device_config,
+    new_pipeline_config,
+    serialize_pipeline_request,
+)
 from .elems_info import ElementsP4Info
-from .exceptions import BecomePrimaryException
+from .encoding import Value
+from .exceptions import BecomePrimaryException, NotPrimaryException, WriteException
+from .metrics import Metrics
+from .packet_io import PacketIn, PacketInDecoder, PacketOutEncoder
+from .queues import STREAM_UPDATE_TYPES, OverflowPolicy, StreamQueue
+from .reconnect import OutagePolicy, ReconnectPolicy
+from .registers import RegisterCells, cell_entities, decode_cells, register_type
+from .scheduler import WritePriority, WriteScheduler
+from .shadow import ShadowStore
+from .tracing import LazyPayload, TraceHook
 
 log = logging.getLogger(__name__)
 
@@ -23,6 +59,13 @@ match_type = (
     | p4r_pb2.FieldMatch.Optional
 )
 
+_restoring_state: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "restoring_state", default=False
+)
+"""Whether writes are restoring the state of a Client that reconnected."""
+
+StreamHandler = Callable[[p4r_pb2.StreamMessageResponse], Optional[Awaitable[Any]]]
+
 
 class Client:
     """asyncio P4Runtime Client."""
@@ -32,6 +75,8 @@ class Client:
         host="localhost:9559",
         device_id=0,
         election_id=p4r_pb2.Uint128(high=1, low=0),
+        *,
+        channel_options: Optional[list[tuple[str, Any]]] = None,
     ) -> None:
         """asyncio P4Runtime Client."""
         self.host = host
@@ -40,13 +85,31 @@ class Client:
         self.p4info: p4info_pb2.P4Info = None
         self.elems_info: ElementsP4Info = None
 
-        self.queue: asyncio.Queue = asyncio.Queue()
+        self.queues: dict[str, StreamQueue] = {
+            update_type: StreamQueue() for update_type in STREAM_UPDATE_TYPES
+        }
+        self._stream_handlers: dict[str, StreamHandler] = {}
 
         self._stream_channel: grpc.StreamStreamMultiCallable = None
-        self._channel = grpc.aio.insecure_channel(self.host)
+        self._channel = grpc.aio.insecure_channel(self.host, options=channel_options)
         self._stub = p4r_grpc.P4RuntimeStub(self._channel)
         self._is_primary = asyncio.Event()
         self._stream_control_task: asyncio.Task = None
+        self.write_batcher: Optional[WriteBatcher] = None
+        self.write_scheduler: Optional[WriteScheduler] = None
+        self.shadow: Optional[ShadowStore] = None
+        self._table_entry_builders: dict[tuple[str, str], TableEntryBuilder] = {}
+        self._packet_out_encoder: Optional[PacketOutEncoder] = None
+        self._packet_in_decoder: Optional[PacketInDecoder] = None
+        self._stream_lock = asyncio.Lock()
+        self._digest_configs: dict[int, p4r_pb2.DigestEntry.Config] = {}
+        self.reconnect_policy: Optional[ReconnectPolicy] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.metrics: Optional[Metrics] = None
+        self.trace_hook: Optional[TraceHook] = None
+        self._set_fwd_pipeline_serialized: Optional[
+            grpc.aio.UnaryUnaryMultiCallable
+        ] = None
 
     @property
     def host_device(self) -> str:
@@ -77,15 +140,99 @@ class Client:
             self._stream_channel = None
             raise
 
+    def enable_write_batching(
+        self, *, max_updates=1000, max_bytes=1024 * 1024, max_delay=0.001
+    ) -> WriteBatcher:
+        """Coalesce concurrent insert/modify/delete_entity calls.
+
+        Concurrent calls are sent in a single WriteRequest within the given
+        window, see WriteBatcher.
+        """
+        self.write_batcher = WriteBatcher(
+            self, max_updates=max_updates, max_bytes=max_bytes, max_delay=max_delay
+        )
+        return self.write_batcher
+
+    async def disable_write_batching(self) -> None:
+        """Flush pending batched writes and stop coalescing writes."""
+        if self.write_batcher:
+            write_batcher, self.write_batcher = self.write_batcher, None
+            await write_batcher.flush()
+
+    def enable_write_scheduler(
+        self,
+        concurrency=4,
+        *,
+        weights: Optional[dict[WritePriority, float]] = None,
+        max_updates_per_sec: Optional[dict[WritePriority, float]] = None,
+    ) -> WriteScheduler:
+        """Schedule WriteRequests by priority class, see WriteScheduler."""
+        self.write_scheduler = WriteScheduler(
+            concurrency, weights=weights, max_updates_per_sec=max_updates_per_sec
+        )
+        return self.write_scheduler
+
+    def disable_write_scheduler(self) -> None:
+        """Stop scheduling WriteRequests, in-flight ones aren't affected."""
+        self.write_scheduler = None
+
+    def enable_metrics(self) -> Metrics:
+        """Enable recording metrics of this client."""
+        if not self.metrics:
+            self.metrics = Metrics(self.queues)
+        return self.metrics
+
+    def disable_metrics(self) -> None:
+        """Disable recording metrics of this client."""
+        self.metrics = None
+
+    def set_trace_hook(self, hook: Optional[TraceHook]) -> None:
+        """Set a hook called with (host_device, event, message) of each message.
+
+        Events are the RPC name of sent requests, "StreamChannel.send" and
+        "StreamChannel.recv". The hook runs inline, so it should be cheap.
+        """
+        self.trace_hook = hook
+
+    def enable_shadow_store(self) -> ShadowStore:
+        """Keep a local ShadowStore of the table entries successfully written."""
+        if self.shadow is None:
+            self.shadow = ShadowStore()
+        return self.shadow
+
+    async def close(self) -> None:
+        """Stop stream_control and close the gRPC channel."""
+        self.reconnect_policy = None
+        for task in (self._stream_control_task, self._reconnect_task):
+            if task:
+                task.cancel()
+        self._is_primary.clear()
+        await self._channel.close()
+
     async def get_capabilities(self) -> str:
         """GetCapabilities. Get P4Runtime API version implemented by the server."""
         return await self._stub.Capabilities(p4r_pb2.CapabilitiesRequest())
 
-    async def get_fwd_pipeline(self) -> p4r_pb2.GetForwardingPipelineConfigResponse:
+    async def get_fwd_pipeline(
+        self,
+        response_type=p4r_pb2.GetForwardingPipelineConfigRequest.ResponseType.ALL,
+    ) -> p4r_pb2.GetForwardingPipelineConfigResponse:
         """GetForwardingPipelineConfig."""
-        return await self._stub.GetForwardingPipelineConfig(
-            p4r_pb2.GetForwardingPipelineConfigRequest(device_id=self.device_id)
+        req = p4r_pb2.GetForwardingPipelineConfigRequest(
+            device_id=self.device_id, response_type=response_type
         )
+        if self.trace_hook:
+            self.trace_hook(self.host_device, "GetForwardingPipelineConfig", req)
+        if not self.metrics:
+            return await self._stub.GetForwardingPipelineConfig(req)
+        started = time.perf_counter()
+        try:
+            response = await self._stub.GetForwardingPipelineConfig(req)
+        except AioRpcError:
+            self._observe_rpc("GetForwardingPipelineConfig", started, error=True)
+            raise
+        self._observe_rpc("GetForwardingPipelineConfig", started)
+        return response
 
     async def try_to_become_primary(self):
         """Try to become primary."""
@@ -94,17 +241,25 @@ class Client:
                 device_id=self.device_id, election_id=self.election_id
             )
         )
-        try:
-            await self.stream_channel.write(req)
-        except AioRpcError as exc:
-            log.error(f"{str(exc)} payload {req.__class__.__name__}: {req}")
-            raise
+        started = time.perf_counter()
+        await self._stream_write(req)
 
         response = await self.stream_channel.read()
+        if self.metrics:
+            self._observe_rpc("arbitration", started, error=response == grpc.aio.EOF)
+        if response == grpc.aio.EOF:
+            raise BecomePrimaryException(f"Stream closed by {self.host_device}")
+        if self.trace_hook:
+            self.trace_hook(self.host_device, "StreamChannel.recv", response)
         which_update = response.WhichOneof("update")
-        log.debug(f"Got message {which_update} from {self.host_device} {response}")
+        log.debug(
+            "Got message %s from %s %s",
+            which_update,
+            self.host_device,
+            LazyPayload(response),
+        )
         if which_update == "arbitration":
-            self._is_primary.set()
+            self._update_primary(response.arbitration)
         else:
             raise BecomePrimaryException(f"Unexpected update type {response}")
 
@@ -117,63 +272,455 @@ class Client:
             response = await self.stream_channel.read()
             while response != grpc.aio.EOF:
                 which_update = response.WhichOneof("update")
-                log.debug(
-                    f"Got message {which_update} from device {self.device_id} "
-                    f"{self.host} {response}"
-                )
+                if self.metrics:
+                    self.metrics.stream_messages[which_update] += 1
+                if self.trace_hook:
+                    self.trace_hook(self.host_device, "StreamChannel.recv", response)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(
+                        "Got message %s from %s %s",
+                        which_update,
+                        self.host_device,
+                        LazyPayload(response),
+                    )
                 match which_update:
-                    case "digest":
-                        await self.queue.put(response)
                     case "arbitration":
-                        # TODO put on another internal queue
-                        pass
-                    case "packet":
-                        await self.queue.put(response)
-                    case "idle_timeout_notification":
-                        # TODO put on another internal queue
-                        pass
+                        self._update_primary(response.arbitration)
+                        await self._dispatch(which_update, response)
                     case "error":
-                        log.error(f"Got StreamError {response}")
-                        await self.queue.put(response)
-                    case "other":
-                        pass
+                        log.error("Got StreamError %s", LazyPayload(response))
+                        await self._dispatch(which_update, response)
+                    case update if update in self.queues:
+                        await self._dispatch(which_update, response)
                     case _:
-                        log.warning(f"Got unsupported update type {response}")
+                        log.warning(
+                            "Got unsupported update type %s", LazyPayload(response)
+                        )
                 response = await self.stream_channel.read()
 
         except AioRpcError as e:
             log.warning(f"AioRpcError {str(e)} {e.code()}")
+        self._on_stream_lost()
+
+    def _update_primary(self, arbitration: p4r_pb2.MasterArbitrationUpdate) -> None:
+        """Update the primary state from a MasterArbitrationUpdate status."""
+        if arbitration.status.code == code_pb2.OK:
+            self._is_primary.set()
+        else:
+            log.warning(f"{self.host_device} isn't primary: {arbitration.status}")
+            self._is_primary.clear()
+
+    def _on_stream_lost(self) -> None:
+        """Mark the client as non primary and reconnect if enabled."""
+        log.warning(f"Stream channel of {self.host_device} is closed")
+        self._is_primary.clear()
+        if self.reconnect_policy and not self._reconnecting:
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    @property
+    def _reconnecting(self) -> bool:
+        return bool(self._reconnect_task and not self._reconnect_task.done())
+
+    async def _close_stream(self) -> None:
+        """Stop the stream_control task and cancel the stream channel call."""
+        task = self._stream_control_task
+        self._stream_control_task = None
+        if task and task is not asyncio.current_task() and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
+        if self._stream_channel:
+            self._stream_channel.cancel()
+            self._stream_channel = None
+
+    @property
+    def _stream_alive(self) -> bool:
+        task = self._stream_control_task
+        return bool(task and not task.done())
+
+    async def _reconnect(self) -> None:
+        """Reconnect the stream channel with backoff and restore state.
+
+        Once the client is primary again its stream is kept, and restoring
+        state is retried on it with the same backoff, unless the stream is
+        lost again. Errors that aren't transient, see ReconnectPolicy, and
+        becoming a backup stop reconnecting.
+        """
+        policy = self.reconnect_policy
+        arbitrated = False
+        for attempt, delay in enumerate(policy.delays(), 1):
+            await asyncio.sleep(delay)
+            if not arbitrated:
+                log.info(f"Reconnecting to {self.host_device}, attempt {attempt}")
+                await self._close_stream()
+                try:
+                    await asyncio.wait_for(
+                        self.try_to_become_primary(), policy.arbitration_timeout
+                    )
+                except (BecomePrimaryException, asyncio.TimeoutError) as exc:
+                    log.warning(f"Failed to reconnect to {self.host_device}: {exc!r}")
+                    continue
+                except AioRpcError as exc:
+                    if not policy.is_transient(exc):
+                        log.error(f"Stopped reconnecting {self.host_device}: {exc!r}")
+                        return
+                    log.warning(f"Failed to reconnect to {self.host_device}: {exc!r}")
+                    continue
+                if not self._is_primary.is_set():
+                    log.warning(f"Stopped reconnecting {self.host_device}, a backup")
+                    return
+                arbitrated = True
+            else:
+                log.info(f"Restoring state of {self.host_device}, attempt {attempt}")
+
+            started = time.perf_counter()
+            try:
+                await self._restore_state()
+            except AioRpcError as exc:
+                self._observe_rpc("restore_state", started, error=True)
+                if not policy.is_transient(exc):
+                    log.error(f"Failed to restore state of {self.host_device}: {exc!r}")
+                    return
+                log.warning(f"Failed to restore state of {self.host_device}: {exc!r}")
+            else:
+                self._observe_rpc("restore_state", started)
+                log.info(f"Reconnected to {self.host_device}")
+                return
+            if not self._stream_alive:
+                arbitrated = False
+            elif not self._is_primary.is_set():
+                log.warning(f"Stopped reconnecting {self.host_device}, a backup")
+                return
+        log.error(f"Giving up reconnecting to {self.host_device}")
+
+    async def _restore_state(self) -> None:
+        """Re-enable digests and optionally replay the shadow store.
+
+        Its writes don't wait for the outage to end, since they're part of
+        the reconnection, if the client is no longer primary they fail.
+        """
+        token = _restoring_state.set(True)
+        try:
+            for digest_id, config in self._digest_configs.items():
+                try:
+                    await self._write_digest_entry(
+                        digest_id, config, p4r_pb2.Update.Type.MODIFY
+                    )
+                except AioRpcError:
+                    await self._write_digest_entry(
+                        digest_id, config, p4r_pb2.Update.Type.INSERT
+                    )
+            if self.reconnect_policy.replay_state and self.shadow is not None:
+                await self.reconcile_shadow()
+        finally:
+            _restoring_state.reset(token)
+
+    def enable_reconnect(
+        self, policy: Optional[ReconnectPolicy] = None
+    ) -> ReconnectPolicy:
+        """Reconnect and become primary again whenever the stream is lost.
+
+        Digests enabled with enable_digest are re-enabled, see ReconnectPolicy.
+        """
+        self.reconnect_policy = policy if policy else ReconnectPolicy()
+        return self.reconnect_policy
+
+    async def _wait_outage(self) -> None:
+        """Wait for a reconnection or raise NotPrimaryException."""
+        if self.reconnect_policy.outage_policy == OutagePolicy.REJECT:
+            raise NotPrimaryException(f"{self.host_device} is reconnecting")
+        try:
+            await asyncio.wait_for(
+                self._is_primary.wait(), self.reconnect_policy.buffer_timeout
+            )
+        except asyncio.TimeoutError:
+            raise NotPrimaryException(f"{self.host_device} is reconnecting")
+
+    def configure_queue(
+        self, update_type: str, maxsize=0, policy=OverflowPolicy.BLOCK
+    ) -> StreamQueue:
+        """Replace the queue of a stream update type with a (bounded) one.
+
+        A full queue applies its OverflowPolicy, BLOCK stops reading the stream
+        until there's a free slot, DROP_OLDEST and DROP_NEWEST count drops.
+        """
+        if update_type not in self.queues:
+            raise ValueError(f"Unsupported update type {update_type}")
+        self.queues[update_type] = StreamQueue(maxsize, policy)
+        return self.queues[update_type]
+
+    def register_handler(self, update_type: str, handler: StreamHandler) -> None:
+        """Register a handler of a stream update type instead of its queue.
+
+        The handler is called with each StreamMessageResponse in the stream
+        read loop, and awaited if it returns an awaitable, so it should be quick.
+        """
+        if update_type not in self.queues:
+            raise ValueError(f"Unsupported update type {update_type}")
+        self._stream_handlers[update_type] = handler
+
+    def unregister_handler(self, update_type: str) -> None:
+        """Unregister the handler of a stream update type."""
+        self._stream_handlers.pop(update_type, None)
+
+    async def _dispatch(
+        self, update_type: str, response: p4r_pb2.StreamMessageResponse
+    ) -> None:
+        """Dispatch a stream message to its handler or queue."""
+        handler = self._stream_handlers.get(update_type)
+        if not handler:
+            return await self.queues[update_type].put(response)
+        result = handler(response)
+        if inspect.isawaitable(result):
+            await result
 
     async def _write_request(
         self,
         *updates: Iterable[p4r_pb2.Update],
         atomicity=p4r_pb2.WriteRequest.Atomicity.CONTINUE_ON_ERROR,
+        priority=WritePriority.NORMAL,
     ) -> None:
-        """_write_request."""
+        """_write_request.
+
+        If the write scheduler is enabled, the WriteRequest waits for a slot of
+        its priority class before it's sent.
+        """
+        if (
+            self._reconnecting
+            and not self._is_primary.is_set()
+            and not _restoring_state.get()
+        ):
+            await self._wait_outage()
         req = p4r_pb2.WriteRequest(
             device_id=self.device_id,
             election_id=self.election_id,
             updates=updates,
             atomicity=atomicity,
         )
+        if self.write_scheduler:
+            async with self.write_scheduler.slot(priority, len(updates)):
+                return await self._write(req)
+        return await self._write(req)
+
+    async def _write(self, req: p4r_pb2.WriteRequest) -> p4r_pb2.WriteResponse:
+        """Send a WriteRequest recording its metrics."""
+        metrics = self.metrics
+        if metrics:
+            started = time.perf_counter()
+            metrics.updates_per_write.observe(len(req.updates))
+        if self.trace_hook:
+            self.trace_hook(self.host_device, "Write", req)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "Sending WriteRequest to %s %s", self.host_device, LazyPayload(req)
+            )
+        try:
+            response = await self._stub.Write(req)
+        except AioRpcError as exc:
+            if metrics:
+                self._observe_rpc("Write", started, req, error=True)
+            log.error("%s payload WriteRequest %s", exc, LazyPayload(req))
+            raise
+        if metrics:
+            self._observe_rpc("Write", started, req)
+        return response
+
+    def _observe_rpc(
+        self,
+        rpc: str,
+        started: float,
+        req: Optional[Message] = None,
+        *,
+        error=False,
+        bytes_sent: Optional[int] = None,
+    ) -> None:
+        """Record the latency of an RPC that started at a perf_counter time."""
+        if self.metrics:
+            if bytes_sent is None:
+                bytes_sent = req.ByteSize() if req is not None else 0
+            self.metrics.observe_rpc(
+                rpc, time.perf_counter() - started, error=error, bytes_sent=bytes_sent
+            )
+
+    async def read_entities(
+        self, *entities: p4r_pb2.Entity
+    ) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read entities.
+
+        Entities are yielded as each ReadResponse arrives from the server
+        stream, so large reads aren't materialized in memory.
+        """
+        req = p4r_pb2.ReadRequest(device_id=self.device_id, entities=entities)
+        started = time.perf_counter()
+        error = False
+        if self.trace_hook:
+            self.trace_hook(self.host_device, "Read", req)
+        call = self._stub.Read(req)
         try:
-            log.debug(f"Sending WriteRequest to {self.host_device} {req}")
-            return await self._stub.Write(req)
+            async for response in call:
+                for entity in response.entities:
+                    yield entity
         except AioRpcError as exc:
-            log.error(f"{str(exc)} payload {req.__class__.__name__} {req}")
+            error = True
+            log.error("%s payload ReadRequest: %s", exc, LazyPayload(req))
             raise
+        finally:
+            call.cancel()
+            if self.metrics:
+                self._observe_rpc("Read", started, req, error=error)
+
+    def read_table_entries(
+        self, table: Optional[str] = None
+    ) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read all entries of a table, or of all tables if table isn't set."""
+        table_id = self.elems_info.tables[table].preamble.id if table else 0
+        return self.read_entities(
+            p4r_pb2.Entity(table_entry=p4r_pb2.TableEntry(table_id=table_id))
+        )
+
+    def read_counter_entries(
+        self, counter: str, index: Optional[int] = None
+    ) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read all cells of a counter array, or only the one at index."""
+        counter_entry = p4r_pb2.CounterEntry(
+            counter_id=self.elems_info.counters[counter].preamble.id
+        )
+        if index is not None:
+            counter_entry.index.index = index
+        return self.read_entities(p4r_pb2.Entity(counter_entry=counter_entry))
+
+    def read_direct_counter_entries(self, table: str) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read the direct counter of every entry of a table."""
+        return self.read_entities(
+            p4r_pb2.Entity(
+                direct_counter_entry=p4r_pb2.DirectCounterEntry(
+                    table_entry=p4r_pb2.TableEntry(
+                        table_id=self.elems_info.tables[table].preamble.id
+                    )
+                )
+            )
+        )
+
+    def read_meter_entries(
+        self, meter: str, index: Optional[int] = None
+    ) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read all cells of a meter array, or only the one at index."""
+        meter_entry = p4r_pb2.MeterEntry(
+            meter_id=self.elems_info.meters[meter].preamble.id
+        )
+        if index is not None:
+            meter_entry.index.index = index
+        return self.read_entities(p4r_pb2.Entity(meter_entry=meter_entry))
+
+    def read_direct_meter_entries(self, table: str) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read the direct meter of every entry of a table."""
+        return self.read_entities(
+            p4r_pb2.Entity(
+                direct_meter_entry=p4r_pb2.DirectMeterEntry(
+                    table_entry=p4r_pb2.TableEntry(
+                        table_id=self.elems_info.tables[table].preamble.id
+                    )
+                )
+            )
+        )
 
-    async def enable_digest(self, _id: int) -> None:
-        """write_update."""
+    def read_register_entries(
+        self, register: str, index: Optional[int] = None
+    ) -> AsyncIterator[p4r_pb2.Entity]:
+        """Read all cells of a register, or only the one at index."""
+        register_entry = p4r_pb2.RegisterEntry(
+            register_id=self.elems_info.registers[register].preamble.id
+        )
+        if index is not None:
+            register_entry.index.index = index
+        return self.read_entities(p4r_pb2.Entity(register_entry=register_entry))
+
+    async def read_register(
+        self, register: str, start=0, stop: Optional[int] = None
+    ) -> RegisterCells:
+        """Read the values of cells start to stop of a register.
+
+        Values are decoded into an array of 64 bit cells, or a list of ints if
+        the register is wider. Slices of up to half of the register are read
+        cell by cell in a single ReadRequest, larger ones with a wildcard read.
+        Raises IndexError if start is out of the register, and ValueError if
+        it's greater than stop.
+        """
+        info = self.elems_info.registers[register]
+        bitwidth, signed = register_type(info)
+        stop = info.size if stop is None else min(stop, info.size)
+        if not 0 <= start <= info.size:
+            raise IndexError(f"Cell {start} out of range of register {register}")
+        if start > stop:
+            raise ValueError(f"start {start} is greater than stop {stop}")
+        if stop - start > info.size // 2:
+            entities = self.read_register_entries(register)
+        else:
+            entities = self.read_entities(
+                *(
+                    p4r_pb2.Entity(
+                        register_entry=p4r_pb2.RegisterEntry(
+                            register_id=info.preamble.id,
+                            index=p4r_pb2.Index(index=index),
+                        )
+                    )
+                    for index in range(start, stop)
+                )
+            )
+        return await decode_cells(entities, start, stop, bitwidth, signed)
+
+    async def write_register(
+        self,
+        register: str,
+        values: Iterable[Value] | Mapping[int, Value],
+        start=0,
+        *,
+        max_updates=1000,
+        priority=WritePriority.NORMAL,
+    ) -> BulkWriteResult:
+        """Write the values of cells of a register from start, or by index.
+
+        Updates are MODIFYs batched into WriteRequests of up to max_updates.
+        """
+        info = self.elems_info.registers[register]
+        bitwidth, signed = register_type(info)
+        return await self.write_bulk(
+            cell_entities(info.preamble.id, values, start, bitwidth, signed),
+            p4r_pb2.Update.Type.MODIFY,
+            max_updates=max_updates,
+            priority=priority,
+        )
+
+    async def enable_digest(
+        self,
+        _id: int,
+        *,
+        max_timeout_ns=0,
+        max_list_size=1,
+        ack_timeout_ns=1000000000,
+    ) -> None:
+        """Enable a digest.
+
+        Raising max_list_size and max_timeout_ns lets the device send many
+        learned items per DigestList, see DigestEntry.Config.
+        """
+        config = p4r_pb2.DigestEntry.Config(
+            max_timeout_ns=max_timeout_ns,
+            max_list_size=max_list_size,
+            ack_timeout_ns=ack_timeout_ns,
+        )
+        response = await self._write_digest_entry(
+            _id, config, p4r_pb2.Update.Type.INSERT
+        )
+        self._digest_configs[_id] = config
+        return response
+
+    async def _write_digest_entry(
+        self, _id: int, config: p4r_pb2.DigestEntry.Config, op_type: int
+    ) -> p4r_pb2.WriteResponse:
         update = p4r_pb2.Update(
-            type=p4r_pb2.Update.Type.INSERT,
+            type=op_type,
             entity=p4r_pb2.Entity(
-                digest_entry=p4r_pb2.DigestEntry(
-                    digest_id=_id,
-                    config=p4r_pb2.DigestEntry.Config(
-                        max_timeout_ns=0, max_list_size=1, ack_timeout_ns=1000000000
-                    ),
-                )
+                digest_entry=p4r_pb2.DigestEntry(digest_id=_id, config=config)
             ),
         )
         return await self._write_request(update)
@@ -185,57 +732,229 @@ class Client:
                 digest_id=digest.digest_id, list_id=digest.list_id
             )
         )
-        try:
-            await self.stream_channel.write(req)
-        except AioRpcError as exc:
-            log.error(f"{str(exc)} payload {req.__class__.__name__}: {req}")
-            raise
+        await self._stream_write(req)
+
+    async def _stream_write(self, *reqs: p4r_pb2.StreamMessageRequest) -> None:
+        """Write StreamMessageRequests back-to-back on the stream channel.
+
+        Each write waits for gRPC flow control, and the stream lock keeps
+        concurrent writers from interleaving.
+        """
+        async with self._stream_lock:
+            if self.metrics:
+                self.metrics.bytes_sent["StreamChannel"] += sum(
+                    req.ByteSize() for req in reqs
+                )
+            for req in reqs:
+                if self.trace_hook:
+                    self.trace_hook(self.host_device, "StreamChannel.send", req)
+                try:
+                    await self.stream_channel.write(req)
+                except AioRpcError as exc:
+                    log.error(
+                        "%s payload StreamMessageRequest: %s", exc, LazyPayload(req)
+                    )
+                    raise
+
+    async def send_packet_out(
+        self, payload: bytes, metadata: Optional[dict[str, Value]] = None
+    ) -> None:
+        """Send a PacketOut with metadata values by name."""
+        await self._stream_write(self.packet_out_encoder.encode(payload, metadata))
+
+    async def send_packet_outs(
+        self, packets: Iterable[tuple[bytes, Optional[dict[str, Value]]]]
+    ) -> None:
+        """Send many (payload, metadata) PacketOuts back-to-back."""
+        encode = self.packet_out_encoder.encode
+        await self._stream_write(
+            *[encode(payload, metadata) for payload, metadata in packets]
+        )
+
+    def decode_packet_in(self, packet: p4r_pb2.PacketIn) -> PacketIn:
+        """Decode a PacketIn payload and metadata values by name."""
+        return self.packet_in_decoder.decode(packet)
+
+    @property
+    def packet_out_encoder(self) -> PacketOutEncoder:
+        """PacketOutEncoder of the current pipeline."""
+        if not self._packet_out_encoder:
+            self._packet_out_encoder = PacketOutEncoder(self.elems_info)
+        return self._packet_out_encoder
+
+    @property
+    def packet_in_decoder(self) -> PacketInDecoder:
+        """PacketInDecoder of the current pipeline."""
+        if not self._packet_in_decoder:
+            self._packet_in_decoder = PacketInDecoder(self.elems_info)
+        return self._packet_in_decoder
+
+    def set_p4info(
+        self, p4info: p4info_pb2.P4Info, elems_info: Optional[ElementsP4Info] = None
+    ) -> None:
+        """Set the P4Info of the current pipeline.
+
+        An ElementsP4Info can be given to share it with other clients.
+        """
+        self.p4info = p4info
+        self.elems_info = elems_info if elems_info else ElementsP4Info(p4info)
+        self._table_entry_builders.clear()
+        self._packet_out_encoder = None
+        self._packet_in_decoder = None
 
     async def _set_fwd_pipeline(
         self,
         config: p4r_pb2.ForwardingPipelineConfig,
         action=p4r_pb2.SetForwardingPipelineConfigRequest.Action.VERIFY_AND_COMMIT,
+        *,
+        elems_info: Optional[ElementsP4Info] = None,
+        device_config: Optional[DeviceConfig] = None,
     ) -> p4r_pb2.GetForwardingPipelineConfigResponse:
-        """_set_fwd_pipeline."""
+        """_set_fwd_pipeline.
+
+        If elems_info is set, it's used as the P4Info of the pushed config,
+        otherwise the P4Info is fetched back from the device.
+
+        If device_config is set, it's spliced into the serialized request as
+        the config p4_device_config instead of being copied into a message,
+        logs and the trace hook only see the request without it.
+        """
         req = p4r_pb2.SetForwardingPipelineConfigRequest(
             device_id=self.device_id,
             election_id=self.election_id,
             action=action,
             config=config,
         )
+        if self.trace_hook:
+            self.trace_hook(self.host_device, "SetForwardingPipelineConfig", req)
+        started = time.perf_counter()
+        bytes_sent = None
         try:
-            response = await self._stub.SetForwardingPipelineConfig(req)
+            if device_config is None:
+                response = await self._stub.SetForwardingPipelineConfig(req)
+            else:
+                serialized = serialize_pipeline_request(req, device_config)
+                bytes_sent = len(serialized)
+                response = await self._set_fwd_pipeline_serialized_call()(serialized)
+                del serialized
         except AioRpcError as exc:
-            log.error(f"{str(exc)} payload {req.__class__.__name__}: {req}")
+            self._observe_rpc(
+                "SetForwardingPipelineConfig",
+                started,
+                req,
+                error=True,
+                bytes_sent=bytes_sent,
+            )
+            log.error(
+                "%s payload SetForwardingPipelineConfigRequest: %s",
+                exc,
+                LazyPayload(req),
+            )
             raise
+        self._observe_rpc(
+            "SetForwardingPipelineConfig", started, req, bytes_sent=bytes_sent
+        )
 
-        pipeline = await self.get_fwd_pipeline()
-        self.p4info = pipeline.config.p4info
-        self.elems_info = ElementsP4Info(self.p4info)
+        if elems_info:
+            self.set_p4info(elems_info.p4info, elems_info)
+        else:
+            pipeline = await self.get_fwd_pipeline()
+            self.set_p4info(pipeline.config.p4info)
 
         return response
 
+    def _set_fwd_pipeline_serialized_call(self) -> grpc.aio.UnaryUnaryMultiCallable:
+        """SetForwardingPipelineConfig taking an already serialized request."""
+        if not self._set_fwd_pipeline_serialized:
+            self._set_fwd_pipeline_serialized = self._channel.unary_unary(
+                "/p4.v1.P4Runtime/SetForwardingPipelineConfig",
+                request_serializer=None,
+                response_deserializer=(
+                    p4r_pb2.SetForwardingPipelineConfigResponse.FromString
+                ),
+            )
+        return self._set_fwd_pipeline_serialized
+
+    async def _set_fwd_pipeline_if_changed(
+        self,
+        config: p4r_pb2.ForwardingPipelineConfig,
+        action=p4r_pb2.SetForwardingPipelineConfigRequest.Action.VERIFY_AND_COMMIT,
+        *,
+        elems_info: ElementsP4Info,
+        device_config: Optional[DeviceConfig] = None,
+    ) -> Optional[p4r_pb2.SetForwardingPipelineConfigResponse]:
+        """Set the pipeline unless the device already has the same config cookie.
+
+        The device is queried with a COOKIE_ONLY GetForwardingPipelineConfig,
+        if its cookie matches, the push is skipped and elems_info is used as
+        the P4Info of the current pipeline. None is returned if skipped.
+        """
+        try:
+            pipeline = await self.get_fwd_pipeline(
+                p4r_pb2.GetForwardingPipelineConfigRequest.ResponseType.COOKIE_ONLY
+            )
+        except AioRpcError as exc:
+            log.info(f"Couldn't get the pipeline cookie of {self.host_device}: {exc}")
+        else:
+            if (
+                pipeline.config.HasField("cookie")
+                and pipeline.config.cookie.cookie == config.cookie.cookie
+            ):
+                log.info(f"Pipeline of {self.host_device} is unchanged, skipping")
+                self.set_p4info(elems_info.p4info, elems_info)
+                return None
+        return await self._set_fwd_pipeline(
+            config, action, elems_info=elems_info, device_config=device_config
+        )
+
     async def set_fwd_pipeline_from_file(
         self,
         p4_info_txt_path: str,
         config_json_path: str,
         cookie=0,
         action=p4r_pb2.SetForwardingPipelineConfigRequest.Action.VERIFY_AND_COMMIT,
-    ) -> p4r_pb2.GetForwardingPipelineConfigResponse:
-        """set_forwarding_pipeline_config."""
+        *,
+        p4info_cache_dir: Optional[str] = None,
+        skip_if_unchanged=False,
+        mmap_device_config=False,
+    ) -> Optional[p4r_pb2.SetForwardingPipelineConfigResponse]:
+        """set_forwarding_pipeline_config.
 
+        If p4info_cache_dir is set, the P4Info is read through a binary cache in it.
+
+        If skip_if_unchanged is set, the cookie is a content hash of the P4Info
+        and device config, so cookie can't be set, raising ValueError, and the
+        push is skipped, returning None, if the device already has it. Either
+        way the local P4Info is used instead of fetching it back from the
+        device.
+
+        The device config is read into memory, unless mmap_device_config is
+        set, in which case it's memory mapped, shared with other clients
+        pushing it and spliced into the serialized request, see
+        load_device_config for the constraints on replacing the file.
+        """
+
+        if skip_if_unchanged and cookie:
+            raise ValueError("cookie can't be set if skip_if_unchanged is set")
         loop = asyncio.get_running_loop()
+        load_config = load_device_config if mmap_device_config else read_bytes_config
         p4info, device_config = await asyncio.gather(
-            loop.run_in_executor(None, read_p4info_txt, p4_info_txt_path),
-            loop.run_in_executor(None, read_bytes_config, config_json_path),
+            loop.run_in_executor(None, read_p4info, p4_info_txt_path, p4info_cache_dir),
+            loop.run_in_executor(None, load_config, config_json_path),
         )
-        return await self._set_fwd_pipeline(
-            p4r_pb2.ForwardingPipelineConfig(
-                p4info=p4info,
-                p4_device_config=device_config,
-                cookie=p4r_pb2.ForwardingPipelineConfig.Cookie(cookie=cookie),
+        if skip_if_unchanged:
+            cookie = await loop.run_in_executor(
+                None, pipeline_cookie, p4info, device_config
             )
-        )
+        config, device_config = new_pipeline_config(p4info, device_config, cookie)
+        if skip_if_unchanged:
+            return await self._set_fwd_pipeline_if_changed(
+                config,
+                action,
+                elems_info=ElementsP4Info(p4info),
+                device_config=device_config,
+            )
+        return await self._set_fwd_pipeline(config, action, device_config=device_config)
 
     async def insert_multicast_group(self, mgid: int, ports: list[int]):
         """insert_multicast_group."""
@@ -255,20 +974,40 @@ class Client:
         )
         return await self._write_request(update)
 
-    async def modify_entity(self, *entities: p4r_pb2.Entity) -> None:
+    async def modify_entity(
+        self, *entities: p4r_pb2.Entity, priority=WritePriority.NORMAL
+    ) -> None:
         """Modify entities."""
-        return await self._op_entity(*entities, op_type=p4r_pb2.Update.Type.MODIFY)
+        return await self._op_entity(
+            *entities, op_type=p4r_pb2.Update.Type.MODIFY, priority=priority
+        )
 
-    async def insert_entity(self, *entities: p4r_pb2.Entity) -> None:
+    async def insert_entity(
+        self, *entities: p4r_pb2.Entity, priority=WritePriority.NORMAL
+    ) -> None:
         """Insert entities."""
-        return await self._op_entity(*entities, op_type=p4r_pb2.Update.Type.INSERT)
+        return await self._op_entity(
+            *entities, op_type=p4r_pb2.Update.Type.INSERT, priority=priority
+        )
 
-    async def delete_entity(self, *entities: p4r_pb2.Entity) -> None:
+    async def delete_entity(
+        self, *entities: p4r_pb2.Entity, priority=WritePriority.NORMAL
+    ) -> None:
         """Delete entities."""
-        return await self._op_entity(*entities, op_type=p4r_pb2.Update.Type.DELETE)
+        return await self._op_entity(
+            *entities, op_type=p4r_pb2.Update.Type.DELETE, priority=priority
+        )
 
-    async def _op_entity(self, *entities, op_type: int):
-        """Perform operations on entities."""
+    async def _op_entity(self, *entities, op_type: int, priority=WritePriority.NORMAL):
+        """Perform operations on entities.
+
+        Only NORMAL priority writes are coalesced by the write batcher, CRITICAL
+        ones shouldn't wait for a batch and BULK ones are large already.
+
+        Failed writes raise WriteException whether they're batched or not, with
+        the p4.v1.Error of each update, if the server sent them, and the
+        AioRpcError as rpc_error.
+        """
         try:
             payload = [
                 p4r_pb2.Update(
@@ -277,10 +1016,119 @@ class Client:
                 )
                 for entity in entities
             ]
-            return await self._write_request(*payload)
+            if self.write_batcher and priority == WritePriority.NORMAL:
+                response = await self.write_batcher.submit(payload)
+            else:
+                response = await self._write_request(*payload, priority=priority)
+        except WriteException as exc:
+            if self.shadow is not None:
+                self.shadow.apply(payload, exc.errors)
+            raise
         except AioRpcError as exc:
-            log.error(f"{str(exc)} payload {payload}")
+            log.error("%s payload of %d updates", exc, len(payload))
+            errors = decode_write_errors(exc)
+            if self.shadow is not None:
+                self.shadow.apply(payload, errors)
+            raise WriteException(
+                f"WriteRequest failed: {exc.details()}", errors, exc
+            ) from exc
+        if self.shadow is not None:
+            self.shadow.apply(payload)
+        return response
+
+    async def write_bulk(
+        self,
+        entities: Iterable[p4r_pb2.Entity] | AsyncIterable[p4r_pb2.Entity],
+        op_type=p4r_pb2.Update.Type.INSERT,
+        *,
+        max_updates=1000,
+        max_bytes=1024 * 1024,
+        concurrency=4,
+        priority=WritePriority.NORMAL,
+    ) -> BulkWriteResult:
+        """Write a large (async) iterable of entities.
+
+        Entities are chunked into WriteRequests of at most max_updates updates
+        and max_bytes bytes, keeping up to concurrency Write RPCs in flight.
+        Failed updates don't raise, they're reported in the BulkWriteResult.
+        WriteRequests have NORMAL priority, large loads that shouldn't delay
+        other writes can be given BULK priority.
+        """
+        result = BulkWriteResult()
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks: set[asyncio.Task] = set()
+
+        async def write_chunk(offset: int, updates: list[p4r_pb2.Update]) -> None:
+            try:
+                await self._write_request(*updates, priority=priority)
+                if self.shadow is not None:
+                    self.shadow.apply(updates)
+            except AioRpcError as exc:
+                result.add_rpc_error(offset, len(updates), exc)
+                if self.shadow is not None:
+                    self.shadow.apply(updates, decode_write_errors(exc))
+            finally:
+                semaphore.release()
+
+        try:
+            async for updates in iter_update_chunks(
+                entities, op_type, max_updates, max_bytes
+            ):
+                await semaphore.acquire()
+                task = asyncio.create_task(write_chunk(result.total, updates))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                result.total += len(updates)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
             raise
+        return result
+
+    async def reconcile_shadow(
+        self, table: Optional[str] = None, *, concurrency=4
+    ) -> dict[str, BulkWriteResult]:
+        """Reconcile the device table entries with the shadow store.
+
+        The entries of a table, or of all tables if table isn't set, are read
+        from the device, and only the minimal deletes, modifies and inserts
+        for the device to match the shadow store are written.
+        """
+        table_id = self.elems_info.tables[table].preamble.id if table else 0
+        device_entries = [
+            entity.table_entry async for entity in self.read_table_entries(table)
+        ]
+        diff = self.shadow.diff(device_entries, table_id)
+        log.info(
+            f"Reconciling {self.host_device}: {len(diff.deletes)} deletes, "
+            f"{len(diff.modifies)} modifies, {len(diff.inserts)} inserts"
+        )
+        results = {}
+        for name, entities, op_type in (
+            ("delete", diff.deletes, p4r_pb2.Update.Type.DELETE),
+            ("modify", diff.modifies, p4r_pb2.Update.Type.MODIFY),
+            ("insert", diff.inserts, p4r_pb2.Update.Type.INSERT),
+        ):
+            results[name] = await self.write_bulk(
+                entities, op_type, concurrency=concurrency
+            )
+        return results
+
+    def table_entry_builder(
+        self, table: str, action: Optional[str]
+    ) -> TableEntryBuilder:
+        """Get the compiled TableEntryBuilder of a (table, action) pair.
+
+        Builders are cached until the forwarding pipeline is set again.
+        """
+        try:
+            return self._table_entry_builders[(table, action)]
+        except KeyError:
+            builder = TableEntryBuilder(self.elems_info, table, action)
+            self._table_entry_builders[(table, action)] = builder
+            return builder
 
     def new_table_entry(
         self,
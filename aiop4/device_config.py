@@ -0,0 +1,141 @@
+import mmap
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from p4.config.v1.p4info_pb2 import P4Info
+
+_LENGTH_DELIMITED = 2
+_CONFIG_FIELD = p4r_pb2.SetForwardingPipelineConfigRequest.DESCRIPTOR.fields_by_name[
+    "config"
+]
+_DEVICE_CONFIG_FIELD = p4r_pb2.ForwardingPipelineConfig.DESCRIPTOR.fields_by_name[
+    "p4_device_config"
+]
+
+
+class DeviceConfig:
+    """DeviceConfig.
+
+    This class is responsible for holding a device config file memory mapped
+    read-only, so its pages are loaded on demand from the page cache instead
+    of being copied into the process, and reclaimable under memory pressure.
+
+    Configs are loaded with load_device_config, which shares a single
+    DeviceConfig per file among every Client pushing it for as long as any of
+    them uses it.
+    """
+
+    def __init__(self, path: str) -> None:
+        """DeviceConfig."""
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self.buffer: mmap.mmap | bytes = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if stat.st_size
+                else b""
+            )
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.buffer)
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+
+_device_configs: weakref.WeakValueDictionary[tuple[int, ...], DeviceConfig] = (
+    weakref.WeakValueDictionary()
+)
+_device_configs_lock = threading.Lock()
+
+
+def load_device_config(config_path: str) -> DeviceConfig:
+    """Load a device config memory mapped, sharing it while it's in use.
+
+    A file that's replaced since it was loaded is mapped again. Files must be
+    replaced, e.g. written to a temporary file renamed over them, and never
+    rewritten in place while they're mapped.
+    """
+    path = str(Path(config_path).expanduser())
+    stat = os.stat(path)
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _device_configs_lock:
+        device_config = _device_configs.get(key)
+        if device_config is None:
+            device_config = DeviceConfig(path)
+            _device_configs[device_config.key] = device_config
+        return device_config
+
+
+def _varint(number: int) -> bytes:
+    encoded = bytearray()
+    while number > 0x7F:
+        encoded.append(number & 0x7F | 0x80)
+        number >>= 7
+    encoded.append(number)
+    return bytes(encoded)
+
+
+_CONFIG_TAG = _varint(_CONFIG_FIELD.number << 3 | _LENGTH_DELIMITED)
+_DEVICE_CONFIG_TAG = _varint(_DEVICE_CONFIG_FIELD.number << 3 | _LENGTH_DELIMITED)
+
+
+def serialize_pipeline_request(
+    req: p4r_pb2.SetForwardingPipelineConfigRequest,
+    device_config: DeviceConfig | bytes,
+) -> bytes:
+    """Serialize a request with device_config as its config p4_device_config.
+
+    The device config is spliced into the serialized request, the only copy
+    made of it is the serialized request itself. req.config must not have a
+    p4_device_config.
+    """
+    config = req.config.SerializeToString()
+    header = p4r_pb2.SetForwardingPipelineConfigRequest()
+    header.CopyFrom(req)
+    header.ClearField("config")
+    device_config_field = _DEVICE_CONFIG_TAG + _varint(len(device_config))
+    config_length = len(config) + len(device_config_field) + len(device_config)
+    buffer = (
+        device_config.buffer
+        if isinstance(device_config, DeviceConfig)
+        else device_config
+    )
+    return b"".join(
+        (
+            header.SerializeToString(),
+            _CONFIG_TAG,
+            _varint(config_length),
+            config,
+            device_config_field,
+            buffer,
+        )
+    )
+
+
+def new_pipeline_config(
+    p4info: P4Info, device_config: DeviceConfig | bytes, cookie=0
+) -> tuple[p4r_pb2.ForwardingPipelineConfig, Optional[DeviceConfig]]:
+    """ForwardingPipelineConfig of a P4Info, device config and cookie.
+
+    A DeviceConfig isn't copied into the ForwardingPipelineConfig, it's
+    returned to be spliced when the request is serialized, bytes are.
+    """
+    config = p4r_pb2.ForwardingPipelineConfig(
+        p4info=p4info,
+        cookie=p4r_pb2.ForwardingPipelineConfig.Cookie(cookie=cookie),
+    )
+    if isinstance(device_config, DeviceConfig):
+        return config, device_config
+    config.p4_device_config = device_config
+    return config, None
@@ -0,0 +1,255 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from p4.v1 import p4data_pb2
+
+from .elems_info import ElementsP4Info
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+DigestHandler = Callable[[list[dict[str, int]]], Optional[Awaitable[Any]]]
+
+
+class DigestDecoder:
+    """DigestDecoder.
+
+    This class is responsible for decoding the P4Data of a DigestList into
+    dicts of ints by member name, as declared by the digest type_spec. Struct
+    and tuple members are named after the struct members or their positions,
+    and a bitstring digest is named after the digest itself.
+    """
+
+    def __init__(self, elems_info: ElementsP4Info, digest: str) -> None:
+        """DigestDecoder."""
+        digest_info = elems_info.digests[digest]
+        self.digest_id: int = digest_info.preamble.id
+        type_spec = digest_info.type_spec
+        match type_spec.WhichOneof("type_spec"):
+            case "struct":
+                struct = elems_info.p4info.type_info.structs[type_spec.struct.name]
+                self.names = [member.name for member in struct.members]
+            case "tuple":
+                self.names = [str(i) for i in range(len(type_spec.tuple.members))]
+            case _:
+                self.names = []
+        self.name = digest
+
+    @staticmethod
+    def _to_int(data: p4data_pb2.P4Data) -> int:
+        return int.from_bytes(data.bitstring, "big")
+
+    def decode(self, digest_list: p4r_pb2.DigestList) -> list[dict[str, int]]:
+        """Decode every item of a DigestList."""
+        to_int, names = self._to_int, self.names
+        items = []
+        for data in digest_list.data:
+            match data.WhichOneof("data"):
+                case "struct":
+                    members = data.struct.members
+                case "tuple":
+                    members = data.tuple.members
+                case _:
+                    items.append({self.name: to_int(data)})
+                    continue
+            items.append({name: to_int(value) for name, value in zip(names, members)})
+        return items
+
+
+class TTLCache:
+    """TTLCache.
+
+    Set of keys that expire ``ttl`` seconds after they were last added, holding
+    at most ``maxsize`` keys by evicting the oldest ones.
+    """
+
+    def __init__(self, ttl=60.0, maxsize=1_000_000) -> None:
+        """TTLCache."""
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._expiries: OrderedDict[Hashable, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._expiries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        expiry = self._expiries.get(key)
+        return expiry is not None and expiry > time.monotonic()
+
+    def add(self, key: Hashable) -> bool:
+        """Add or refresh a key, returning whether it wasn't already cached."""
+        now = time.monotonic()
+        is_new = key not in self
+        self._expiries[key] = now + self.ttl
+        self._expiries.move_to_end(key)
+        while self._expiries:
+            oldest_key, expiry = next(iter(self._expiries.items()))
+            if expiry > now and len(self._expiries) <= self.maxsize:
+                break
+            del self._expiries[oldest_key]
+        return is_new
+
+    def discard(self, key: Hashable) -> None:
+        """Discard a key."""
+        self._expiries.pop(key, None)
+
+    def clear(self) -> None:
+        """Clear every key."""
+        self._expiries.clear()
+
+
+class DigestEngine:
+    """DigestEngine.
+
+    This class is responsible for consuming the digest queue of a Client:
+    each DigestList is decoded by its DigestDecoder, items already seen in the
+    last ``ttl`` seconds are dropped, the remaining ones are passed to the
+    handler registered for the digest, and the DigestList is acked.
+
+    Acks are coalesced, they're written back-to-back on the stream once
+    ``ack_batch_size`` lists are pending or ``ack_delay`` seconds later.
+    """
+
+    def __init__(
+        self,
+        client: "Client",
+        *,
+        ttl=60.0,
+        max_cache_size=1_000_000,
+        ack_batch_size=64,
+        ack_delay=0.005,
+    ) -> None:
+        """DigestEngine."""
+        self.client = client
+        self.ttl = ttl
+        self.max_cache_size = max_cache_size
+        self.ack_batch_size = ack_batch_size
+        self.ack_delay = ack_delay
+
+        self._decoders: dict[int, DigestDecoder] = {}
+        self._handlers: dict[int, DigestHandler] = {}
+        self._key_fields: dict[int, Optional[tuple[str, ...]]] = {}
+        self._caches: dict[int, TTLCache] = {}
+        self._pending_acks: list[p4r_pb2.StreamMessageRequest] = []
+        self._ack_timer: Optional[asyncio.TimerHandle] = None
+        self._ack_tasks: set[asyncio.Task] = set()
+        self._consumer_task: Optional[asyncio.Task] = None
+
+    def register(
+        self,
+        digest: str,
+        handler: DigestHandler,
+        *,
+        key_fields: Optional[tuple[str, ...]] = None,
+    ) -> None:
+        """Register the handler of a digest.
+
+        Items are deduplicated by the values of key_fields, or all of their
+        fields if it isn't set.
+        """
+        decoder = DigestDecoder(self.client.elems_info, digest)
+        self._decoders[decoder.digest_id] = decoder
+        self._handlers[decoder.digest_id] = handler
+        self._key_fields[decoder.digest_id] = key_fields
+        self._caches[decoder.digest_id] = TTLCache(self.ttl, self.max_cache_size)
+
+    def forget(self, digest: str, item: dict[str, int]) -> None:
+        """Forget a learned item, so it's handled again next time it's seen."""
+        digest_id = self.client.elems_info.digests[digest].preamble.id
+        self._caches[digest_id].discard(self._key(digest_id, item))
+
+    def _key(self, digest_id: int, item: dict[str, int]) -> tuple:
+        key_fields = self._key_fields[digest_id]
+        if key_fields is None:
+            return tuple(item.values())
+        return tuple(item[name] for name in key_fields)
+
+    async def process(self, digest_list: p4r_pb2.DigestList) -> None:
+        """Decode, deduplicate, handle and ack a DigestList.
+
+        If the handler raises, the DigestList isn't acked and its items are
+        forgotten, so they're handled again when the device resends it.
+        """
+        digest_id = digest_list.digest_id
+        decoder = self._decoders.get(digest_id)
+        if decoder:
+            cache = self._caches[digest_id]
+            items = [
+                item
+                for item in decoder.decode(digest_list)
+                if cache.add(self._key(digest_id, item))
+            ]
+            if items:
+                try:
+                    result = self._handlers[digest_id](items)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    for item in items:
+                        cache.discard(self._key(digest_id, item))
+                    raise
+        else:
+            log.warning(f"Got DigestList of unregistered digest_id {digest_id}")
+        self._ack(digest_list)
+
+    def _ack(self, digest_list: p4r_pb2.DigestList) -> None:
+        self._pending_acks.append(
+            p4r_pb2.StreamMessageRequest(
+                digest_ack=p4r_pb2.DigestListAck(
+                    digest_id=digest_list.digest_id, list_id=digest_list.list_id
+                )
+            )
+        )
+        if len(self._pending_acks) >= self.ack_batch_size:
+            self._flush_acks()
+        elif not self._ack_timer:
+            self._ack_timer = asyncio.get_running_loop().call_later(
+                self.ack_delay, self._flush_acks
+            )
+
+    def _flush_acks(self) -> None:
+        if self._ack_timer:
+            self._ack_timer.cancel()
+            self._ack_timer = None
+        if not self._pending_acks:
+            return
+        acks, self._pending_acks = self._pending_acks, []
+        task = asyncio.create_task(self.client._stream_write(*acks))
+        self._ack_tasks.add(task)
+        task.add_done_callback(self._ack_tasks.discard)
+
+    async def flush_acks(self) -> None:
+        """Write pending acks and wait for them to be written."""
+        self._flush_acks()
+        if self._ack_tasks:
+            await asyncio.gather(*self._ack_tasks, return_exceptions=True)
+
+    async def consume(self) -> None:
+        """Consume the digest queue of the client forever."""
+        queue = self.client.queues["digest"]
+        while True:
+            msg = await queue.get()
+            try:
+                await self.process(msg.digest)
+            except Exception as exc:
+                log.exception(f"Failed to process digest {msg.digest.digest_id}: {exc}")
+
+    def start(self) -> asyncio.Task:
+        """Start consuming the digest queue of the client."""
+        if not self._consumer_task or self._consumer_task.done():
+            self._consumer_task = asyncio.create_task(self.consume())
+        return self._consumer_task
+
+    async def stop(self) -> None:
+        """Stop consuming and write pending acks."""
+        if self._consumer_task:
+            self._consumer_task.cancel()
+            self._consumer_task = None
+        await self.flush_acks()
@@ -1,40 +1,171 @@
+from functools import cached_property
+
+from google.protobuf.message import Message
 from p4.config.v1.p4info_pb2 import P4Info
 
+PREAMBLE_KINDS = (
+    "tables",
+    "actions",
+    "action_profiles",
+    "counters",
+    "direct_counters",
+    "meters",
+    "direct_meters",
+    "controller_packet_metadata",
+    "value_sets",
+    "registers",
+    "digests",
+)
+
 
 class ElementsP4Info:
     """ElementsP4Info.
 
     This class is responsible for indexing P4Info objects by a given attribute.
     By default it'll index objects by their fully qualified name.
+
+    Each index is built lazily on first access, so apps that only use a few
+    P4Info objects don't pay for indexing large programs.
+
+    Regardless of iter_attr, ``ids`` indexes every object with a preamble by
+    id, ``index(kind)`` indexes a kind of objects by id, fully qualified name
+    and alias at once, and match fields, action params and controller packet
+    metadata are indexed by (parent id, id) to decode what's received from
+    a device in constant time.
     """
 
     def __init__(self, p4info: P4Info, iter_attr="name") -> None:
         """ElementsP4Info."""
         self.p4info: P4Info = p4info
+        self.iter_attr = iter_attr
+        self._indexes: dict[str, dict[int | str, Message]] = {}
+
+    @cached_property
+    def ids(self) -> dict[int, Message]:
+        return {
+            item.preamble.id: item
+            for kind in PREAMBLE_KINDS
+            for item in getattr(self.p4info, kind)
+        }
+
+    def index(self, kind: str) -> dict[int | str, Message]:
+        """Index of a kind of P4Info objects by id, fully qualified name and alias.
+
+        Fully qualified names take precedence over aliases if they clash.
+        """
+        try:
+            return self._indexes[kind]
+        except KeyError:
+            pass
+        items = getattr(self.p4info, kind)
+        index: dict[int | str, Message] = {}
+        for item in items:
+            index[item.preamble.id] = item
+            if item.preamble.alias:
+                index.setdefault(item.preamble.alias, item)
+        for item in items:
+            index[item.preamble.name] = item
+        self._indexes[kind] = index
+        return index
+
+    def get(self, kind: str, key: int | str) -> Message:
+        """Get a P4Info object of a kind by id, fully qualified name or alias."""
+        return self.index(kind)[key]
+
+    @cached_property
+    def tables(self) -> dict:
+        return self._index_by_preamble("tables")
+
+    @cached_property
+    def actions(self) -> dict:
+        return self._index_by_preamble("actions")
+
+    @cached_property
+    def action_profiles(self) -> dict:
+        return self._index_by_preamble("action_profiles")
+
+    @cached_property
+    def counters(self) -> dict:
+        return self._index_by_preamble("counters")
+
+    @cached_property
+    def direct_counters(self) -> dict:
+        return self._index_by_preamble("direct_counters")
 
-        self.tables = self._index_by_preamble("tables", iter_attr)
-        self.actions = self._index_by_preamble("actions", iter_attr)
-        self.action_profiles = self._index_by_preamble("action_profiles", iter_attr)
-        self.counters = self._index_by_preamble("counters", iter_attr)
-        self.direct_counters = self._index_by_preamble("direct_counters", iter_attr)
-        self.meters = self._index_by_preamble("meters", iter_attr)
-        self.direct_meters = self._index_by_preamble("direct_meters", iter_attr)
-        self.value_sets = self._index_by_preamble("value_sets", iter_attr)
-        self.registers = self._index_by_preamble("digests", iter_attr)
-        self.digests = self._index_by_preamble("digests", iter_attr)
-        self.externs = self._index_by_preamble("externs", iter_attr)
-        self.table_match_fields = self._index_by_table_match_fields(iter_attr)
-
-    def _index_by_table_match_fields(self, iter_attr="name") -> dict:
+    @cached_property
+    def meters(self) -> dict:
+        return self._index_by_preamble("meters")
+
+    @cached_property
+    def direct_meters(self) -> dict:
+        return self._index_by_preamble("direct_meters")
+
+    @cached_property
+    def value_sets(self) -> dict:
+        return self._index_by_preamble("value_sets")
+
+    @cached_property
+    def registers(self) -> dict:
+        return self._index_by_preamble("registers")
+
+    @cached_property
+    def digests(self) -> dict:
+        return self._index_by_preamble("digests")
+
+    @cached_property
+    def externs(self) -> dict:
+        return self._index_by_preamble("externs")
+
+    @cached_property
+    def controller_packet_metadata(self) -> dict:
+        return self._index_by_preamble("controller_packet_metadata")
+
+    @cached_property
+    def table_match_fields(self) -> dict:
         table_match_fields = {}
         for table_name, table in self.tables.items():
             for match_field in table.match_fields:
-                key = (table_name, getattr(match_field, iter_attr))
+                key = (table_name, getattr(match_field, self.iter_attr))
                 table_match_fields[key] = match_field
         return table_match_fields
 
-    def _index_by_preamble(self, iter_name: str, iter_attr="name") -> dict:
+    @cached_property
+    def packet_metadata(self) -> dict:
+        packet_metadata = {}
+        for name, controller_packet_metadata in self.controller_packet_metadata.items():
+            for metadata in controller_packet_metadata.metadata:
+                packet_metadata[(name, getattr(metadata, self.iter_attr))] = metadata
+        return packet_metadata
+
+    @cached_property
+    def action_params(self) -> dict:
+        action_params = {}
+        for action_name, action in self.actions.items():
+            for param in action.params:
+                action_params[(action_name, getattr(param, self.iter_attr))] = param
+        return action_params
+
+    @cached_property
+    def match_fields_by_id(self) -> dict:
+        return self._index_children_by_id("tables", "match_fields")
+
+    @cached_property
+    def action_params_by_id(self) -> dict:
+        return self._index_children_by_id("actions", "params")
+
+    @cached_property
+    def packet_metadata_by_id(self) -> dict:
+        return self._index_children_by_id("controller_packet_metadata", "metadata")
+
+    def _index_children_by_id(self, iter_name: str, children_name: str) -> dict:
+        return {
+            (item.preamble.id, child.id): child
+            for item in getattr(self.p4info, iter_name)
+            for child in getattr(item, children_name)
+        }
+
+    def _index_by_preamble(self, iter_name: str) -> dict:
         return {
-            getattr(item.preamble, iter_attr): item
+            getattr(item.preamble, self.iter_attr): item
             for item in getattr(self.p4info, iter_name, [])
         }
@@ -0,0 +1,153 @@
+import ipaddress
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+Value = int | str | bytes | ipaddress.IPv4Address | ipaddress.IPv6Address
+
+_MAC_RE = re.compile(r"^[0-9a-fA-F]{2}([:-][0-9a-fA-F]{2}){5}$")
+
+
+def to_int(value: Value) -> int:
+    """Convert a value to an int.
+
+    Strings can be MAC addresses ("00:00:00:00:00:01" or with dashes), IPv4 or
+    IPv6 addresses, or ints in any base Python accepts ("10", "0x0a").
+    """
+    match value:
+        case bool():
+            raise TypeError(f"Unsupported value type {type(value)}")
+        case int():
+            return value
+        case bytes():
+            return int.from_bytes(value, "big")
+        case ipaddress.IPv4Address() | ipaddress.IPv6Address():
+            return int(value)
+        case str() if _MAC_RE.match(value):
+            return int(re.sub("[:-]", "", value), 16)
+        case str():
+            try:
+                return int(ipaddress.ip_address(value))
+            except ValueError:
+                return int(value, 0)
+    raise TypeError(f"Unsupported value type {type(value)}")
+
+
+def to_uint(value: Value, bitwidth: int) -> int:
+    """Convert a value to an int, raising ValueError unless it fits in bitwidth bits."""
+    number = to_int(value)
+    if number < 0 or number >> bitwidth:
+        raise ValueError(f"Value {value!r} doesn't fit in {bitwidth} bits")
+    return number
+
+
+@lru_cache(maxsize=65536, typed=True)
+def encode(value: Value, bitwidth: int) -> bytes:
+    """Encode a value as a P4Runtime canonical bytestring.
+
+    The canonical bytestring is the shortest big endian representation of the
+    value, at least one byte long. Raises ValueError if the value doesn't fit
+    in bitwidth bits. Encodings are cached, so hot values are encoded once.
+    """
+    number = to_uint(value, bitwidth)
+    return number.to_bytes(max(1, (number.bit_length() + 7) // 8), "big")
+
+
+def decode(bytestring: bytes) -> int:
+    """Decode a bytestring as an int."""
+    return int.from_bytes(bytestring, "big")
+
+
+def encode_many(values: Iterable[Value], bitwidth: int) -> list[bytes]:
+    """Encode many values as canonical bytestrings.
+
+    A NumPy array of unsigned or signed integers of up to 64 bits is encoded
+    with vectorized operations instead of value by value.
+    """
+    if np is not None and isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+        if bitwidth > 64 or values.dtype.itemsize > 8:
+            return [encode(int(value), bitwidth) for value in values.ravel()]
+        if values.size and (
+            (values < 0).any()
+            or (
+                bitwidth < 64
+                and (values.astype(np.uint64) >> np.uint64(bitwidth)).any()
+            )
+        ):
+            raise ValueError(f"Values don't fit in {bitwidth} bits")
+        # Little endian S8 views drop trailing zero bytes, which are the
+        # leading zero bytes of the big endian representation.
+        little_endian = values.astype("<u8").ravel().view("S8")
+        return [raw[::-1] or b"\x00" for raw in little_endian.tolist()]
+    return [encode(value, bitwidth) for value in values]
+
+
+def exact_match(value: Value, bitwidth: int) -> p4r_pb2.FieldMatch.Exact:
+    """Exact match of a value."""
+    return p4r_pb2.FieldMatch.Exact(value=encode(value, bitwidth))
+
+
+def optional_match(value: Value, bitwidth: int) -> p4r_pb2.FieldMatch.Optional:
+    """Optional match of a value."""
+    return p4r_pb2.FieldMatch.Optional(value=encode(value, bitwidth))
+
+
+def lpm_match(
+    value: Value | ipaddress.IPv4Network | ipaddress.IPv6Network,
+    bitwidth: int,
+    prefix_len: Optional[int] = None,
+) -> Optional[p4r_pb2.FieldMatch.LPM]:
+    """LPM match of a value and prefix length.
+
+    value can also be an IP network, or a string such as "10.0.0.0/8", in
+    which case prefix_len defaults to its prefix length. Bits beyond the
+    prefix are masked out, as P4Runtime requires. A prefix_len of 0 is a
+    don't care match, which P4Runtime requires to be omitted, so it's None.
+    """
+    if isinstance(value, (ipaddress.IPv4Network, ipaddress.IPv6Network)) or (
+        isinstance(value, str) and "/" in value
+    ):
+        network = ipaddress.ip_network(value, strict=False)
+        value = network.network_address
+        prefix_len = network.prefixlen if prefix_len is None else prefix_len
+    if prefix_len is None or not 0 <= prefix_len <= bitwidth:
+        raise ValueError(f"Invalid prefix_len {prefix_len} for {bitwidth} bits")
+    number = to_uint(value, bitwidth)
+    if not prefix_len:
+        return None
+    mask = ((1 << prefix_len) - 1) << (bitwidth - prefix_len)
+    return p4r_pb2.FieldMatch.LPM(
+        value=encode(number & mask, bitwidth), prefix_len=prefix_len
+    )
+
+
+def ternary_match(
+    value: Value, mask: Value, bitwidth: int
+) -> Optional[p4r_pb2.FieldMatch.Ternary]:
+    """Ternary match of a value and mask, masking out the value don't care bits.
+
+    A mask of 0 is a don't care match, which P4Runtime requires to be
+    omitted, so it's None.
+    """
+    number, mask = to_uint(value, bitwidth), to_uint(mask, bitwidth)
+    if not mask:
+        return None
+    return p4r_pb2.FieldMatch.Ternary(
+        value=encode(number & mask, bitwidth), mask=encode(mask, bitwidth)
+    )
+
+
+def range_match(low: Value, high: Value, bitwidth: int) -> p4r_pb2.FieldMatch.Range:
+    """Range match of low to high, inclusive."""
+    if to_int(low) > to_int(high):
+        raise ValueError(f"Invalid range {low!r} > {high!r}")
+    return p4r_pb2.FieldMatch.Range(
+        low=encode(low, bitwidth), high=encode(high, bitwidth)
+    )
@@ -1,6 +1,35 @@
+from typing import Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from grpc.aio import AioRpcError
+
+
 class ClientException(Exception):
     """ClientException."""
 
 
 class BecomePrimaryException(ClientException):
     """BecomePrimaryException."""
+
+
+class NotPrimaryException(ClientException):
+    """NotPrimaryException."""
+
+
+class WriteException(ClientException):
+    """WriteException.
+
+    Raised when one or more updates of a WriteRequest failed. ``errors`` holds
+    the p4.v1.Error of each update, in the same order as they were sent.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        errors: Optional[list[p4r_pb2.Error]] = None,
+        rpc_error: Optional[AioRpcError] = None,
+    ) -> None:
+        """WriteException."""
+        super().__init__(message)
+        self.errors = errors if errors else []
+        self.rpc_error = rpc_error
@@ -0,0 +1,540 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import p4.v1.p4runtime_pb2_grpc as p4r_grpc
+from google.protobuf.message import Message
+from google.rpc import code_pb2, status_pb2
+from p4.v1 import p4data_pb2
+
+from .elems_info import ElementsP4Info
+from .shadow import table_entry_key
+
+log = logging.getLogger(__name__)
+
+# Entities that always exist on the device, so they can only be modified.
+MODIFY_ONLY = (
+    "counter_entry",
+    "direct_counter_entry",
+    "meter_entry",
+    "direct_meter_entry",
+    "register_entry",
+)
+READ_CHUNK_SIZE = 1000
+
+
+def _entity_key(kind: str, entry: Message) -> tuple:
+    """Key of an entity among the entities of its kind."""
+    match kind:
+        case "table_entry":
+            return table_entry_key(entry)
+        case "direct_counter_entry" | "direct_meter_entry":
+            return table_entry_key(entry.table_entry)
+        case "counter_entry":
+            return (entry.counter_id, entry.index.index)
+        case "meter_entry":
+            return (entry.meter_id, entry.index.index)
+        case "register_entry":
+            return (entry.register_id, entry.index.index)
+        case "action_profile_member":
+            return (entry.action_profile_id, entry.member_id)
+        case "action_profile_group":
+            return (entry.action_profile_id, entry.group_id)
+        case "packet_replication_engine_entry":
+            which = entry.WhichOneof("type")
+            if which == "multicast_group_entry":
+                return (which, entry.multicast_group_entry.multicast_group_id)
+            return (which, entry.clone_session_entry.session_id)
+        case "digest_entry":
+            return (entry.digest_id,)
+        case _:
+            return (entry.SerializeToString(deterministic=True),)
+
+
+class _WriteError(Exception):
+    """Per update p4.v1.Error."""
+
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass
+class _Stream:
+    """StreamChannel of a controller."""
+
+    queue: asyncio.Queue
+    device_id: Optional[int] = None
+    election_id: tuple[int, int] = (0, 0)
+
+
+@dataclass
+class FakeDevice:
+    """FakeDevice.
+
+    State of a device of a FakeP4RuntimeServer: its forwarding pipeline and
+    entities, the primary controller stream and counts of what it received.
+    """
+
+    device_id: int
+    config: Optional[p4r_pb2.ForwardingPipelineConfig] = None
+    elems_info: Optional[ElementsP4Info] = None
+    entities: dict[str, dict[tuple, Message]] = field(default_factory=dict)
+    table_sizes: Counter[int] = field(default_factory=Counter)
+    streams: list[_Stream] = field(default_factory=list)
+    primary: Optional[_Stream] = None
+    writes: int = 0
+    updates: int = 0
+    packet_outs: int = 0
+    digest_acks: int = 0
+    on_write: Optional[Callable[[p4r_pb2.WriteRequest], None]] = None
+
+    @property
+    def primary_election_id(self) -> Optional[tuple[int, int]]:
+        return self.primary.election_id if self.primary else None
+
+    def table_entries(self, table_id=0) -> list[p4r_pb2.TableEntry]:
+        """Table entries of a table, or of all tables if table_id is 0.
+
+        Default entries aren't included.
+        """
+        return [
+            entry
+            for (entry_table_id, _), entry in self.entities.get(
+                "table_entry", {}
+            ).items()
+            if (not table_id or entry_table_id == table_id)
+            and not entry.is_default_action
+        ]
+
+    async def send(self, response: p4r_pb2.StreamMessageResponse) -> bool:
+        """Send a stream message to the primary controller, if there's one."""
+        if not self.primary:
+            return False
+        await self.primary.queue.put(response)
+        return True
+
+
+class FakeP4RuntimeServicer(p4r_grpc.P4RuntimeServicer):
+    """FakeP4RuntimeServicer.
+
+    This class is responsible for serving the P4Runtime RPCs of FakeDevices
+    from memory: arbitration, Get and SetForwardingPipelineConfig, Write with
+    per update errors and streaming Read. Devices are created on first use.
+    """
+
+    def __init__(self, stream_queue_size=1024) -> None:
+        """FakeP4RuntimeServicer."""
+        self.devices: dict[int, FakeDevice] = {}
+        self.stream_queue_size = stream_queue_size
+
+    def device(self, device_id: int) -> FakeDevice:
+        """Get or create a device."""
+        try:
+            return self.devices[device_id]
+        except KeyError:
+            device = self.devices[device_id] = FakeDevice(device_id)
+            return device
+
+    async def Capabilities(self, request, context) -> p4r_pb2.CapabilitiesResponse:
+        return p4r_pb2.CapabilitiesResponse(p4runtime_api_version="1.4.1")
+
+    async def _check_primary(
+        self, device: FakeDevice, election_id: p4r_pb2.Uint128, context
+    ) -> None:
+        if (election_id.high, election_id.low) != device.primary_election_id:
+            await context.abort(
+                grpc.StatusCode.PERMISSION_DENIED, "Not the primary controller"
+            )
+
+    async def SetForwardingPipelineConfig(
+        self, request, context
+    ) -> p4r_pb2.SetForwardingPipelineConfigResponse:
+        device = self.device(request.device_id)
+        await self._check_primary(device, request.election_id, context)
+        Action = p4r_pb2.SetForwardingPipelineConfigRequest.Action
+        if request.action == Action.UNSPECIFIED:
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid action")
+        if request.action != Action.VERIFY:
+            if request.action != Action.RECONCILE_AND_COMMIT:
+                device.entities.clear()
+                device.table_sizes.clear()
+            device.config = p4r_pb2.ForwardingPipelineConfig()
+            device.config.CopyFrom(request.config)
+            device.elems_info = ElementsP4Info(device.config.p4info)
+        return p4r_pb2.SetForwardingPipelineConfigResponse()
+
+    async def GetForwardingPipelineConfig(
+        self, request, context
+    ) -> p4r_pb2.GetForwardingPipelineConfigResponse:
+        device = self.device(request.device_id)
+        response = p4r_pb2.GetForwardingPipelineConfigResponse()
+        if not device.config:
+            return response
+        ResponseType = p4r_pb2.GetForwardingPipelineConfigRequest.ResponseType
+        response.config.cookie.CopyFrom(device.config.cookie)
+        if request.response_type in (ResponseType.ALL, ResponseType.P4INFO_AND_COOKIE):
+            response.config.p4info.CopyFrom(device.config.p4info)
+        if request.response_type in (
+            ResponseType.ALL,
+            ResponseType.DEVICE_CONFIG_AND_COOKIE,
+        ):
+            response.config.p4_device_config = device.config.p4_device_config
+        return response
+
+    async def Write(self, request, context) -> p4r_pb2.WriteResponse:
+        device = self.device(request.device_id)
+        await self._check_primary(device, request.election_id, context)
+        if not device.config:
+            await context.abort(
+                grpc.StatusCode.FAILED_PRECONDITION, "No forwarding pipeline config"
+            )
+        device.writes += 1
+        device.updates += len(request.updates)
+        if device.on_write:
+            device.on_write(request)
+
+        errors, failed = [], False
+        for update in request.updates:
+            try:
+                self._apply(device, update)
+                errors.append(p4r_pb2.Error(canonical_code=code_pb2.OK))
+            except _WriteError as exc:
+                failed = True
+                errors.append(p4r_pb2.Error(canonical_code=exc.code, message=str(exc)))
+        if failed:
+            status = status_pb2.Status(code=code_pb2.UNKNOWN, message="Write failure.")
+            for error in errors:
+                status.details.add().Pack(error)
+            await context.abort(
+                grpc.StatusCode.UNKNOWN,
+                "Write failure.",
+                (("grpc-status-details-bin", status.SerializeToString()),),
+            )
+        return p4r_pb2.WriteResponse()
+
+    def _apply(self, device: FakeDevice, update: p4r_pb2.Update) -> None:
+        kind = update.entity.WhichOneof("entity")
+        if not kind:
+            raise _WriteError(code_pb2.INVALID_ARGUMENT, "Empty entity")
+        entry = getattr(update.entity, kind)
+        if kind == "table_entry":
+            table = device.elems_info.ids.get(entry.table_id)
+            if table is None or table.DESCRIPTOR.name != "Table":
+                raise _WriteError(code_pb2.NOT_FOUND, f"Table {entry.table_id}")
+        entries = device.entities.setdefault(kind, {})
+        key = _entity_key(kind, entry)
+        modify_only = kind in MODIFY_ONLY or (
+            kind == "table_entry" and entry.is_default_action
+        )
+        match update.type:
+            case p4r_pb2.Update.Type.INSERT if not modify_only:
+                if key in entries:
+                    raise _WriteError(code_pb2.ALREADY_EXISTS, f"{kind} exists")
+                if kind == "table_entry":
+                    if table.size and device.table_sizes[entry.table_id] >= table.size:
+                        raise _WriteError(code_pb2.RESOURCE_EXHAUSTED, "Table is full")
+                    device.table_sizes[entry.table_id] += 1
+            case p4r_pb2.Update.Type.MODIFY:
+                if key not in entries and not modify_only:
+                    raise _WriteError(code_pb2.NOT_FOUND, f"{kind} not found")
+            case p4r_pb2.Update.Type.DELETE if not modify_only:
+                if entries.pop(key, None) is None:
+                    raise _WriteError(code_pb2.NOT_FOUND, f"{kind} not found")
+                if kind == "table_entry":
+                    device.table_sizes[entry.table_id] -= 1
+                return
+            case _:
+                raise _WriteError(
+                    code_pb2.INVALID_ARGUMENT, f"Invalid update type for {kind}"
+                )
+        stored = type(entry)()
+        stored.CopyFrom(entry)
+        entries[key] = stored
+
+    async def Read(self, request, context) -> AsyncIterator[p4r_pb2.ReadResponse]:
+        device = self.device(request.device_id)
+        response = p4r_pb2.ReadResponse()
+        for entity in request.entities:
+            kind = entity.WhichOneof("entity")
+            for entry in self._read(device, kind, getattr(entity, kind)):
+                getattr(response.entities.add(), kind).CopyFrom(entry)
+                if len(response.entities) >= READ_CHUNK_SIZE:
+                    yield response
+                    response = p4r_pb2.ReadResponse()
+        if response.entities:
+            yield response
+
+    def _read(self, device: FakeDevice, kind: str, query: Message) -> Iterator[Message]:
+        entries = device.entities.get(kind, {})
+        match kind:
+            case "table_entry":
+                if query.match:
+                    entry = entries.get(table_entry_key(query))
+                    yield from [entry] if entry else []
+                    return
+                yield from device.table_entries(query.table_id)
+            case "counter_entry" | "meter_entry" | "register_entry":
+                yield from self._read_indexed(device, kind, query, entries)
+            case "direct_counter_entry" | "direct_meter_entry":
+                for table_entry in device.table_entries(query.table_entry.table_id):
+                    key = table_entry_key(table_entry)
+                    entry = entries.get(key)
+                    if entry is None:
+                        entry = type(query)()
+                        entry.table_entry.CopyFrom(table_entry)
+                    yield entry
+            case _:
+                query_key = _entity_key(kind, query)
+                for key, entry in entries.items():
+                    if all(
+                        not part or part == value for part, value in zip(query_key, key)
+                    ):
+                        yield entry
+
+    def _read_indexed(
+        self, device: FakeDevice, kind: str, query: Message, entries: dict
+    ) -> Iterator[Message]:
+        id_field = kind.replace("_entry", "_id")
+        kinds = {
+            "counter_entry": "counters",
+            "meter_entry": "meters",
+            "register_entry": "registers",
+        }
+        query_id = getattr(query, id_field)
+        for info in getattr(device.elems_info.p4info, kinds[kind]):
+            if query_id and info.preamble.id != query_id:
+                continue
+            indexes = (
+                [query.index.index] if query.HasField("index") else range(info.size)
+            )
+            for index in indexes:
+                entry = entries.get((info.preamble.id, index))
+                if entry is None:
+                    entry = type(query)()
+                    setattr(entry, id_field, info.preamble.id)
+                    entry.index.index = index
+                    if kind == "register_entry":
+                        entry.data.bitstring = b"\x00"
+                yield entry
+
+    async def StreamChannel(
+        self, request_iterator, context
+    ) -> AsyncIterator[p4r_pb2.StreamMessageResponse]:
+        stream = _Stream(asyncio.Queue(self.stream_queue_size))
+        reader = asyncio.create_task(self._read_stream(request_iterator, stream))
+        try:
+            while True:
+                response = await stream.queue.get()
+                if response is None:
+                    break
+                yield response
+        finally:
+            reader.cancel()
+            if stream.device_id is not None:
+                device = self.device(stream.device_id)
+                device.streams.remove(stream)
+                await self._elect(device)
+
+    async def _read_stream(self, request_iterator, stream: _Stream) -> None:
+        try:
+            async for request in request_iterator:
+                match request.WhichOneof("update"):
+                    case "arbitration":
+                        await self._arbitrate(request.arbitration, stream)
+                    case "packet":
+                        self.device(stream.device_id).packet_outs += 1
+                    case "digest_ack":
+                        self.device(stream.device_id).digest_acks += 1
+        finally:
+            await stream.queue.put(None)
+
+    async def _arbitrate(
+        self, arbitration: p4r_pb2.MasterArbitrationUpdate, stream: _Stream
+    ) -> None:
+        device = self.device(arbitration.device_id)
+        stream.device_id = arbitration.device_id
+        stream.election_id = (
+            arbitration.election_id.high,
+            arbitration.election_id.low,
+        )
+        if stream not in device.streams:
+            device.streams.append(stream)
+        await self._elect(device, always_notify=stream)
+
+    async def _elect(
+        self, device: FakeDevice, always_notify: Optional[_Stream] = None
+    ) -> None:
+        """Elect the stream with the highest election_id as primary."""
+        previous = device.primary
+        device.primary = max(
+            device.streams, key=lambda stream: stream.election_id, default=None
+        )
+        for stream in device.streams:
+            if device.primary is previous and stream is not always_notify:
+                continue
+            if stream is device.primary:
+                code = code_pb2.OK
+            else:
+                code = code_pb2.ALREADY_EXISTS if device.primary else code_pb2.NOT_FOUND
+            high, low = device.primary.election_id if device.primary else (0, 0)
+            await stream.queue.put(
+                p4r_pb2.StreamMessageResponse(
+                    arbitration=p4r_pb2.MasterArbitrationUpdate(
+                        device_id=device.device_id,
+                        election_id=p4r_pb2.Uint128(high=high, low=low),
+                        status=status_pb2.Status(code=code),
+                    )
+                )
+            )
+
+
+class FakeP4RuntimeServer:
+    """FakeP4RuntimeServer.
+
+    This class is responsible for running a FakeP4RuntimeServicer on a local
+    grpc.aio server, to exercise Clients end-to-end without a switch, and for
+    generating digests and packet-ins at configurable rates.
+    """
+
+    def __init__(
+        self,
+        address="127.0.0.1:0",
+        *,
+        stream_queue_size=1024,
+        options: Optional[list[tuple[str, Any]]] = None,
+    ) -> None:
+        """FakeP4RuntimeServer."""
+        self.address = address
+        self.options = options
+        self.servicer = FakeP4RuntimeServicer(stream_queue_size)
+        self._server: Optional[grpc.aio.Server] = None
+        self._generators: set[asyncio.Task] = set()
+
+    async def start(self) -> str:
+        """Start serving, returning the host:port to connect to."""
+        self._server = grpc.aio.server(options=self.options)
+        p4r_grpc.add_P4RuntimeServicer_to_server(self.servicer, self._server)
+        port = self._server.add_insecure_port(self.address)
+        await self._server.start()
+        self.address = f"{self.address.rsplit(':', 1)[0]}:{port}"
+        return self.address
+
+    async def stop(self, grace: Optional[float] = None) -> None:
+        """Stop generators and the server."""
+        for task in self._generators:
+            task.cancel()
+        self._generators.clear()
+        if self._server:
+            await self._server.stop(grace)
+            self._server = None
+
+    async def __aenter__(self) -> "FakeP4RuntimeServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def device(self, device_id: int) -> FakeDevice:
+        """Get or create a device."""
+        return self.servicer.device(device_id)
+
+    def _generate(
+        self, device: FakeDevice, rate: float, new_response: Callable[[int], Message]
+    ) -> asyncio.Task:
+        async def generate() -> None:
+            started, sent = time.monotonic(), 0
+            while True:
+                due = int((time.monotonic() - started) * rate) - sent
+                for _ in range(due):
+                    if await device.send(new_response(sent)):
+                        sent += 1
+                    else:
+                        started, sent = time.monotonic(), 0
+                        break
+                await asyncio.sleep(max(1 / rate, 0.001))
+
+        task = asyncio.create_task(generate())
+        self._generators.add(task)
+        task.add_done_callback(self._generators.discard)
+        return task
+
+    def generate_digests(
+        self,
+        device_id: int,
+        digest: str,
+        rate: float,
+        *,
+        list_size=1,
+        new_data: Optional[Callable[[int], p4data_pb2.P4Data]] = None,
+    ) -> asyncio.Task:
+        """Send DigestLists of a digest to the primary at rate lists per second.
+
+        new_data builds the P4Data of the n-th item. By default struct digests
+        get the item number in every member, truncated to its bitwidth.
+        """
+        device = self.device(device_id)
+        digest_info = device.elems_info.digests[digest]
+        new_data = new_data or self._default_digest_data(device, digest_info)
+
+        def new_response(list_id: int) -> p4r_pb2.StreamMessageResponse:
+            response = p4r_pb2.StreamMessageResponse()
+            digest_list = response.digest
+            digest_list.digest_id = digest_info.preamble.id
+            digest_list.list_id = list_id + 1
+            digest_list.timestamp = time.time_ns()
+            for item in range(list_id * list_size, (list_id + 1) * list_size):
+                digest_list.data.append(new_data(item))
+            return response
+
+        return self._generate(device, rate, new_response)
+
+    @staticmethod
+    def _default_digest_data(
+        device: FakeDevice, digest_info: Message
+    ) -> Callable[[int], p4data_pb2.P4Data]:
+        type_spec = digest_info.type_spec
+        if type_spec.WhichOneof("type_spec") == "struct":
+            struct = device.elems_info.p4info.type_info.structs[type_spec.struct.name]
+            bitwidths = [
+                member.type_spec.bitstring.bit.bitwidth for member in struct.members
+            ]
+        else:
+            bitwidths = [type_spec.bitstring.bit.bitwidth]
+
+        def new_data(item: int) -> p4data_pb2.P4Data:
+            members = [
+                p4data_pb2.P4Data(
+                    bitstring=(item % (1 << bitwidth)).to_bytes(
+                        max(1, (bitwidth + 7) // 8), "big"
+                    )
+                )
+                for bitwidth in bitwidths
+            ]
+            if type_spec.WhichOneof("type_spec") == "struct":
+                return p4data_pb2.P4Data(
+                    struct=p4data_pb2.P4StructLike(members=members)
+                )
+            return members[0]
+
+        return new_data
+
+    def generate_packet_ins(
+        self,
+        device_id: int,
+        rate: float,
+        *,
+        payload=bytes(64),
+        metadata: Optional[list[p4r_pb2.PacketMetadata]] = None,
+    ) -> asyncio.Task:
+        """Send PacketIns to the primary at rate packets per second."""
+        response = p4r_pb2.StreamMessageResponse(
+            packet=p4r_pb2.PacketIn(payload=payload, metadata=metadata or [])
+        )
+        return self._generate(self.device(device_id), rate, lambda _: response)
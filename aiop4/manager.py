@@ -0,0 +1,236 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .client import Client
+from .device_config import load_device_config, new_pipeline_config
+from .elems_info import ElementsP4Info
+from .metrics import Metrics, prometheus_text
+from .polling import CounterPoller
+from .utils import pipeline_cookie, read_bytes_config, read_p4info
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DeviceManager:
+    """DeviceManager.
+
+    This class is responsible for managing many Client instances from a single
+    event loop. Clients share the same gRPC channel options, and pipelines
+    pushed through the manager share a single P4Info and ElementsP4Info.
+
+    Fan-out operations run on every device, or on the given host_devices, with
+    at most ``concurrency`` devices in flight, and return a dict of results by
+    host_device where failed devices map to their exception.
+    """
+
+    def __init__(
+        self,
+        *,
+        channel_options: Optional[list[tuple[str, Any]]] = None,
+        election_id=p4r_pb2.Uint128(high=1, low=0),
+        concurrency=32,
+    ) -> None:
+        """DeviceManager."""
+        self.channel_options = channel_options
+        self.election_id = election_id
+        self.concurrency = concurrency
+        self.clients: dict[str, Client] = {}
+
+    def add_device(
+        self,
+        host: str,
+        device_id=0,
+        election_id: Optional[p4r_pb2.Uint128] = None,
+    ) -> Client:
+        """Add a device, returning its Client."""
+        client = Client(
+            host,
+            device_id,
+            election_id if election_id else self.election_id,
+            channel_options=self.channel_options,
+        )
+        if client.host_device in self.clients:
+            raise ValueError(f"Device {client.host_device} already exists")
+        self.clients[client.host_device] = client
+        return client
+
+    def enable_metrics(self) -> dict[str, Metrics]:
+        """Enable recording metrics of every device."""
+        return {
+            host_device: client.enable_metrics()
+            for host_device, client in self.clients.items()
+        }
+
+    def metrics(self) -> dict[str, Metrics]:
+        """Metrics of every device that has them enabled."""
+        return {
+            host_device: client.metrics
+            for host_device, client in self.clients.items()
+            if client.metrics
+        }
+
+    def prometheus_metrics(self) -> str:
+        """Metrics of every device in the Prometheus text format."""
+        return prometheus_text(self.metrics())
+
+    def counter_poller(self, *, interval=1.0) -> CounterPoller:
+        """CounterPoller of every device, including devices added later."""
+        return CounterPoller(
+            self.clients, interval=interval, concurrency=self.concurrency
+        )
+
+    async def remove_device(self, host_device: str) -> None:
+        """Remove a device and close its Client."""
+        await self.clients.pop(host_device).close()
+
+    async def close(self) -> None:
+        """Close every Client."""
+        await self.fan_out(lambda client: client.close())
+        self.clients.clear()
+
+    async def fan_out(
+        self,
+        func: Callable[[Client], Awaitable[T]],
+        host_devices: Optional[Iterable[str]] = None,
+        *,
+        concurrency: Optional[int] = None,
+    ) -> dict[str, T | BaseException]:
+        """Run func on each Client with bounded concurrency.
+
+        concurrency defaults to the concurrency of the DeviceManager.
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+        clients = (
+            [self.clients[host_device] for host_device in host_devices]
+            if host_devices is not None
+            else list(self.clients.values())
+        )
+
+        async def run(client: Client) -> T:
+            async with semaphore:
+                return await func(client)
+
+        results = await asyncio.gather(
+            *[run(client) for client in clients], return_exceptions=True
+        )
+        for client, result in zip(clients, results):
+            if isinstance(result, BaseException):
+                log.warning(f"Device {client.host_device} failed: {result!r}")
+        return {client.host_device: result for client, result in zip(clients, results)}
+
+    async def become_primary(
+        self, *, timeout=5, host_devices: Optional[Iterable[str]] = None
+    ) -> dict[str, None | BaseException]:
+        """Try to become the primary controller of each device."""
+        return await self.fan_out(
+            lambda client: client.become_primary_or_raise(timeout=timeout),
+            host_devices,
+        )
+
+    async def set_fwd_pipeline_from_file(
+        self,
+        p4_info_txt_path: str,
+        config_json_path: str,
+        cookie=0,
+        action=p4r_pb2.SetForwardingPipelineConfigRequest.Action.VERIFY_AND_COMMIT,
+        host_devices: Optional[Iterable[str]] = None,
+        *,
+        p4info_cache_dir: Optional[str] = None,
+        skip_if_unchanged=False,
+        max_bytes_in_flight=256 * 1024 * 1024,
+        mmap_device_config=False,
+    ) -> dict[
+        str, Optional[p4r_pb2.SetForwardingPipelineConfigResponse] | BaseException
+    ]:
+        """Push the same pipeline to each device.
+
+        The files are read and parsed once, and every Client shares the
+        resulting P4Info and ElementsP4Info. If p4info_cache_dir is set, the
+        P4Info is read through a binary cache in it. If skip_if_unchanged is
+        set, devices that already have the pipeline cookie are skipped, and
+        cookie can't be set, see Client.set_fwd_pipeline_from_file.
+
+        The device config is read once, or memory mapped once if
+        mmap_device_config is set, see Client.set_fwd_pipeline_from_file. A
+        push in flight holds about two copies of it, the serialized request
+        and gRPC's send buffer, so fewer pushes run at once if needed to hold
+        at most max_bytes_in_flight, at least one.
+        """
+        if skip_if_unchanged and cookie:
+            raise ValueError("cookie can't be set if skip_if_unchanged is set")
+        loop = asyncio.get_running_loop()
+        load_config = load_device_config if mmap_device_config else read_bytes_config
+        p4info, device_config = await asyncio.gather(
+            loop.run_in_executor(None, read_p4info, p4_info_txt_path, p4info_cache_dir),
+            loop.run_in_executor(None, load_config, config_json_path),
+        )
+        if skip_if_unchanged:
+            cookie = await loop.run_in_executor(
+                None, pipeline_cookie, p4info, device_config
+            )
+        elems_info = ElementsP4Info(p4info)
+        concurrency = min(
+            self.concurrency,
+            max(1, max_bytes_in_flight // (2 * len(device_config) or 1)),
+        )
+        config, device_config = new_pipeline_config(p4info, device_config, cookie)
+        if skip_if_unchanged:
+            return await self.fan_out(
+                lambda client: client._set_fwd_pipeline_if_changed(
+                    config, action, elems_info=elems_info, device_config=device_config
+                ),
+                host_devices,
+                concurrency=concurrency,
+            )
+        return await self.fan_out(
+            lambda client: client._set_fwd_pipeline(
+                config, action, elems_info=elems_info, device_config=device_config
+            ),
+            host_devices,
+            concurrency=concurrency,
+        )
+
+    async def insert_entity(
+        self, *entities: p4r_pb2.Entity, host_devices: Optional[Iterable[str]] = None
+    ) -> dict[str, p4r_pb2.WriteResponse | BaseException]:
+        """Insert the same entities on each device."""
+        return await self.fan_out(
+            lambda client: client.insert_entity(*entities), host_devices
+        )
+
+    async def modify_entity(
+        self, *entities: p4r_pb2.Entity, host_devices: Optional[Iterable[str]] = None
+    ) -> dict[str, p4r_pb2.WriteResponse | BaseException]:
+        """Modify the same entities on each device."""
+        return await self.fan_out(
+            lambda client: client.modify_entity(*entities), host_devices
+        )
+
+    async def delete_entity(
+        self, *entities: p4r_pb2.Entity, host_devices: Optional[Iterable[str]] = None
+    ) -> dict[str, p4r_pb2.WriteResponse | BaseException]:
+        """Delete the same entities on each device."""
+        return await self.fan_out(
+            lambda client: client.delete_entity(*entities), host_devices
+        )
+
+    async def read_counters(
+        self,
+        counter: str,
+        index: Optional[int] = None,
+        host_devices: Optional[Iterable[str]] = None,
+    ) -> dict[str, list[p4r_pb2.CounterEntry] | BaseException]:
+        """Read the cells of a counter array of each device."""
+
+        async def read(client: Client) -> list[p4r_pb2.CounterEntry]:
+            return [
+                entity.counter_entry
+                async for entity in client.read_counter_entries(counter, index)
+            ]
+
+        return await self.fan_out(read, host_devices)
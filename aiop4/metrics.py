@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Callable, Mapping, Optional
+
+from .queues import StreamQueue
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+UPDATES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """Histogram.
+
+    Counts of observed values by upper bound bucket, plus their sum and
+    count, exported as cumulative Prometheus buckets.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Observe a value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Cumulative counts by upper bound, the last bound being +Inf."""
+        total, cumulative = 0, []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+    def snapshot(self) -> dict[str, Any]:
+        """Snapshot of the histogram."""
+        return {"buckets": self.cumulative(), "sum": self.sum, "count": self.count}
+
+
+class Metrics:
+    """Metrics.
+
+    This class is responsible for recording the metrics of a Client: latency
+    histograms and errors per RPC, updates per WriteRequest, bytes sent per
+    RPC and stream messages received per update type. Queue depths and drops
+    are read from the Client queues when a snapshot is taken.
+
+    A Client only records metrics once they're enabled, otherwise recording
+    costs a single None check.
+    """
+
+    def __init__(self, queues: Optional[Mapping[str, StreamQueue]] = None) -> None:
+        """Metrics."""
+        self.queues = queues if queues is not None else {}
+        self.rpc_latency: dict[str, Histogram] = {}
+        self.rpc_errors: Counter[str] = Counter()
+        self.updates_per_write = Histogram(UPDATES_BUCKETS)
+        self.bytes_sent: Counter[str] = Counter()
+        self.stream_messages: Counter[str] = Counter()
+
+    def observe_rpc(
+        self, rpc: str, latency: float, *, error=False, bytes_sent=0
+    ) -> None:
+        """Record an RPC latency in seconds, and whether it failed."""
+        try:
+            histogram = self.rpc_latency[rpc]
+        except KeyError:
+            histogram = self.rpc_latency[rpc] = Histogram()
+        histogram.observe(latency)
+        if error:
+            self.rpc_errors[rpc] += 1
+        if bytes_sent:
+            self.bytes_sent[rpc] += bytes_sent
+
+    def snapshot(self) -> dict[str, Any]:
+        """In-memory snapshot of every metric."""
+        return {
+            "rpc_latency_seconds": {
+                rpc: histogram.snapshot() for rpc, histogram in self.rpc_latency.items()
+            },
+            "rpc_errors": dict(self.rpc_errors),
+            "updates_per_write": self.updates_per_write.snapshot(),
+            "bytes_sent": dict(self.bytes_sent),
+            "stream_messages_received": dict(self.stream_messages),
+            "queue_depth": {name: queue.qsize() for name, queue in self.queues.items()},
+            "queue_drops": {name: queue.drops for name, queue in self.queues.items()},
+        }
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def _bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+COUNTER_FAMILIES = (
+    ("rpc_errors_total", "counter", "Failed RPCs.", "rpc", "rpc_errors"),
+    ("bytes_sent_total", "counter", "Bytes sent.", "rpc", "bytes_sent"),
+    (
+        "stream_messages_received_total",
+        "counter",
+        "Stream messages received.",
+        "type",
+        "stream_messages_received",
+    ),
+    ("queue_depth", "gauge", "Queued stream messages.", "queue", "queue_depth"),
+    (
+        "queue_drops_total",
+        "counter",
+        "Dropped stream messages.",
+        "queue",
+        "queue_drops",
+    ),
+)
+
+
+def prometheus_text(metrics: Mapping[str, Metrics], prefix="aiop4") -> str:
+    """Render the metrics of each host_device in the Prometheus text format."""
+    families: dict[str, tuple[str, str, list[str]]] = {}
+
+    def add(name: str, kind: str, help_: str, suffix: str, labels: dict, value) -> None:
+        label_str = _labels(**labels)
+        family = families.setdefault(f"{prefix}_{name}", (kind, help_, []))
+        family[2].append(f"{prefix}_{name}{suffix}{{{label_str}}} {value}")
+
+    for device, device_metrics in metrics.items():
+        snapshot = device_metrics.snapshot()
+        histograms = [
+            ("rpc_latency_seconds", "RPC latency.", {"rpc": rpc}, histogram)
+            for rpc, histogram in snapshot["rpc_latency_seconds"].items()
+        ]
+        histograms.append(
+            (
+                "updates_per_write",
+                "Updates per WriteRequest.",
+                {},
+                snapshot["updates_per_write"],
+            )
+        )
+        for name, help_, labels, histogram in histograms:
+            labels = {"device": device, **labels}
+            for bound, count in histogram["buckets"]:
+                bucket_labels = {**labels, "le": _bound(bound)}
+                add(name, "histogram", help_, "_bucket", bucket_labels, count)
+            add(name, "histogram", help_, "_sum", labels, histogram["sum"])
+            add(name, "histogram", help_, "_count", labels, histogram["count"])
+        for name, kind, help_, label, values in COUNTER_FAMILIES:
+            for key, value in snapshot[values].items():
+                add(name, kind, help_, "", {"device": device, label: key}, value)
+
+    lines = []
+    for name, (kind, help_, samples) in families.items():
+        lines.append(f"# HELP {name} {help_}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+async def start_prometheus_server(
+    get_metrics: Callable[[], Mapping[str, Metrics]], host="0.0.0.0", port=9100
+) -> asyncio.AbstractServer:
+    """Serve the Prometheus text format of get_metrics() over HTTP."""
+
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            await reader.readuntil(b"\r\n\r\n")
+            body = prometheus_text(get_metrics()).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                + f"Content-Length: {len(body)}\r\n".encode()
+                + b"Connection: close\r\n\r\n"
+                + body
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError) as exc:
+            log.debug(f"Metrics request failed: {exc!r}")
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,74 @@
+from typing import NamedTuple, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .elems_info import ElementsP4Info
+from .encoding import Value, encode
+
+
+class PacketIn(NamedTuple):
+    """Decoded PacketIn: payload and metadata values by name."""
+
+    payload: bytes
+    metadata: dict[str, int]
+
+
+class PacketOutEncoder:
+    """PacketOutEncoder.
+
+    This class is responsible for encoding PacketOut messages with metadata
+    given by name, as declared in the packet_out controller_packet_metadata.
+    """
+
+    def __init__(self, elems_info: ElementsP4Info, name="packet_out") -> None:
+        """PacketOutEncoder."""
+        self.metadata: dict[str, tuple[int, int]] = {
+            metadata.name: (metadata.id, metadata.bitwidth)
+            for metadata in elems_info.controller_packet_metadata[name].metadata
+        }
+
+    def encode(
+        self, payload: bytes, metadata: Optional[dict[str, Value]] = None
+    ) -> p4r_pb2.StreamMessageRequest:
+        """Encode a PacketOut StreamMessageRequest.
+
+        Metadata values are encoded as canonical bytestrings of their bitwidth.
+        """
+        req = p4r_pb2.StreamMessageRequest()
+        packet = req.packet
+        packet.payload = payload
+        for name, value in (metadata or {}).items():
+            metadata_id, bitwidth = self.metadata[name]
+            packet_metadata = packet.metadata.add()
+            packet_metadata.metadata_id = metadata_id
+            packet_metadata.value = encode(value, bitwidth)
+        return req
+
+
+class PacketInDecoder:
+    """PacketInDecoder.
+
+    This class is responsible for decoding PacketIn metadata into ints by name
+    with a precomputed metadata id to name table of the packet_in
+    controller_packet_metadata. Unknown metadata ids are decoded by their id.
+    """
+
+    def __init__(self, elems_info: ElementsP4Info, name="packet_in") -> None:
+        """PacketInDecoder."""
+        self.metadata_names: dict[int, str] = {
+            metadata.id: metadata.name
+            for metadata in elems_info.controller_packet_metadata[name].metadata
+        }
+
+    def decode(self, packet: p4r_pb2.PacketIn) -> PacketIn:
+        """Decode a PacketIn."""
+        names = self.metadata_names
+        return PacketIn(
+            packet.payload,
+            {
+                names.get(metadata.metadata_id, str(metadata.metadata_id)): (
+                    int.from_bytes(metadata.value, "big")
+                )
+                for metadata in packet.metadata
+            },
+        )
@@ -0,0 +1,317 @@
+import asyncio
+import inspect
+import logging
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    Optional,
+)
+
+from .shadow import table_entry_key
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = ("byte_count", "packet_count")
+METER_COLUMNS = tuple(
+    f"{color}_{column}"
+    for color in ("green", "yellow", "red")
+    for column in COUNTER_COLUMNS
+)
+POLL_KINDS = ("counters", "direct_counters", "meters", "direct_meters")
+
+DeltaHandler = Callable[[list["CounterDelta"]], Optional[Awaitable[Any]]]
+
+
+def new_column(size: int) -> array:
+    """Zeroed array of size unsigned 64 bit cells."""
+    return array("Q", bytes(8 * size))
+
+
+def column_deltas(current: array, previous: array) -> array:
+    """Per cell deltas of two columns.
+
+    A cell that went backwards was reset, so its delta is its current value.
+    """
+    if np is not None:
+        cur = np.frombuffer(current, dtype=np.uint64)
+        prev = np.frombuffer(previous, dtype=np.uint64)
+        return array("Q", np.where(cur >= prev, cur - prev, cur).tobytes())
+    return array(
+        "Q",
+        [cur - prev if cur >= prev else cur for cur, prev in zip(current, previous)],
+    )
+
+
+@dataclass
+class CounterSample:
+    """Every cell of a counter or meter, one array per column, at timestamp."""
+
+    timestamp: float
+    columns: dict[str, array]
+
+
+@dataclass
+class CounterDelta:
+    """CounterDelta.
+
+    Per cell deltas of the columns of a counter or meter of a device over
+    interval seconds. Cells of indirect counters and meters are their indexes,
+    cells of direct ones are slots, and ``keys`` maps each slot to the
+    table_entry_key of its table entry, or None if the slot is free.
+    """
+
+    host_device: str
+    kind: str
+    name: str
+    interval: float
+    columns: dict[str, array]
+    keys: Optional[list[Optional[tuple[int, bytes]]]] = None
+
+    def rates(self, column: str) -> array:
+        """Per cell rates per second of a column."""
+        deltas = self.columns[column]
+        if not self.interval:
+            return array("d", bytes(8 * len(deltas)))
+        if np is not None:
+            return array(
+                "d",
+                (np.frombuffer(deltas, dtype=np.uint64) / self.interval).tobytes(),
+            )
+        return array("d", [delta / self.interval for delta in deltas])
+
+
+@dataclass
+class _Slots:
+    """Slots of the table entries of a direct counter or meter."""
+
+    by_key: dict[tuple[int, bytes], int] = field(default_factory=dict)
+    keys: list[Optional[tuple[int, bytes]]] = field(default_factory=list)
+    free: list[int] = field(default_factory=list)
+
+    def get(self, key: tuple[int, bytes]) -> int:
+        try:
+            return self.by_key[key]
+        except KeyError:
+            pass
+        if self.free:
+            slot = self.free.pop()
+            self.keys[slot] = key
+        else:
+            slot = len(self.keys)
+            self.keys.append(key)
+        self.by_key[key] = slot
+        return slot
+
+    def release(self, seen: set[int]) -> None:
+        """Free the slots that weren't seen."""
+        for slot, key in enumerate(self.keys):
+            if key is not None and slot not in seen:
+                del self.by_key[key]
+                self.keys[slot] = None
+                self.free.append(slot)
+
+
+class CounterPoller:
+    """CounterPoller.
+
+    This class is responsible for periodically reading counters and meters of
+    many Clients, at most ``concurrency`` reads in flight, and computing the
+    per cell deltas and rates of their byte and packet counts.
+
+    The last sample of each counter and meter is kept in arrays, one per
+    column, so counters with hundreds of thousands of cells don't keep a
+    Python object per cell. Deltas are computed with NumPy if it's installed.
+
+    Each poll round returns a CounterDelta per counter and meter of every
+    device that was polled at least twice. Rounds can be consumed with
+    ``async for deltas in poller`` or by handlers once the poller is started.
+    """
+
+    def __init__(
+        self,
+        clients: Iterable["Client"] | Mapping[str, "Client"],
+        *,
+        interval=1.0,
+        concurrency=32,
+    ) -> None:
+        """CounterPoller."""
+        self.clients = clients
+        self.interval = interval
+        self.concurrency = concurrency
+        self.targets: list[tuple[str, str]] = []
+
+        self._samples: dict[tuple[str, str, str], CounterSample] = {}
+        self._slots: dict[tuple[str, str, str], _Slots] = {}
+        self._handlers: list[DeltaHandler] = []
+        self._poller_task: Optional[asyncio.Task] = None
+
+    def add(self, kind: str, name: str) -> None:
+        """Poll a counter, direct counter, meter or direct meter by name."""
+        if kind not in POLL_KINDS:
+            raise ValueError(f"Unsupported kind {kind}, expected one of {POLL_KINDS}")
+        self.targets.append((kind, name))
+
+    def add_handler(self, handler: DeltaHandler) -> None:
+        """Add a handler of the deltas of each poll round."""
+        self._handlers.append(handler)
+
+    def _clients(self) -> list["Client"]:
+        if isinstance(self.clients, Mapping):
+            return list(self.clients.values())
+        return list(self.clients)
+
+    async def poll(self) -> list[CounterDelta]:
+        """Poll every target of every client once."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(client: "Client", kind: str, name: str) -> Optional[CounterDelta]:
+            async with semaphore:
+                return await self._poll_one(client, kind, name)
+
+        polls = [
+            (client, kind, name)
+            for client in self._clients()
+            for kind, name in self.targets
+        ]
+        results = await asyncio.gather(
+            *[run(*args) for args in polls], return_exceptions=True
+        )
+        deltas = []
+        for (client, kind, name), result in zip(polls, results):
+            if isinstance(result, BaseException):
+                log.warning(
+                    f"Failed to poll {kind} {name} of {client.host_device}: {result!r}"
+                )
+            elif result is not None:
+                deltas.append(result)
+        return deltas
+
+    async def _poll_one(
+        self, client: "Client", kind: str, name: str
+    ) -> Optional[CounterDelta]:
+        key = (client.host_device, kind, name)
+        sample = await self._read(client, kind, name, key)
+        previous = self._samples.get(key)
+        self._samples[key] = sample
+        if previous is None:
+            return None
+        columns = {}
+        for column, values in sample.columns.items():
+            previous_values = previous.columns[column]
+            if len(previous_values) < len(values):
+                previous_values = previous_values + new_column(
+                    len(values) - len(previous_values)
+                )
+            elif len(previous_values) > len(values):
+                previous_values = previous_values[: len(values)]
+            columns[column] = column_deltas(values, previous_values)
+        slots = self._slots.get(key)
+        return CounterDelta(
+            client.host_device,
+            kind,
+            name,
+            sample.timestamp - previous.timestamp,
+            columns,
+            list(slots.keys) if slots else None,
+        )
+
+    async def _read(
+        self, client: "Client", kind: str, name: str, key: tuple[str, str, str]
+    ) -> CounterSample:
+        elems_info = client.elems_info
+        info = getattr(elems_info, kind)[name]
+        is_meter = kind.endswith("meters")
+        match kind:
+            case "counters":
+                size = info.size
+                entities = client.read_counter_entries(name)
+            case "meters":
+                size = info.size
+                entities = client.read_meter_entries(name)
+            case "direct_counters":
+                table = elems_info.ids[info.direct_table_id]
+                size = table.size
+                entities = client.read_direct_counter_entries(table.preamble.name)
+            case _:
+                table = elems_info.ids[info.direct_table_id]
+                size = table.size
+                entities = client.read_direct_meter_entries(table.preamble.name)
+
+        columns = {
+            column: new_column(size)
+            for column in (METER_COLUMNS if is_meter else COUNTER_COLUMNS)
+        }
+        slots = (
+            self._slots.setdefault(key, _Slots()) if kind.startswith("direct") else None
+        )
+        seen: set[int] = set()
+        async for entity in entities:
+            entry = getattr(entity, entity.WhichOneof("entity"))
+            if slots is not None:
+                cell = slots.get(table_entry_key(entry.table_entry))
+                seen.add(cell)
+            else:
+                cell = entry.index.index
+            if cell >= size:
+                for column in columns.values():
+                    column.extend(new_column(cell + 1 - len(column)))
+                size = cell + 1
+            if is_meter:
+                data = entry.counter_data
+                for color in ("green", "yellow", "red"):
+                    color_data = getattr(data, color)
+                    columns[f"{color}_byte_count"][cell] = color_data.byte_count
+                    columns[f"{color}_packet_count"][cell] = color_data.packet_count
+            else:
+                columns["byte_count"][cell] = entry.data.byte_count
+                columns["packet_count"][cell] = entry.data.packet_count
+        if slots is not None:
+            slots.release(seen)
+        return CounterSample(time.monotonic(), columns)
+
+    async def __aiter__(self) -> AsyncIterator[list[CounterDelta]]:
+        """Poll every interval seconds forever, yielding the deltas of each round."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            yield await self.poll()
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    async def run(self) -> None:
+        """Poll forever, passing the deltas of each round to the handlers."""
+        async for deltas in self:
+            for handler in self._handlers:
+                try:
+                    result = handler(deltas)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as exc:
+                    log.exception(f"Counter delta handler failed: {exc}")
+
+    def start(self) -> asyncio.Task:
+        """Start polling."""
+        if not self._poller_task or self._poller_task.done():
+            self._poller_task = asyncio.create_task(self.run())
+        return self._poller_task
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._poller_task:
+            self._poller_task.cancel()
+            self._poller_task = None
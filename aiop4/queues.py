@@ -0,0 +1,45 @@
+import asyncio
+from enum import Enum
+from typing import Any
+
+STREAM_UPDATE_TYPES = (
+    "arbitration",
+    "packet",
+    "digest",
+    "idle_timeout_notification",
+    "other",
+    "error",
+)
+
+
+class OverflowPolicy(str, Enum):
+    """What a full StreamQueue does with a new item."""
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+class StreamQueue(asyncio.Queue):
+    """StreamQueue.
+
+    asyncio.Queue with an OverflowPolicy applied by put when the queue is full.
+    BLOCK waits for a free slot, DROP_OLDEST discards the oldest queued item and
+    DROP_NEWEST discards the new item. Discarded items are counted in drops.
+    """
+
+    def __init__(self, maxsize=0, policy=OverflowPolicy.BLOCK) -> None:
+        """StreamQueue."""
+        super().__init__(maxsize)
+        self.policy = OverflowPolicy(policy)
+        self.drops = 0
+
+    async def put(self, item: Any) -> None:
+        """Put an item applying the overflow policy if the queue is full."""
+        if not self.full() or self.policy == OverflowPolicy.BLOCK:
+            return await super().put(item)
+        self.drops += 1
+        if self.policy == OverflowPolicy.DROP_OLDEST:
+            self.get_nowait()
+            self.task_done()
+            self.put_nowait(item)
@@ -0,0 +1,72 @@
+import random
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator
+
+from google.rpc import code_pb2
+from grpc.aio import AioRpcError
+
+from .utils import decode_write_errors
+
+
+class OutagePolicy(str, Enum):
+    """What writes do while a Client is reconnecting."""
+
+    BUFFER = "buffer"
+    REJECT = "reject"
+
+
+@dataclass
+class ReconnectPolicy:
+    """ReconnectPolicy.
+
+    Exponential backoff with jitter of a Client reconnecting its stream channel.
+    The n-th attempt waits ``initial_backoff * multiplier ** (n - 1)``, capped
+    at ``max_backoff`` and randomized by +/- ``jitter``, for up to
+    ``max_attempts`` attempts, or forever if it's 0.
+
+    While reconnecting, writes either wait up to ``buffer_timeout`` seconds for
+    the Client to be primary again (BUFFER) or are rejected (REJECT). If
+    ``replay_state`` is set, the Client's shadow store is reconciled once it's
+    primary again.
+
+    Only RPC errors whose codes, or whose per-update error codes, are all
+    ``retry_codes`` are retried, any other error stops reconnecting.
+    """
+
+    initial_backoff: float = 0.5
+    max_backoff: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.2
+    max_attempts: int = 0
+    arbitration_timeout: float = 5.0
+    outage_policy: OutagePolicy = OutagePolicy.BUFFER
+    buffer_timeout: float = 30.0
+    replay_state: bool = False
+    retry_codes: frozenset[int] = frozenset(
+        (
+            code_pb2.UNAVAILABLE,
+            code_pb2.DEADLINE_EXCEEDED,
+            code_pb2.ABORTED,
+            code_pb2.RESOURCE_EXHAUSTED,
+        )
+    )
+
+    def delays(self) -> Iterator[float]:
+        """Iterate over the delay before each reconnection attempt."""
+        attempt, backoff = 0, self.initial_backoff
+        while not self.max_attempts or attempt < self.max_attempts:
+            attempt += 1
+            yield min(backoff, self.max_backoff) * random.uniform(
+                1 - self.jitter, 1 + self.jitter
+            )
+            backoff *= self.multiplier
+
+    def is_transient(self, exc: AioRpcError) -> bool:
+        """Whether an RPC error is transient, so it's worth retrying."""
+        codes = [
+            error.canonical_code
+            for error in decode_write_errors(exc)
+            if error.canonical_code != code_pb2.OK
+        ] or [exc.code().value[0]]
+        return all(code in self.retry_codes for code in codes)
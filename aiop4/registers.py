@@ -0,0 +1,113 @@
+from array import array
+from itertools import count
+from typing import AsyncIterator, Iterable, Iterator, Mapping
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from p4.config.v1 import p4info_pb2
+
+from .encoding import Value, encode, encode_many, to_int
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+RegisterCells = array | list[int]
+"""Values of register cells, an array of 64 bit cells unless they're wider."""
+
+
+def register_type(info: p4info_pb2.Register) -> tuple[int, bool]:
+    """Bitwidth of the cells of a register and whether they're signed.
+
+    Only bit<W> and int<W> cells are supported, raising ValueError otherwise.
+    """
+    bitstring = info.type_spec.bitstring
+    match bitstring.WhichOneof("type_spec"):
+        case "bit":
+            return bitstring.bit.bitwidth, False
+        case "int":
+            return bitstring.int.bitwidth, True
+    raise ValueError(
+        f"Unsupported type of register {info.preamble.name}, "
+        "only bit<W> and int<W> registers are"
+    )
+
+
+def new_cells(size: int, bitwidth: int, signed=False) -> RegisterCells:
+    """Zeroed cells of a register."""
+    if bitwidth <= 64:
+        return array("q" if signed else "Q", bytes(8 * size))
+    return [0] * size
+
+
+async def decode_cells(
+    entities: AsyncIterator[p4r_pb2.Entity],
+    start: int,
+    stop: int,
+    bitwidth: int,
+    signed=False,
+) -> RegisterCells:
+    """Decode the register entries of cells start to stop into compact cells.
+
+    Entries of other cells are skipped, so a wildcard read can be sliced.
+    """
+    cells = new_cells(stop - start, bitwidth, signed)
+    sign_bit = 1 << (bitwidth - 1)
+    from_bytes = int.from_bytes
+    async for entity in entities:
+        entry = entity.register_entry
+        cell = entry.index.index - start
+        if not 0 <= cell < len(cells):
+            continue
+        value = from_bytes(entry.data.bitstring, "big")
+        if signed and value & sign_bit:
+            value -= sign_bit << 1
+        cells[cell] = value
+    return cells
+
+
+def to_twos_complement(value: Value, bitwidth: int) -> int:
+    """Two's complement of a value of an int<bitwidth> cell.
+
+    Raises ValueError if the value doesn't fit in int<bitwidth>.
+    """
+    number = to_int(value)
+    limit = 1 << (bitwidth - 1)
+    if not -limit <= number < limit:
+        raise ValueError(f"Value {value!r} doesn't fit in int<{bitwidth}>")
+    return number & ((limit << 1) - 1)
+
+
+def cell_entities(
+    register_id: int,
+    values: Iterable[Value] | Mapping[int, Value],
+    start: int,
+    bitwidth: int,
+    signed=False,
+) -> Iterator[p4r_pb2.Entity]:
+    """Register entry entities of values of cells from start, or by index.
+
+    Signed values are encoded in two's complement, raising ValueError if
+    they're out of range. NumPy arrays of integers
+    are encoded with vectorized operations.
+    """
+    if isinstance(values, Mapping):
+        indexes: Iterable[int] = values.keys()
+        values = values.values()
+    else:
+        indexes = None
+    if signed:
+        values = [to_twos_complement(value, bitwidth) for value in values]
+    if np is not None and isinstance(values, np.ndarray):
+        bitstrings = iter(encode_many(values, bitwidth))
+    else:
+        bitstrings = (encode(value, bitwidth) for value in values)
+    if indexes is None:
+        indexes = count(start)
+    for index, bitstring in zip(indexes, bitstrings):
+        entity = p4r_pb2.Entity()
+        entry = entity.register_entry
+        entry.register_id = register_id
+        entry.index.index = index
+        entry.data.bitstring = bitstring
+        yield entity
@@ -0,0 +1,251 @@
+import logging
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .batching import BulkWriteResult
+
+if TYPE_CHECKING:
+    from .client import Client
+
+log = logging.getLogger(__name__)
+
+Replica = tuple[int, int]
+"""(egress_port, instance) of a replica."""
+
+MULTICAST = "multicast_group_entry"
+CLONE = "clone_session_entry"
+
+
+@dataclass(frozen=True)
+class CloneSession:
+    """Replicas of a clone session, with its class of service and truncation."""
+
+    replicas: tuple[Replica, ...]
+    class_of_service: int = 0
+    packet_length_bytes: int = 0
+
+
+@dataclass
+class ReplicaDiff:
+    """Replicas added to and removed from an installed group or session."""
+
+    added: list[Replica]
+    removed: list[Replica]
+
+
+def to_replicas(
+    ports: Iterable[int | Replica], current: Iterable[Replica] = ()
+) -> tuple[Replica, ...]:
+    """Replicas of ports or (port, instance) pairs.
+
+    A port keeps the instance of its current replica, if any, otherwise its
+    instance is 0, so changing the ports of a group doesn't renumber the
+    replicas of the ports that stay.
+    """
+    instances = {port: instance for port, instance in current}
+    replicas: dict[Replica, None] = {}
+    for port in ports:
+        if isinstance(port, tuple):
+            replicas[port] = None
+        else:
+            replicas[(port, instances.get(port, 0))] = None
+    return tuple(replicas)
+
+
+class ReplicationManager:
+    """ReplicationManager.
+
+    This class is responsible for managing the multicast groups and clone
+    sessions of the packet replication engine of a Client. Groups and sessions
+    are changed in a local desired model, and commit writes only the ones that
+    differ from what's installed, batching the inserts, modifies and deletes
+    of many groups into as few WriteRequests as possible, so updating the
+    flooding domains of thousands of groups doesn't cost an RPC each.
+
+    Only updates that succeeded are recorded as installed, so a later commit
+    retries the others.
+    """
+
+    def __init__(self, client: "Client") -> None:
+        """ReplicationManager."""
+        self.client = client
+        self.multicast_groups: dict[int, tuple[Replica, ...]] = {}
+        self.clone_sessions: dict[int, CloneSession] = {}
+
+        self._installed: dict[tuple[str, int], tuple[Replica, ...] | CloneSession] = {}
+
+    def set_multicast_group(self, mgid: int, ports: Iterable[int | Replica]) -> None:
+        """Set the replicas of a multicast group."""
+        current = self.multicast_groups.get(mgid, ())
+        self.multicast_groups[mgid] = to_replicas(ports, current)
+
+    def add_ports(self, mgid: int, ports: Iterable[int | Replica]) -> None:
+        """Add ports to a multicast group, creating it if it doesn't exist."""
+        current = self.multicast_groups.get(mgid, ())
+        self.multicast_groups[mgid] = to_replicas((*current, *ports), current)
+
+    def remove_ports(self, mgid: int, ports: Iterable[int]) -> None:
+        """Remove every replica of ports from a multicast group."""
+        removed = set(ports)
+        self.multicast_groups[mgid] = tuple(
+            replica
+            for replica in self.multicast_groups[mgid]
+            if replica[0] not in removed
+        )
+
+    def delete_multicast_group(self, mgid: int) -> None:
+        """Delete a multicast group."""
+        del self.multicast_groups[mgid]
+
+    def set_clone_session(
+        self,
+        session_id: int,
+        ports: Iterable[int | Replica],
+        *,
+        class_of_service=0,
+        packet_length_bytes=0,
+    ) -> None:
+        """Set the replicas of a clone session."""
+        current = self.clone_sessions.get(session_id)
+        replicas = to_replicas(ports, current.replicas if current else ())
+        self.clone_sessions[session_id] = CloneSession(
+            replicas, class_of_service, packet_length_bytes
+        )
+
+    def delete_clone_session(self, session_id: int) -> None:
+        """Delete a clone session."""
+        del self.clone_sessions[session_id]
+
+    def _desired(self) -> dict[tuple[str, int], tuple[Replica, ...] | CloneSession]:
+        desired: dict[tuple[str, int], tuple[Replica, ...] | CloneSession] = {
+            (MULTICAST, mgid): replicas
+            for mgid, replicas in self.multicast_groups.items()
+        }
+        for session_id, session in self.clone_sessions.items():
+            desired[(CLONE, session_id)] = session
+        return desired
+
+    @staticmethod
+    def _replicas(state: tuple[Replica, ...] | CloneSession) -> tuple[Replica, ...]:
+        return state.replicas if isinstance(state, CloneSession) else state
+
+    @classmethod
+    def _changed(cls, state, installed) -> bool:
+        if isinstance(state, CloneSession) and (
+            state.class_of_service != installed.class_of_service
+            or state.packet_length_bytes != installed.packet_length_bytes
+        ):
+            return True
+        return set(cls._replicas(state)) != set(cls._replicas(installed))
+
+    def pending(self) -> dict[int, list[tuple[str, int]]]:
+        """Pending (kind, id) of groups and sessions by update type."""
+        Type = p4r_pb2.Update.Type
+        desired, installed = self._desired(), self._installed
+        pending: dict[int, list[tuple[str, int]]] = {
+            Type.INSERT: [],
+            Type.MODIFY: [],
+            Type.DELETE: [],
+        }
+        for key, state in desired.items():
+            if key not in installed:
+                pending[Type.INSERT].append(key)
+            elif self._changed(state, installed[key]):
+                pending[Type.MODIFY].append(key)
+        for key in installed:
+            if key not in desired:
+                pending[Type.DELETE].append(key)
+        return pending
+
+    def replica_diffs(self) -> dict[tuple[str, int], ReplicaDiff]:
+        """Replica diffs of the installed groups and sessions that changed."""
+        diffs = {}
+        desired = self._desired()
+        for key in self.pending()[p4r_pb2.Update.Type.MODIFY]:
+            replicas = self._replicas(desired[key])
+            installed = self._replicas(self._installed[key])
+            diffs[key] = ReplicaDiff(
+                [replica for replica in replicas if replica not in installed],
+                [replica for replica in installed if replica not in replicas],
+            )
+        return diffs
+
+    @classmethod
+    def _entity(
+        cls, key: tuple[str, int], state: tuple[Replica, ...] | CloneSession
+    ) -> p4r_pb2.Entity:
+        kind, _id = key
+        entity = p4r_pb2.Entity()
+        pre_entry = entity.packet_replication_engine_entry
+        if kind == MULTICAST:
+            entry = pre_entry.multicast_group_entry
+            entry.multicast_group_id = _id
+        else:
+            entry = pre_entry.clone_session_entry
+            entry.session_id = _id
+            entry.class_of_service = state.class_of_service
+            entry.packet_length_bytes = state.packet_length_bytes
+        for port, instance in cls._replicas(state):
+            entry.replicas.add(egress_port=port, instance=instance)
+        return entity
+
+    async def commit(self) -> dict[str, BulkWriteResult]:
+        """Write the pending group and session updates.
+
+        Inserts, modifies and deletes are each written with Client.write_bulk,
+        returning their BulkWriteResult by update type name.
+        """
+        desired, installed = self._desired(), self._installed
+        results = {}
+        for op_type, keys in self.pending().items():
+            if not keys:
+                continue
+            entities = [
+                self._entity(key, desired.get(key, installed.get(key))) for key in keys
+            ]
+            result = await self.client.write_bulk(entities, op_type)
+            for i, key in enumerate(keys):
+                if i in result.errors:
+                    continue
+                if op_type == p4r_pb2.Update.Type.DELETE:
+                    del installed[key]
+                else:
+                    installed[key] = desired[key]
+            name = p4r_pb2.Update.Type.Name(op_type).lower()
+            if not result.ok:
+                log.warning(
+                    f"Failed {len(result.errors)} of {result.total} replication "
+                    f"{name} updates of {self.client.host_device}"
+                )
+            results[name] = result
+        return results
+
+    async def sync(self) -> None:
+        """Replace the local model with the groups and sessions of the device."""
+        self.multicast_groups.clear()
+        self.clone_sessions.clear()
+        async for entity in self.client.read_entities(
+            p4r_pb2.Entity(
+                packet_replication_engine_entry=p4r_pb2.PacketReplicationEngineEntry(
+                    multicast_group_entry=p4r_pb2.MulticastGroupEntry()
+                )
+            ),
+            p4r_pb2.Entity(
+                packet_replication_engine_entry=p4r_pb2.PacketReplicationEngineEntry(
+                    clone_session_entry=p4r_pb2.CloneSessionEntry()
+                )
+            ),
+        ):
+            pre_entry = entity.packet_replication_engine_entry
+            kind = pre_entry.WhichOneof("type")
+            entry = getattr(pre_entry, kind)
+            replicas = tuple((r.egress_port, r.instance) for r in entry.replicas)
+            if kind == MULTICAST:
+                self.multicast_groups[entry.multicast_group_id] = replicas
+            else:
+                self.clone_sessions[entry.session_id] = CloneSession(
+                    replicas, entry.class_of_service, entry.packet_length_bytes
+                )
+        self._installed = self._desired()
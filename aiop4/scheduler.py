@@ -0,0 +1,153 @@
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Mapping, Optional
+
+
+class WritePriority(str, Enum):
+    """Priority class of a WriteRequest."""
+
+    CRITICAL = "critical"
+    NORMAL = "normal"
+    BULK = "bulk"
+
+
+class WriteScheduler:
+    """WriteScheduler.
+
+    This class is responsible for ordering the WriteRequests of a Client by
+    priority class, so latency sensitive writes aren't queued behind bulk
+    loads. At most ``concurrency`` WriteRequests are in flight, CRITICAL ones
+    are dispatched as soon as they're submitted, and NORMAL and BULK ones are
+    interleaved by ``weights``, the share of WriteRequests each class gets
+    while both are waiting, so bulk loads keep progressing at full throughput
+    when nothing else is waiting.
+
+    ``max_updates_per_sec`` optionally rate limits the updates of a class,
+    its WriteRequests wait until the class is back within its rate.
+    """
+
+    def __init__(
+        self,
+        concurrency=4,
+        *,
+        weights: Optional[Mapping[WritePriority, float]] = None,
+        max_updates_per_sec: Optional[Mapping[WritePriority, float]] = None,
+    ) -> None:
+        """WriteScheduler."""
+        self.concurrency = concurrency
+        self.weights = {WritePriority.NORMAL: 4.0, WritePriority.BULK: 1.0}
+        self.weights.update(weights or {})
+        self.max_updates_per_sec = dict(max_updates_per_sec or {})
+        self.in_flight = 0
+        self.dispatched: Counter[WritePriority] = Counter()
+        self.wait_seconds: Counter[WritePriority] = Counter()
+
+        self._waiting: dict[WritePriority, deque[tuple[asyncio.Future, int]]] = {
+            priority: deque() for priority in WritePriority
+        }
+        self._pass = {priority: 0.0 for priority in WritePriority}
+        self._vtime = 0.0
+        self._next_allowed = {priority: 0.0 for priority in WritePriority}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @asynccontextmanager
+    async def slot(
+        self, priority=WritePriority.NORMAL, num_updates=1
+    ) -> AsyncIterator[None]:
+        """Wait for a slot to send a WriteRequest of num_updates updates."""
+        priority = WritePriority(priority)
+        await self._acquire(priority, num_updates)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def qsize(self, priority: Optional[WritePriority] = None) -> int:
+        """Number of WriteRequests waiting, of a class or of every class."""
+        if priority is not None:
+            return len(self._waiting[WritePriority(priority)])
+        return sum(len(waiting) for waiting in self._waiting.values())
+
+    def _can_send(self, priority: WritePriority, now: float) -> bool:
+        return self._next_allowed[priority] <= now and (
+            priority == WritePriority.CRITICAL or self.in_flight < self.concurrency
+        )
+
+    def _grant(self, priority: WritePriority, num_updates: int, now: float) -> None:
+        self.in_flight += 1
+        self.dispatched[priority] += 1
+        if priority != WritePriority.CRITICAL:
+            self._vtime = self._pass[priority]
+            self._pass[priority] += 1 / self.weights[priority]
+        rate = self.max_updates_per_sec.get(priority)
+        if rate:
+            self._next_allowed[priority] = (
+                max(self._next_allowed[priority], now) + num_updates / rate
+            )
+
+    async def _acquire(self, priority: WritePriority, num_updates: int) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        waiting = self._waiting[priority]
+        if not waiting:
+            self._pass[priority] = max(self._pass[priority], self._vtime)
+            if self._can_send(priority, now):
+                self._grant(priority, num_updates, now)
+                return
+
+        future = loop.create_future()
+        waiting.append((future, num_updates))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._dispatch()
+            else:
+                self._discard(priority, future)
+            raise
+        self.wait_seconds[priority] += loop.time() - now
+
+    def _discard(self, priority: WritePriority, future: asyncio.Future) -> None:
+        waiting = self._waiting[priority]
+        for item in waiting:
+            if item[0] is future:
+                waiting.remove(item)
+                return
+
+    def _next_priority(self, now: float) -> Optional[WritePriority]:
+        if self._waiting[WritePriority.CRITICAL] and self._can_send(
+            WritePriority.CRITICAL, now
+        ):
+            return WritePriority.CRITICAL
+        ready = [
+            priority
+            for priority in (WritePriority.NORMAL, WritePriority.BULK)
+            if self._waiting[priority] and self._can_send(priority, now)
+        ]
+        return min(ready, key=self._pass.__getitem__, default=None)
+
+    def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        now = loop.time()
+        while priority := self._next_priority(now):
+            future, num_updates = self._waiting[priority].popleft()
+            if future.done():
+                continue
+            self._grant(priority, num_updates, now)
+            future.set_result(None)
+
+        rate_limited = [
+            self._next_allowed[priority]
+            for priority, waiting in self._waiting.items()
+            if waiting and self._next_allowed[priority] > now
+        ]
+        if rate_limited:
+            self._timer = loop.call_at(min(rate_limited), self._dispatch)
@@ -0,0 +1,162 @@
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.rpc import code_pb2
+
+
+def canonical_bytestring(value: bytes) -> bytes:
+    """Strip the leading zero bytes of a bytestring, keeping one for zero."""
+    return value.lstrip(b"\x00") or value[:1]
+
+
+def canonical_field_match(field_match: p4r_pb2.FieldMatch) -> p4r_pb2.FieldMatch:
+    """Copy of a field match with canonical bytestrings."""
+    canonical = p4r_pb2.FieldMatch()
+    canonical.CopyFrom(field_match)
+    kind = canonical.WhichOneof("field_match_type")
+    if kind:
+        match = getattr(canonical, kind)
+        for name in ("value", "mask", "low", "high"):
+            if name in match.DESCRIPTOR.fields_by_name:
+                setattr(match, name, canonical_bytestring(getattr(match, name)))
+    return canonical
+
+
+def canonical_action(table_action: p4r_pb2.TableAction) -> p4r_pb2.TableAction:
+    """Copy of a table action with canonical action param bytestrings."""
+    canonical = p4r_pb2.TableAction()
+    canonical.CopyFrom(table_action)
+    actions = [canonical.action] + [
+        profile_action.action
+        for profile_action in canonical.action_profile_action_set.action_profile_actions
+    ]
+    for action in actions:
+        for param in action.params:
+            param.value = canonical_bytestring(param.value)
+    return canonical
+
+
+def table_entry_key(table_entry: p4r_pb2.TableEntry) -> tuple[int, bytes]:
+    """Canonical key of a table entry: (table_id, match key).
+
+    The match key is the deterministic serialization of the field matches
+    with canonical bytestrings sorted by field id, followed by the priority,
+    so it doesn't depend on the order the field matches were set, nor on
+    leading zero bytes of their values.
+    """
+    match = sorted(table_entry.match, key=lambda field_match: field_match.field_id)
+    match_key = b"".join(
+        canonical_field_match(field_match).SerializeToString(deterministic=True)
+        for field_match in match
+    )
+    return (table_entry.table_id, match_key + table_entry.priority.to_bytes(4, "big"))
+
+
+@dataclass
+class ShadowDiff:
+    """ShadowDiff.
+
+    Minimal set of entities to write for a device to match a ShadowStore.
+    """
+
+    inserts: list[p4r_pb2.Entity] = field(default_factory=list)
+    modifies: list[p4r_pb2.Entity] = field(default_factory=list)
+    deletes: list[p4r_pb2.Entity] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.modifies) + len(self.deletes)
+
+
+class ShadowStore:
+    """ShadowStore.
+
+    This class is responsible for keeping a local copy of the table entries
+    written to a device, keyed by table_entry_key. Default entries are tracked
+    but left out of reconciliation diffs, since wildcard reads don't return them.
+    """
+
+    def __init__(self) -> None:
+        """ShadowStore."""
+        self.entries: dict[tuple[int, bytes], p4r_pb2.TableEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def apply(
+        self,
+        updates: Iterable[p4r_pb2.Update],
+        errors: Optional[list[p4r_pb2.Error]] = None,
+    ) -> None:
+        """Apply the table entry updates of a WriteRequest.
+
+        If errors is set, only updates whose p4.v1.Error is OK are applied, and
+        none of them if errors doesn't have one p4.v1.Error per update.
+        """
+        updates = list(updates)
+        if errors is not None:
+            if len(errors) != len(updates):
+                return
+            updates = [
+                update
+                for update, error in zip(updates, errors)
+                if error.canonical_code == code_pb2.OK
+            ]
+
+        for update in updates:
+            if update.entity.WhichOneof("entity") != "table_entry":
+                continue
+            key = table_entry_key(update.entity.table_entry)
+            match update.type:
+                case p4r_pb2.Update.Type.INSERT | p4r_pb2.Update.Type.MODIFY:
+                    self.entries[key] = update.entity.table_entry
+                case p4r_pb2.Update.Type.DELETE:
+                    self.entries.pop(key, None)
+
+    def table_entries(self, table_id=0) -> Iterator[p4r_pb2.TableEntry]:
+        """Iterate over the entries of a table, or of all tables if table_id is 0."""
+        for (entry_table_id, _), table_entry in self.entries.items():
+            if not table_id or entry_table_id == table_id:
+                yield table_entry
+
+    def clear(self, table_id=0) -> None:
+        """Clear the entries of a table, or of all tables if table_id is 0."""
+        if not table_id:
+            self.entries.clear()
+            return
+        for key in [key for key in self.entries if key[0] == table_id]:
+            del self.entries[key]
+
+    def diff(
+        self, device_entries: Iterable[p4r_pb2.TableEntry], table_id=0
+    ) -> ShadowDiff:
+        """Compute the writes needed for device_entries to match this store."""
+        diff, seen = ShadowDiff(), set()
+        for device_entry in device_entries:
+            if device_entry.is_default_action:
+                continue
+            key = table_entry_key(device_entry)
+            seen.add(key)
+            table_entry = self.entries.get(key)
+            if table_entry is None:
+                diff.deletes.append(p4r_pb2.Entity(table_entry=device_entry))
+            elif not self._same_entry(table_entry, device_entry):
+                diff.modifies.append(p4r_pb2.Entity(table_entry=table_entry))
+
+        for key, table_entry in self.entries.items():
+            if table_id and key[0] != table_id:
+                continue
+            if key not in seen and not table_entry.is_default_action:
+                diff.inserts.append(p4r_pb2.Entity(table_entry=table_entry))
+        return diff
+
+    @staticmethod
+    def _same_entry(
+        table_entry: p4r_pb2.TableEntry, device_entry: p4r_pb2.TableEntry
+    ) -> bool:
+        return (
+            canonical_action(table_entry.action)
+            == canonical_action(device_entry.action)
+            and table_entry.idle_timeout_ns == device_entry.idle_timeout_ns
+            and table_entry.metadata == device_entry.metadata
+        )
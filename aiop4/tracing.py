@@ -0,0 +1,65 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from google.protobuf import text_format
+from google.protobuf.message import Message
+
+TraceHook = Callable[[str, str, Message], None]
+
+
+@dataclass
+class PayloadLogging:
+    """PayloadLogging.
+
+    How protobuf payloads are rendered in log records. Payloads of up to
+    ``max_bytes`` serialized bytes are rendered in full. Larger ones are
+    only summarized by type and size, except one out of ``sample_every``
+    that's rendered up to ``max_chars`` characters, 0 meaning never.
+    """
+
+    max_bytes: int = 1024
+    max_chars: int = 4096
+    sample_every: int = 100
+
+
+payload_logging = PayloadLogging()
+_large_payloads = 0
+
+
+def configure_payload_logging(
+    *, max_bytes: int = 1024, max_chars: int = 4096, sample_every: int = 100
+) -> None:
+    """Configure how protobuf payloads are rendered in log records."""
+    global payload_logging
+    payload_logging = PayloadLogging(max_bytes, max_chars, sample_every)
+
+
+class LazyPayload:
+    """LazyPayload.
+
+    Log record argument that renders a protobuf message as one line text only
+    when the record is emitted, following the PayloadLogging configuration,
+    so disabled log levels don't pay for rendering payloads.
+    """
+
+    __slots__ = ("message",)
+
+    def __init__(self, message: Message) -> None:
+        """LazyPayload."""
+        self.message = message
+
+    def __str__(self) -> str:
+        global _large_payloads
+        config, message = payload_logging, self.message
+        size = message.ByteSize()
+        if size <= config.max_bytes:
+            return text_format.MessageToString(message, as_one_line=True)
+        summary = f"<{message.DESCRIPTOR.name} of {size} bytes>"
+        sampled = config.sample_every and _large_payloads % config.sample_every == 0
+        _large_payloads += 1
+        if not sampled:
+            return summary
+        text = text_format.MessageToString(message, as_one_line=True)
+        if len(text) > config.max_chars:
+            text = text[: config.max_chars] + "..."
+        return f"{summary} {text}"
@@ -1,8 +1,21 @@
+import hashlib
+import logging
+import os
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
+import p4.v1.p4runtime_pb2 as p4r_pb2
 from google.protobuf import text_format
+from google.protobuf.message import DecodeError
+from google.rpc import status_pb2
+from grpc.aio import AioRpcError
 from p4.config.v1.p4info_pb2 import P4Info
 
+if TYPE_CHECKING:
+    from .device_config import DeviceConfig
+
+log = logging.getLogger(__name__)
+
 
 def read_p4info_txt(file_path: str) -> P4Info:
     """Read p4info.txt file."""
@@ -11,5 +24,68 @@ def read_p4info_txt(file_path: str) -> P4Info:
     return p4_info
 
 
+def read_p4info_cached(file_path: str, cache_dir: Optional[str] = None) -> P4Info:
+    """Read p4info.txt file through a content hashed binary cache.
+
+    The parsed P4Info is serialized to ``.<file name>.<sha256 prefix>.bin`` in
+    cache_dir, or next to the file if cache_dir isn't set, and loaded from
+    there as long as the file content doesn't change.
+    """
+    path = Path(file_path).expanduser()
+    content = path.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    cache_path = Path(cache_dir).expanduser() if cache_dir else path.parent
+    cache_file = cache_path / f".{path.name}.{digest}.bin"
+    try:
+        return P4Info.FromString(cache_file.read_bytes())
+    except (OSError, DecodeError):
+        pass
+
+    p4_info = P4Info()
+    text_format.Parse(content.decode(), p4_info)
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(p4_info.SerializeToString())
+        tmp_file.replace(cache_file)
+    except OSError as exc:
+        log.warning(f"Couldn't write P4Info cache {cache_file}: {exc}")
+    return p4_info
+
+
+def read_p4info(file_path: str, cache_dir: Optional[str] = None) -> P4Info:
+    """Read p4info.txt file, through a binary cache in cache_dir if it's set."""
+    if cache_dir:
+        return read_p4info_cached(file_path, cache_dir)
+    return read_p4info_txt(file_path)
+
+
 def read_bytes_config(config_json_path: str) -> bytes:
     return Path(config_json_path).expanduser().read_bytes()
+
+
+def pipeline_cookie(p4info: P4Info, device_config: "bytes | DeviceConfig") -> int:
+    """Content hash of a pipeline as a ForwardingPipelineConfig.Cookie uint64."""
+    sha256 = hashlib.sha256(p4info.SerializeToString(deterministic=True))
+    sha256.update(getattr(device_config, "buffer", device_config))
+    return int.from_bytes(sha256.digest()[:8], "big")
+
+
+def decode_write_errors(exc: AioRpcError) -> list[p4r_pb2.Error]:
+    """Decode the per-update p4.v1.Error details of a failed Write RPC.
+
+    P4Runtime servers pack one p4.v1.Error per update in the google.rpc.Status
+    sent in the grpc-status-details-bin trailer. An empty list is returned if
+    the server didn't send any details.
+    """
+    for key, value in exc.trailing_metadata() or ():
+        if key != "grpc-status-details-bin":
+            continue
+        status = status_pb2.Status.FromString(value)
+        errors = []
+        for detail in status.details:
+            error = p4r_pb2.Error()
+            detail.Unpack(error)
+            errors.append(error)
+        return errors
+    return []
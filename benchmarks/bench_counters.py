@@ -0,0 +1,42 @@
+"""Microbenchmark of counter delta computation.
+
+Computes the per cell deltas and rates of a counter array of 500k cells, as
+CounterPoller does on each poll round. Run from the repository root:
+
+    python -m benchmarks.bench_counters
+"""
+
+import json
+import random
+import timeit
+from array import array
+
+from aiop4.polling import CounterDelta, column_deltas
+
+
+def run(size=500_000, number=10) -> dict[str, float]:
+    """Run the benchmark, returning milliseconds per counter array."""
+    previous = array("Q", (random.randrange(1 << 40) for _ in range(size)))
+    current = array("Q", (value + random.randrange(1000) for value in previous))
+
+    def deltas() -> CounterDelta:
+        delta = CounterDelta(
+            "bench",
+            "counters",
+            "bench",
+            1.0,
+            {"packet_count": column_deltas(current, previous)},
+        )
+        delta.rates("packet_count")
+        return delta
+
+    return {
+        "deltas_and_rates_ms": min(timeit.repeat(deltas, number=number, repeat=3))
+        / number
+        * 1e3,
+        "sample_bytes_per_cell": current.itemsize * 2,
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
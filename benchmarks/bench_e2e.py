@@ -0,0 +1,74 @@
+"""End-to-end benchmark against an in-process FakeP4RuntimeServer.
+
+Measures table entry writes per second through real gRPC with write_bulk,
+and the latency from a digest being generated to the table entries it
+learned being installed. Run from the repository root:
+
+    python -m benchmarks.bench_e2e
+"""
+
+import asyncio
+import json
+import statistics
+import time
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.protobuf import text_format
+from p4.config.v1.p4info_pb2 import P4Info
+
+from aiop4.client import Client
+from aiop4.digests import DigestDecoder
+from aiop4.elems_info import ElementsP4Info
+from aiop4.fake_server import FakeP4RuntimeServer
+from tests.data import p4info_data
+
+
+async def _run(num_entries: int, num_digests: int, digest_rate: float) -> dict:
+    p4info = P4Info()
+    text_format.Parse(p4info_data(), p4info)
+    for table in p4info.tables:
+        table.size = max(table.size, num_entries + num_digests)
+    async with FakeP4RuntimeServer() as server:
+        client = Client(server.address, 1)
+        await client.become_primary_or_raise(timeout=5)
+        await client._set_fwd_pipeline(
+            p4r_pb2.ForwardingPipelineConfig(p4info=p4info),
+            elems_info=ElementsP4Info(p4info),
+        )
+
+        dmac = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+        started = time.perf_counter()
+        result = await client.write_bulk(
+            dmac.build((mac,), (1,)) for mac in range(1, num_entries + 1)
+        )
+        elapsed = time.perf_counter() - started
+        assert result.ok and result.total == num_entries
+
+        smac = client.table_entry_builder("IngressImpl.smac", "NoAction")
+        decoder = DigestDecoder(client.elems_info, "digest_t")
+        server.generate_digests(1, "digest_t", digest_rate)
+        latencies = []
+        while len(latencies) < num_digests:
+            msg = await client.queues["digest"].get()
+            items = decoder.decode(msg.digest)
+            await client.insert_entity(
+                *[smac.build((item["srcAddr"] + num_entries,)) for item in items]
+            )
+            latencies.append((time.time_ns() - msg.digest.timestamp) / 1e6)
+            await client.ack_digest_list(msg.digest)
+        await client.close()
+
+    return {
+        "write_bulk_entries_per_sec": num_entries / elapsed,
+        "digest_to_install_p50_ms": statistics.median(latencies),
+        "digest_to_install_p99_ms": statistics.quantiles(latencies, n=100)[98],
+    }
+
+
+def run(num_entries=20_000, num_digests=200, digest_rate=500.0) -> dict[str, float]:
+    """Run the benchmark, returning writes per second and digest latencies."""
+    return asyncio.run(_run(num_entries, num_digests, digest_rate))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,70 @@
+"""Microbenchmark of write path logging with DEBUG disabled.
+
+Compares the CPU per update of Client._write_request against the same write
+path plus the eager f-string rendering of the WriteRequest it used to do
+before formatting was deferred. Run from the repository root:
+
+    python -m benchmarks.bench_logging
+"""
+
+import asyncio
+import json
+import logging
+import time
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from aiop4.client import log as client_log
+
+from .bench_table_entry import new_client
+
+
+async def _run(num_updates: int, number: int) -> dict[str, float]:
+    client = new_client()
+
+    async def write(req: p4r_pb2.WriteRequest) -> p4r_pb2.WriteResponse:
+        return p4r_pb2.WriteResponse()
+
+    client._stub.Write = write
+    builder = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+    updates = [
+        p4r_pb2.Update(
+            type=p4r_pb2.Update.Type.INSERT, entity=builder.build((i,), (1,))
+        )
+        for i in range(num_updates)
+    ]
+
+    async def lazy() -> None:
+        await client._write_request(*updates)
+
+    async def eager() -> None:
+        req = p4r_pb2.WriteRequest(
+            device_id=client.device_id, election_id=client.election_id, updates=updates
+        )
+        client_log.debug(f"Sending WriteRequest to {client.host_device} {req}")
+        await client._write_request(*updates)
+
+    results = {}
+    for name, func in (("eager_fstring", eager), ("lazy", lazy)):
+        best = float("inf")
+        for _ in range(3):
+            started = time.process_time()
+            for _ in range(number):
+                await func()
+            best = min(best, time.process_time() - started)
+        results[f"{name}_us_per_update"] = best / number / num_updates * 1e6
+    return results
+
+
+def run(num_updates=1000, number=20) -> dict[str, float]:
+    """Run the benchmark, returning CPU microseconds per update."""
+    level = client_log.level
+    client_log.setLevel(logging.INFO)
+    try:
+        return asyncio.run(_run(num_updates, number))
+    finally:
+        client_log.setLevel(level)
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
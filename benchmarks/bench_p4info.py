@@ -0,0 +1,117 @@
+"""Benchmark of P4Info loading at controller startup.
+
+Compares parsing the p4info.txt file with loading its binary cache, and
+building every ElementsP4Info index with only using two tables, on a synthetic
+P4Info with thousands of tables and actions, and building every index of the
+small tests/data.py P4Info. Run from the repository root:
+
+    python -m benchmarks.bench_p4info
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from google.protobuf import text_format
+from p4.config.v1.p4info_pb2 import MatchField, P4Info
+
+from aiop4.elems_info import ElementsP4Info
+from aiop4.utils import read_p4info_cached, read_p4info_txt
+from tests.data import p4info_data
+
+INDEXES = (
+    "tables",
+    "actions",
+    "action_profiles",
+    "counters",
+    "direct_counters",
+    "meters",
+    "direct_meters",
+    "value_sets",
+    "registers",
+    "digests",
+    "externs",
+    "controller_packet_metadata",
+    "table_match_fields",
+    "packet_metadata",
+    "action_params",
+    "ids",
+    "match_fields_by_id",
+    "action_params_by_id",
+    "packet_metadata_by_id",
+)
+
+
+def synthetic_p4info(num_tables=2000, num_actions=4000) -> P4Info:
+    """P4Info with num_tables tables of 4 match fields and num_actions actions."""
+    p4info = P4Info()
+    for i in range(num_actions):
+        action = p4info.actions.add()
+        action.preamble.id = 0x01000000 + i
+        action.preamble.name = f"Ingress.action_{i}"
+        action.preamble.alias = f"action_{i}"
+        for j in range(1, 3):
+            action.params.add(id=j, name=f"param_{j}", bitwidth=32)
+    for i in range(num_tables):
+        table = p4info.tables.add()
+        table.preamble.id = 0x02000000 + i
+        table.preamble.name = f"Ingress.table_{i}"
+        table.preamble.alias = f"table_{i}"
+        for j in range(1, 5):
+            table.match_fields.add(
+                id=j,
+                name=f"hdr.field_{j}",
+                bitwidth=32,
+                match_type=MatchField.MatchType.TERNARY,
+            )
+        for j in range(4):
+            table.action_refs.add(id=0x01000000 + (i * 2 + j) % num_actions)
+        table.size = 1024
+    return p4info
+
+
+def timed(func, *args) -> tuple[float, object]:
+    """Run func(*args), returning the elapsed milliseconds and its result."""
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1e3, result
+
+
+def run(num_tables=2000, num_actions=4000) -> dict[str, float]:
+    """Run the benchmark, returning milliseconds per step."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        p4info_path = Path(tmp_dir) / "p4info.txt"
+        p4info_path.write_text(
+            text_format.MessageToString(synthetic_p4info(num_tables, num_actions))
+        )
+        results["read_p4info_txt_ms"], _ = timed(read_p4info_txt, str(p4info_path))
+        results["read_p4info_cached_cold_ms"], _ = timed(
+            read_p4info_cached, str(p4info_path)
+        )
+        results["read_p4info_cached_warm_ms"], p4info = timed(
+            read_p4info_cached, str(p4info_path)
+        )
+
+    def build_all(p4info: P4Info) -> None:
+        elems_info = ElementsP4Info(p4info)
+        for name in INDEXES:
+            getattr(elems_info, name)
+
+    def build_lazy() -> None:
+        elems_info = ElementsP4Info(p4info)
+        elems_info.tables["Ingress.table_0"]
+        elems_info.tables["Ingress.table_1"]
+        elems_info.actions["Ingress.action_0"]
+
+    small_p4info = P4Info()
+    text_format.Parse(p4info_data(), small_p4info)
+    results["elems_info_small_all_indexes_ms"], _ = timed(build_all, small_p4info)
+    results["elems_info_all_indexes_ms"], _ = timed(build_all, p4info)
+    results["elems_info_lazy_ms"], _ = timed(build_lazy)
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,135 @@
+"""Benchmark of pushing a large device config to many devices.
+
+Pushes the same pipeline with a large device config to devices of a
+FakeP4RuntimeServer running in another process, and measures the peak RSS
+growth of the pushing process: reading the config into bytes, the default
+("bytes"), memory mapping it with mmap_device_config ("mmap"), and reading it
+with a max_bytes_in_flight budget of budget_mb ("bytes_budget"). Each variant
+runs in a fresh process, so their peaks don't mask each other. Run from the
+repository root:
+
+    python -m benchmarks.bench_pipeline
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from multiprocessing.connection import Connection
+from pathlib import Path
+
+from aiop4.fake_server import FakeP4RuntimeServer
+from aiop4.manager import DeviceManager
+from tests.data import p4info_data
+
+UNLIMITED = [
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.max_send_message_length", -1),
+]
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _serve(conn: Connection) -> None:
+    async def serve() -> None:
+        server = FakeP4RuntimeServer(options=UNLIMITED)
+        servicer = server.servicer
+        set_pipeline = servicer.SetForwardingPipelineConfig
+
+        async def set_pipeline_without_device_config(request, context):
+            # Devices would keep every pushed device config otherwise.
+            response = await set_pipeline(request, context)
+            servicer.device(request.device_id).config.ClearField("p4_device_config")
+            return response
+
+        servicer.SetForwardingPipelineConfig = set_pipeline_without_device_config
+        async with server:
+            conn.send(server.address)
+            await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+
+    asyncio.run(serve())
+
+
+def _push(
+    conn: Connection,
+    mode: str,
+    address: str,
+    p4info_path: str,
+    config_path: str,
+    devices: int,
+    concurrency: int,
+    budget_mb: int,
+) -> None:
+    async def push() -> dict[str, float]:
+        manager = DeviceManager(concurrency=concurrency, channel_options=UNLIMITED)
+        for device_id in range(1, devices + 1):
+            manager.add_device(address, device_id)
+        await manager.become_primary(timeout=10)
+        baseline = _peak_rss_mb()
+        started = time.perf_counter()
+        budget = budget_mb if mode.endswith("_budget") else 1 << 20
+        results = await manager.set_fwd_pipeline_from_file(
+            p4info_path,
+            config_path,
+            max_bytes_in_flight=budget * 1024 * 1024,
+            mmap_device_config=mode == "mmap",
+        )
+        elapsed = time.perf_counter() - started
+        assert not any(isinstance(r, BaseException) for r in results.values())
+        await manager.close()
+        return {
+            f"{mode}_peak_rss_growth_mb": _peak_rss_mb() - baseline,
+            f"{mode}_push_seconds": elapsed,
+        }
+
+    conn.send(asyncio.run(push()))
+
+
+def run(config_mb=16, devices=50, concurrency=8, budget_mb=64) -> dict[str, float]:
+    """Run the benchmark, returning peak RSS growth and push time per variant."""
+    context = multiprocessing.get_context("spawn")
+    results: dict[str, float] = {"config_mb": config_mb, "devices": devices}
+    with tempfile.TemporaryDirectory() as tmp:
+        p4info_path = Path(tmp, "p4info.txt")
+        p4info_path.write_text(p4info_data())
+        config_path = Path(tmp, "config.bin")
+        config_path.write_bytes(os.urandom(config_mb * 1024 * 1024))
+
+        server_conn, server_child_conn = context.Pipe()
+        server = context.Process(target=_serve, args=(server_child_conn,))
+        server.start()
+        try:
+            address = server_conn.recv()
+            for mode in ("bytes", "mmap", "bytes_budget"):
+                conn, child_conn = context.Pipe()
+                pusher = context.Process(
+                    target=_push,
+                    args=(
+                        child_conn,
+                        mode,
+                        address,
+                        str(p4info_path),
+                        str(config_path),
+                        devices,
+                        concurrency,
+                        budget_mb,
+                    ),
+                )
+                pusher.start()
+                pusher.join()
+                if not conn.poll():
+                    raise RuntimeError(f"Pushing {mode} failed")
+                results.update(conn.recv())
+        finally:
+            server_conn.send(None)
+            server.join()
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,42 @@
+"""Microbenchmark of register cell decoding and encoding.
+
+Decodes the register entries of a 64k cell register into an array, and
+encodes its values into register entries, as Client.read_register and
+Client.write_register do. Parsing the ReadResponses isn't included, it
+depends on the protobuf backend. Run from the repository root:
+
+    python -m benchmarks.bench_registers
+"""
+
+import asyncio
+import json
+import timeit
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from aiop4.registers import cell_entities, decode_cells
+
+
+def run(size=65536, number=3) -> dict[str, float]:
+    """Run the benchmark, returning milliseconds per register."""
+    values = [(cell * 2654435761) & 0xFFFFFFFF for cell in range(size)]
+    entities = list(cell_entities(1, values, 0, 32))
+
+    async def aiter_entities():
+        for entity in entities:
+            yield entity
+
+    def decode() -> None:
+        asyncio.run(decode_cells(aiter_entities(), 0, size, 32))
+
+    def encode() -> list[p4r_pb2.Entity]:
+        return list(cell_entities(1, values, 0, 32))
+
+    return {
+        "decode_ms": min(timeit.repeat(decode, number=number, repeat=3)) / number * 1e3,
+        "encode_ms": min(timeit.repeat(encode, number=number, repeat=3)) / number * 1e3,
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
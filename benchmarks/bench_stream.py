@@ -0,0 +1,63 @@
+"""Microbenchmark of stream message dispatch.
+
+Times Client.stream_control dispatching a mix of packet-ins and digests from
+a stub stream channel to the client queues. Run from the repository root:
+
+    python -m benchmarks.bench_stream
+"""
+
+import asyncio
+import json
+import time
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .bench_table_entry import new_client
+
+
+class StreamChannel:
+    """Stub stream channel reading the same messages then EOF."""
+
+    def __init__(self, messages: list[p4r_pb2.StreamMessageResponse]) -> None:
+        """Stub stream channel reading the same messages then EOF."""
+        self.messages = iter(messages)
+
+    async def read(self):
+        return next(self.messages, grpc.aio.EOF)
+
+
+async def _run(num_messages: int) -> dict[str, float]:
+    messages = [
+        (
+            p4r_pb2.StreamMessageResponse(
+                packet=p4r_pb2.PacketIn(payload=bytes(64)),
+            )
+            if i % 2
+            else p4r_pb2.StreamMessageResponse(
+                digest=p4r_pb2.DigestList(digest_id=1, list_id=i)
+            )
+        )
+        for i in range(num_messages)
+    ]
+    best = float("inf")
+    for _ in range(3):
+        client = new_client()
+        client._stream_channel = StreamChannel(messages)
+        started = time.perf_counter()
+        await client.stream_control()
+        best = min(best, time.perf_counter() - started)
+        assert client.queues["packet"].qsize() == num_messages // 2
+    return {
+        "stream_dispatch_us_per_message": best / num_messages * 1e6,
+        "stream_dispatch_messages_per_sec": num_messages / best,
+    }
+
+
+def run(num_messages=50_000) -> dict[str, float]:
+    """Run the benchmark, returning the dispatch time per message."""
+    return asyncio.run(_run(num_messages))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
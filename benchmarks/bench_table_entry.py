@@ -0,0 +1,61 @@
+"""Microbenchmark of table entry construction.
+
+Compares Client.new_table_entry with a compiled TableEntryBuilder on the
+tests/data.py P4Info. Run from the repository root:
+
+    python -m benchmarks.bench_table_entry
+"""
+
+import json
+import timeit
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.protobuf import text_format
+from p4.config.v1.p4info_pb2 import P4Info
+
+from aiop4.client import Client
+from aiop4.elems_info import ElementsP4Info
+from tests.data import p4info_data
+
+
+def new_client() -> Client:
+    """Client with the tests/data.py P4Info, it doesn't connect."""
+    p4info = P4Info()
+    text_format.Parse(p4info_data(), p4info)
+    client = Client()
+    client.p4info = p4info
+    client.elems_info = ElementsP4Info(p4info)
+    return client
+
+
+def run(number=20000) -> dict[str, float]:
+    """Run the benchmark, returning microseconds per entry."""
+    client = new_client()
+    # Canonical bytestrings, as the builder encodes them.
+    mac, port = b"\x01", b"\x01"
+
+    def new_table_entry() -> p4r_pb2.Entity:
+        return client.new_table_entry(
+            "IngressImpl.dmac",
+            {"hdr.ethernet.dstAddr": p4r_pb2.FieldMatch.Exact(value=mac)},
+            "IngressImpl.fwd",
+            [port],
+        )
+
+    builder = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+
+    def build() -> p4r_pb2.Entity:
+        return builder.build((mac,), (port,))
+
+    assert new_table_entry() == build()
+    return {
+        name: min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+        for name, func in (
+            ("new_table_entry_us", new_table_entry),
+            ("table_entry_builder_us", build),
+        )
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,51 @@
+"""Microbenchmark of the entity write path.
+
+Times Client.insert_entity (_op_entity) of 1, 100 and 10k table entries
+against a stub that serializes each WriteRequest, as gRPC would, and returns
+right away. Run from the repository root:
+
+    python -m benchmarks.bench_write
+"""
+
+import asyncio
+import json
+import time
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from .bench_table_entry import new_client
+
+
+async def _run(sizes: tuple[int, ...], min_updates: int) -> dict[str, float]:
+    client = new_client()
+    serialized = 0
+
+    async def write(req: p4r_pb2.WriteRequest) -> p4r_pb2.WriteResponse:
+        nonlocal serialized
+        serialized += len(req.SerializeToString())
+        return p4r_pb2.WriteResponse()
+
+    client._stub.Write = write
+    builder = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+    results = {}
+    for size in sizes:
+        entities = [builder.build((mac,), (1,)) for mac in range(1, size + 1)]
+        number = max(1, min_updates // size)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(number):
+                await client.insert_entity(*entities)
+            best = min(best, (time.perf_counter() - started) / number)
+        results[f"op_entity_{size}_updates_ms"] = best * 1e3
+        results[f"op_entity_{size}_updates_us_per_update"] = best / size * 1e6
+    return results
+
+
+def run(sizes=(1, 100, 10_000), min_updates=10_000) -> dict[str, float]:
+    """Run the benchmark, returning the time per call and per update."""
+    return asyncio.run(_run(sizes, min_updates))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,108 @@
+"""Run the benchmark suite and compare results between versions.
+
+Runs the run() function of each benchmark module, stores every result as JSON
+and optionally compares them with a baseline JSON of a previous run. Metrics
+ending in _per_sec are better when higher, every other metric is a time or a
+size that's better when lower. Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json --threshold 0.1
+    python -m benchmarks.run bench_write bench_stream
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import platform
+import sys
+import time
+from typing import Any, Optional
+
+import aiop4
+
+BENCHMARKS = (
+    "bench_table_entry",
+    "bench_write",
+    "bench_p4info",
+    "bench_stream",
+    "bench_logging",
+    "bench_counters",
+    "bench_registers",
+    "bench_e2e",
+    "bench_pipeline",
+)
+
+
+def run(names: tuple[str, ...] = BENCHMARKS) -> dict[str, Any]:
+    """Run benchmarks, returning their results with the environment."""
+    results = {}
+    for name in names:
+        print(f"Running {name}", file=sys.stderr)
+        module = importlib.import_module(f"benchmarks.{name}")
+        results[name] = module.run()
+    return {
+        "aiop4_version": aiop4.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold=0.1
+) -> list[str]:
+    """Compare results with a baseline, returning the regressions.
+
+    A metric regresses if it's worse than the baseline by more than threshold,
+    relative to the baseline.
+    """
+    regressions = []
+    for name, metrics in current["results"].items():
+        baseline_metrics = baseline["results"].get(name, {})
+        for metric, value in metrics.items():
+            baseline_value = baseline_metrics.get(metric)
+            if not baseline_value:
+                continue
+            change = (value - baseline_value) / baseline_value
+            if metric.endswith("_per_sec"):
+                change = -change
+            marker = ""
+            if change > threshold:
+                marker = " REGRESSION"
+                regressions.append(f"{name}.{metric}")
+            print(
+                f"{name}.{metric}: {baseline_value:.6g} -> {value:.6g} "
+                f"({abs(change):.1%} {'worse' if change > 0 else 'better'}){marker}"
+            )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Command line entry point, returning 1 if anything regressed."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("benchmarks", nargs="*", default=BENCHMARKS)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    current = run(tuple(args.benchmarks))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(current, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
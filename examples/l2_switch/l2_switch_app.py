@@ -5,7 +5,9 @@ import struct
 
 import p4.v1.p4runtime_pb2 as p4r_pb2
 
-from aiop4 import Client
+from aiop4 import Client, DeviceManager
+from aiop4.aging import AgingEngine
+from aiop4.digests import DigestEngine
 
 log_format = (
     "%(asctime)s - %(levelname)s [%(filename)s:%(lineno)d]"
@@ -25,6 +27,7 @@ class L2SWClient:
         config_json_path: str,
         multicast_group=0xAB,
         ports=None,
+        mac_idle_timeout_ns=300 * 10**9,
     ) -> None:
         """L2SWClient."""
         self.client = client
@@ -32,54 +35,53 @@ class L2SWClient:
         self.config_json_path = config_json_path
         self.multicast_group = multicast_group
         self.ports = ports if ports else list(range(0, 7))
+        self.mac_idle_timeout_ns = mac_idle_timeout_ns
         self.consumer_task: asyncio.Task = None
-        self.keep_consuming = True
+        self.digest_engine: DigestEngine = None
+        self.aging_engine: AgingEngine = None
 
-    async def learn_mac(self, digest: p4r_pb2.DigestList):
-        """learn_mac digest task."""
+    async def learn_macs(self, items: list[dict[str, int]]) -> None:
+        """learn_macs digest handler."""
+        smac = self.client.table_entry_builder("IngressImpl.smac", "NoAction")
+        dmac = self.client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
         entities = []
-        for item in digest.data:
-            src_addr = item.struct.members[0].bitstring
-            in_port = item.struct.members[1].bitstring
-            smac_entry = self.client.new_table_entry(
-                "IngressImpl.smac",
-                {"hdr.ethernet.srcAddr": p4r_pb2.FieldMatch.Exact(value=src_addr)},
-                "NoAction",
+        for item in items:
+            log.debug(f"Device {self.client.host_device} learned {item}")
+            entities.append(
+                smac.build((item["srcAddr"],), idle_timeout_ns=self.mac_idle_timeout_ns)
             )
-            dmac_entry = self.client.new_table_entry(
-                "IngressImpl.dmac",
-                {"hdr.ethernet.dstAddr": p4r_pb2.FieldMatch.Exact(value=src_addr)},
-                "IngressImpl.fwd",
-                [in_port],
-            )
-            entities.extend([smac_entry, dmac_entry])
-
+            entities.append(dmac.build((item["srcAddr"],), (item["ingressPort"],)))
         await self.client.insert_entity(*entities)
-        await self.client.ack_digest_list(digest)
 
-    async def digests_consumer(self) -> None:
-        """digests consumer."""
-        while self.keep_consuming:
-            msg = await self.client.queue.get()
-            log.debug(f"Consumer device_id {self.client.device_id} got message {msg}")
-            match msg.WhichOneof("update"):
-                case "digest":
-                    asyncio.create_task(self.learn_mac(msg.digest))
-                case "error":
-                    log.error(f"Got StreamError {msg}")
-                case _:
-                    pass
+    async def age_macs(self, entries: list[p4r_pb2.TableEntry]) -> None:
+        """age_macs idle timeout handler, the smac entries are deleted after it."""
+        dmac = self.client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+        entities = []
+        for entry in entries:
+            mac = entry.match[0].exact.value
+            log.debug(f"Device {self.client.host_device} aged {mac.hex()}")
+            self.digest_engine.forget("digest_t", {"srcAddr": int.from_bytes(mac)})
+            entities.append(dmac.build((mac,)))
+        await self.client.write_bulk(entities, p4r_pb2.Update.Type.DELETE)
 
     async def setup_config(self) -> None:
         """Setup config."""
         log.info(f"Setting up config for {self.client.host_device}")
         await self.client.become_primary_or_raise(timeout=5)
-        self.consumer_task = asyncio.create_task(self.digests_consumer())
         await self.client.set_fwd_pipeline_from_file(
             self.p4info_path, self.config_json_path
         )
+        self.digest_engine = DigestEngine(self.client)
+        self.digest_engine.register(
+            "digest_t", self.learn_macs, key_fields=("srcAddr",)
+        )
+        self.consumer_task = self.digest_engine.start()
+        self.aging_engine = AgingEngine(self.client, handler=self.age_macs)
+        self.aging_engine.start()
         await self.client.enable_digest(
-            self.client.elems_info.digests["digest_t"].preamble.id
+            self.client.elems_info.digests["digest_t"].preamble.id,
+            max_list_size=64,
+            max_timeout_ns=1000000,
         )
         await self.client.insert_multicast_group(self.multicast_group, self.ports)
         table_entry = self.client.new_table_entry(
@@ -102,10 +104,15 @@ async def main():
     assert os.path.isfile(os.path.expanduser(p4info_path)), p4info_path
     assert os.path.isfile(os.path.expanduser(config_json_path)), config_json_path
 
-    client1 = L2SWClient(Client("localhost:9559", 1), p4info_path, config_json_path)
-    client2 = L2SWClient(Client("localhost:9560", 2), p4info_path, config_json_path)
+    manager = DeviceManager()
+    client1 = L2SWClient(
+        manager.add_device("localhost:9559", 1), p4info_path, config_json_path
+    )
+    client2 = L2SWClient(
+        manager.add_device("localhost:9560", 2), p4info_path, config_json_path
+    )
     await asyncio.gather(*[client1.setup_config(), client2.setup_config()])
-    await asyncio.gather(*[client1.digests_consumer(), client2.digests_consumer()])
+    await asyncio.gather(*[client1.consumer_task, client2.consumer_task])
 
 
 if __name__ == "__main__":
@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from google.protobuf import text_format
@@ -16,6 +16,7 @@ def client() -> Client:
     client = Client()
     client._stub = AsyncMock()
     client._stream_channel = AsyncMock()
+    client._stream_channel.cancel = MagicMock()
     client._channel = AsyncMock()
     return client
 
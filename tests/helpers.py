@@ -0,0 +1,73 @@
+from typing import Optional
+from unittest.mock import AsyncMock, MagicMock
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.rpc import code_pb2, status_pb2
+from grpc.aio import AioRpcError, Metadata
+from p4.config.v1.p4info_pb2 import P4Info
+
+from aiop4.client import Client
+from aiop4.device_config import DeviceConfig
+from aiop4.elems_info import ElementsP4Info
+from aiop4.fake_server import FakeP4RuntimeServer
+
+
+def write_rpc_error(*codes: int) -> AioRpcError:
+    """Build a Write AioRpcError with one p4.v1.Error per code."""
+    status = status_pb2.Status(code=code_pb2.UNKNOWN)
+    for code in codes:
+        status.details.add().Pack(p4r_pb2.Error(canonical_code=code))
+    return AioRpcError(
+        grpc.StatusCode.UNKNOWN,
+        Metadata(),
+        Metadata(("grpc-status-details-bin", status.SerializeToString())),
+        "Write failure.",
+    )
+
+
+class ReadCall:
+    """Fake Read unary-stream call."""
+
+    def __init__(self, responses: list[p4r_pb2.ReadResponse]) -> None:
+        """Fake Read unary-stream call."""
+        self.responses = responses
+        self.cancel = MagicMock()
+
+    async def __aiter__(self):
+        for response in self.responses:
+            yield response
+
+
+def new_device_config(path, content: bytes) -> DeviceConfig:
+    """Write a device config file and map it."""
+    path.write_bytes(content)
+    return DeviceConfig(str(path))
+
+
+def mock_serialized_pipeline_call(client: Client) -> AsyncMock:
+    """Mock the SetForwardingPipelineConfig call taking serialized requests."""
+    call = AsyncMock(return_value=p4r_pb2.SetForwardingPipelineConfigResponse())
+    client._channel.unary_unary = MagicMock(return_value=call)
+    return call
+
+
+def pushed_pipeline_request(
+    call: AsyncMock,
+) -> p4r_pb2.SetForwardingPipelineConfigRequest:
+    """Parse the last request sent with a mocked serialized pipeline call."""
+    return p4r_pb2.SetForwardingPipelineConfigRequest.FromString(call.call_args[0][0])
+
+
+async def new_primary(
+    server: FakeP4RuntimeServer, p4info: Optional[P4Info] = None, election_id=1
+) -> Client:
+    """Client connected to the server as primary, with the p4info pipeline if set."""
+    client = Client(server.address, 1, p4r_pb2.Uint128(high=election_id))
+    await client.become_primary_or_raise(timeout=2)
+    if p4info is not None:
+        await client._set_fwd_pipeline(
+            p4r_pb2.ForwardingPipelineConfig(p4info=p4info),
+            elems_info=ElementsP4Info(p4info),
+        )
+    return client
@@ -0,0 +1,128 @@
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.rpc import code_pb2
+
+from aiop4.action_profiles import ActionProfileManager, Group
+from aiop4.elems_info import ElementsP4Info
+from aiop4.fake_server import FakeP4RuntimeServer
+
+from .helpers import new_primary
+
+ACTION_PROFILE_ID = 291115404
+
+
+@pytest.fixture
+def ap_p4info(p4info):
+    """P4Info with an action profile of the dmac table."""
+    action_profile = p4info.action_profiles.add()
+    action_profile.preamble.id = ACTION_PROFILE_ID
+    action_profile.preamble.name = "IngressImpl.ecmp"
+    action_profile.with_selector = True
+    action_profile.size = 1024
+    action_profile.max_group_size = 16
+    return p4info
+
+
+@pytest.fixture
+async def manager(ap_p4info):
+    """ActionProfileManager of a Client connected to a FakeP4RuntimeServer."""
+    async with FakeP4RuntimeServer() as server:
+        client = await new_primary(server, ap_p4info)
+        manager = ActionProfileManager(client, "IngressImpl.ecmp")
+        manager.server = server
+        yield manager
+        await client.close()
+
+
+def stored(manager, kind: str) -> dict:
+    """Entries of a kind stored by the fake server."""
+    return manager.server.device(1).entities.get(kind, {})
+
+
+def test_member_dedup(client, ap_p4info) -> None:
+    """Test identical actions share a member and groups need their members."""
+    client.elems_info = ElementsP4Info(ap_p4info)
+    manager = ActionProfileManager(client, "IngressImpl.ecmp")
+    assert manager.member("IngressImpl.fwd", (1,)) == 1
+    assert manager.member("IngressImpl.fwd", (2,)) == 2
+    assert manager.member("IngressImpl.fwd", (1,)) == 1
+    with pytest.raises(ValueError):
+        manager.set_group(1, [1, 3])
+    manager.set_group(1, [1])
+    assert manager.groups[1] == Group({1: 1}, 16)
+    with pytest.raises(ValueError):
+        manager.delete_member(1)
+    assert manager.delete_unused_members() == [2]
+
+
+def test_one_shot(client, ap_p4info) -> None:
+    """Test one-shot action sets."""
+    client.elems_info = ElementsP4Info(ap_p4info)
+    manager = ActionProfileManager(client, "IngressImpl.ecmp")
+    table_action = manager.one_shot(
+        [("IngressImpl.fwd", (1,), 1), ("IngressImpl.fwd", (2,), 3)]
+    )
+    actions = table_action.action_profile_action_set.action_profile_actions
+    assert [action.weight for action in actions] == [1, 3]
+    assert actions[1].action.params[0].value == b"\x02"
+
+
+async def test_commit_incremental(manager) -> None:
+    """Test commits only write what changed, in dependency order."""
+    members = [manager.member("IngressImpl.fwd", (port,)) for port in (1, 2, 3)]
+    manager.set_group(10, members[:2])
+    results = await manager.commit()
+    assert {phase: result.total for phase, result in results.items()} == {
+        "members": 3,
+        "groups": 1,
+    }
+    assert len(stored(manager, "action_profile_member")) == 3
+    assert not manager.pending()["members"]
+
+    device = manager.server.device(1)
+    updates = device.updates
+    manager.add_to_group(10, members[2], weight=2)
+    results = await manager.commit()
+    assert list(results) == ["groups"]
+    assert device.updates == updates + 1
+    group = stored(manager, "action_profile_group")[(ACTION_PROFILE_ID, 10)]
+    assert {member.member_id: member.weight for member in group.members} == {
+        1: 1,
+        2: 1,
+        3: 2,
+    }
+
+    manager.delete_group(10)
+    manager.delete_unused_members()
+    results = await manager.commit()
+    assert list(results) == ["group_deletes", "member_deletes"]
+    assert not stored(manager, "action_profile_member")
+    assert not stored(manager, "action_profile_group")
+
+
+async def test_commit_failed_updates_are_retried(manager) -> None:
+    """Test failed updates aren't recorded as installed."""
+    device = manager.server.device(1)
+    member_id = manager.member("IngressImpl.fwd", (1,))
+    device.entities["action_profile_member"] = {
+        (ACTION_PROFILE_ID, member_id): p4r_pb2.ActionProfileMember()
+    }
+    results = await manager.commit()
+    assert results["members"].errors[0].canonical_code == code_pb2.ALREADY_EXISTS
+    assert manager.pending()["members"] == [(p4r_pb2.Update.Type.INSERT, member_id)]
+
+    del device.entities["action_profile_member"]
+    assert (await manager.commit())["members"].ok
+    assert not any(manager.pending().values())
+
+
+async def test_sync(manager) -> None:
+    """Test sync loads the members and groups of the device."""
+    manager.set_group(5, [manager.member("IngressImpl.fwd", (7,))])
+    await manager.commit()
+
+    other = ActionProfileManager(manager.client, "IngressImpl.ecmp")
+    await other.sync()
+    assert other.members == manager.members
+    assert other.groups == manager.groups
+    assert not any(other.pending().values())
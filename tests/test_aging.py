@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.rpc import code_pb2
+
+from aiop4.aging import AgingEngine
+
+from .helpers import write_rpc_error
+
+
+def new_notification(*macs: bytes) -> p4r_pb2.IdleTimeoutNotification:
+    """Build an IdleTimeoutNotification of smac entries."""
+    return p4r_pb2.IdleTimeoutNotification(
+        table_entry=[
+            p4r_pb2.TableEntry(
+                table_id=38733573,
+                match=[p4r_pb2.FieldMatch(field_id=1, exact={"value": mac})],
+                idle_timeout_ns=1000,
+            )
+            for mac in macs
+        ]
+    )
+
+
+def test_add_dedup(client) -> None:
+    """Test expired entries are deduplicated and stripped to their key."""
+    engine = AgingEngine(client)
+    assert engine.add(new_notification(b"\x01", b"\x02")) == 2
+    assert engine.add(new_notification(b"\x01")) == 0
+    assert engine.expired == 2
+    assert not any(entry.idle_timeout_ns for entry in engine._pending.values())
+
+
+async def test_flush_bulk_delete(client) -> None:
+    """Test expired entries are handled and deleted in a single Write RPC."""
+    handler = MagicMock()
+    engine = AgingEngine(client, handler=handler)
+    engine.add(new_notification(b"\x01", b"\x02", b"\x03"))
+    client._stub.Write.side_effect = write_rpc_error(
+        code_pb2.OK, code_pb2.NOT_FOUND, code_pb2.INTERNAL
+    )
+    result = await engine.flush()
+    assert len(handler.call_args[0][0]) == 3
+    assert client._stub.Write.call_count == 1
+    req = client._stub.Write.call_args[0][0]
+    assert [update.type for update in req.updates] == [p4r_pb2.Update.Type.DELETE] * 3
+    assert result.total == 3
+    assert (engine.deleted, engine.failed) == (2, 1)
+    assert await engine.flush() is None
+
+
+async def test_flush_without_delete(client) -> None:
+    """Test expired entries are only handed to the handler if delete isn't set."""
+    handler = MagicMock()
+    engine = AgingEngine(client, handler=handler, delete=False)
+    engine.add(new_notification(b"\x01"))
+    await engine.flush()
+    assert handler.call_count == 1
+    assert not client._stub.Write.called
+
+
+async def test_flush_handler_raises(client) -> None:
+    """Test expired entries are kept for the next flush if the handler raises."""
+    handler = MagicMock(side_effect=[RuntimeError("boom"), None])
+    engine = AgingEngine(client, handler=handler)
+    engine.add(new_notification(b"\x01", b"\x02"))
+    with pytest.raises(RuntimeError):
+        await engine.flush()
+    assert len(engine._pending) == 2
+    assert not client._stub.Write.called
+
+    engine.add(new_notification(b"\x02", b"\x03"))
+    await engine.flush()
+    assert len(handler.call_args[0][0]) == 3
+    assert client._stub.Write.call_count == 1
+    assert not engine._pending
+    assert engine.expired == 3
+
+
+async def test_rate_limit(client) -> None:
+    """Test deletes are delayed to honor max_deletes_per_sec."""
+    engine = AgingEngine(client, max_deletes_per_sec=100)
+    loop = asyncio.get_running_loop()
+    engine.add(new_notification(b"\x01", b"\x02"))
+    start = loop.time()
+    await engine.flush()
+    engine.add(new_notification(b"\x03"))
+    await engine.flush()
+    assert loop.time() - start >= 0.015
+    assert client._stub.Write.call_count == 2
+
+
+async def test_consume_batches(client) -> None:
+    """Test notifications arriving within batch_delay are deleted together."""
+    engine = AgingEngine(client, batch_delay=0.01)
+    queue = client.queues["idle_timeout_notification"]
+    for mac in (b"\x01", b"\x02"):
+        await queue.put(
+            p4r_pb2.StreamMessageResponse(
+                idle_timeout_notification=new_notification(mac)
+            )
+        )
+    engine.start()
+    await asyncio.sleep(0.05)
+    await engine.stop()
+    assert client._stub.Write.call_count == 1
+    assert len(client._stub.Write.call_args[0][0].updates) == 2
@@ -0,0 +1,110 @@
+import asyncio
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.rpc import code_pb2
+from grpc.aio import AioRpcError, Metadata
+
+from aiop4.batching import BulkWriteResult, iter_update_chunks
+from aiop4.exceptions import WriteException
+
+from .helpers import write_rpc_error
+
+
+async def test_coalesce_concurrent_writes(client) -> None:
+    """Test concurrent entity writes are sent in a single WriteRequest."""
+    client.enable_write_batching(max_delay=0.01)
+    entities = [p4r_pb2.Entity() for _ in range(10)]
+    await asyncio.gather(*[client.insert_entity(entity) for entity in entities])
+    assert client._stub.Write.call_count == 1
+    arg = client._stub.Write.call_args[0][0]
+    assert len(arg.updates) == len(entities)
+
+
+async def test_max_updates_flush(client) -> None:
+    """Test a batch is sent once it reaches max_updates."""
+    client.enable_write_batching(max_updates=2, max_delay=10)
+    await asyncio.gather(*[client.insert_entity(p4r_pb2.Entity()) for _ in range(4)])
+    assert client._stub.Write.call_count == 2
+
+
+async def test_atomic_writes_not_coalesced(client) -> None:
+    """Test non CONTINUE_ON_ERROR writes are sent on their own."""
+    batcher = client.enable_write_batching(max_delay=0.01)
+    update = p4r_pb2.Update(type=p4r_pb2.Update.Type.INSERT)
+    atomicity = p4r_pb2.WriteRequest.Atomicity.ROLLBACK_ON_ERROR
+    await asyncio.gather(
+        batcher.submit([update], atomicity=atomicity),
+        batcher.submit([update], atomicity=atomicity),
+    )
+    assert client._stub.Write.call_count == 2
+    assert client._stub.Write.call_args[0][0].atomicity == atomicity
+
+
+async def test_per_update_errors(client) -> None:
+    """Test each caller gets its own per-update result."""
+    client.enable_write_batching(max_delay=0.01)
+    client._stub.Write.side_effect = write_rpc_error(
+        code_pb2.OK, code_pb2.ALREADY_EXISTS, code_pb2.OK
+    )
+    results = await asyncio.gather(
+        client.insert_entity(p4r_pb2.Entity()),
+        client.insert_entity(p4r_pb2.Entity(), p4r_pb2.Entity()),
+        return_exceptions=True,
+    )
+    assert client._stub.Write.call_count == 1
+    assert not isinstance(results[0], Exception)
+    assert isinstance(results[1], WriteException)
+    assert [err.canonical_code for err in results[1].errors] == [
+        code_pb2.ALREADY_EXISTS,
+        code_pb2.OK,
+    ]
+
+
+async def test_rpc_error_without_details(client) -> None:
+    """Test callers get the AioRpcError if the server sent no error details."""
+    client.enable_write_batching(max_delay=0.01)
+    exc = AioRpcError(grpc.StatusCode.UNAVAILABLE, Metadata(), Metadata())
+    client._stub.Write.side_effect = exc
+    with pytest.raises(WriteException) as write_exc:
+        await client.insert_entity(p4r_pb2.Entity())
+    assert write_exc.value.rpc_error is exc
+    assert not write_exc.value.errors
+
+
+async def test_disable_write_batching(client) -> None:
+    """Test disable_write_batching flushes pending writes."""
+    batcher = client.enable_write_batching(max_delay=10)
+    task = asyncio.create_task(client.insert_entity(p4r_pb2.Entity()))
+    await asyncio.sleep(0)
+    await client.disable_write_batching()
+    await task
+    assert client.write_batcher is None
+    assert not batcher._pending
+    assert client._stub.Write.call_count == 1
+
+
+async def test_iter_update_chunks() -> None:
+    """Test iter_update_chunks bounds chunks by updates and bytes."""
+    entities = [p4r_pb2.Entity() for _ in range(5)]
+    op_type = p4r_pb2.Update.Type.DELETE
+    chunks = [chunk async for chunk in iter_update_chunks(entities, op_type, 2)]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0].type == op_type
+
+    size = chunks[0][0].ByteSize()
+    chunks = [
+        chunk
+        async for chunk in iter_update_chunks(entities, op_type, max_bytes=size * 3)
+    ]
+    assert [len(chunk) for chunk in chunks] == [3, 2]
+
+
+def test_bulk_write_result_without_details() -> None:
+    """Test every update of a chunk fails if the server sent no details."""
+    result = BulkWriteResult(total=4)
+    exc = AioRpcError(grpc.StatusCode.UNAVAILABLE, Metadata(), Metadata())
+    result.add_rpc_error(2, 2, exc)
+    assert list(result.errors) == [2, 3]
+    assert result.errors[2].canonical_code == grpc.StatusCode.UNAVAILABLE.value[0]
@@ -0,0 +1,100 @@
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from p4.config.v1.p4info_pb2 import MatchField
+
+from aiop4.builders import TableEntryBuilder
+from aiop4.elems_info import ElementsP4Info
+
+
+def test_build_matches_new_table_entry(client, elems_info) -> None:
+    """Test build produces the same entity as new_table_entry."""
+    client.elems_info = elems_info
+    entity = client.new_table_entry(
+        "IngressImpl.dmac",
+        {"hdr.ethernet.dstAddr": p4r_pb2.FieldMatch.Exact(value=b"\x01")},
+        "IngressImpl.fwd",
+        [b"\x01"],
+        priority=10,
+        idle_timeout_ns=100,
+    )
+    builder = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+    assert builder is client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+    assert (
+        builder.build(("00:00:00:00:00:01",), (1,), priority=10, idle_timeout_ns=100)
+        == entity
+    )
+
+
+def test_build_default_entry(elems_info) -> None:
+    """Test build of a default entry."""
+    builder = TableEntryBuilder(elems_info, "IngressImpl.dmac", "IngressImpl.broadcast")
+    entity = builder.build((), (0xAB,))
+    assert entity.table_entry.is_default_action
+    assert not entity.table_entry.match
+    assert entity.table_entry.action.action.params[0].value == b"\xab"
+
+
+def test_build_match_types(p4info) -> None:
+    """Test build of every match type."""
+    match_field = p4info.tables[0].match_fields[0]
+    for field_id, match_type in enumerate(
+        (
+            MatchField.MatchType.LPM,
+            MatchField.MatchType.TERNARY,
+            MatchField.MatchType.RANGE,
+            MatchField.MatchType.OPTIONAL,
+        ),
+        2,
+    ):
+        p4info.tables[0].match_fields.add(
+            id=field_id,
+            name=f"field{field_id}",
+            bitwidth=match_field.bitwidth,
+            match_type=match_type,
+        )
+    builder = TableEntryBuilder(ElementsP4Info(p4info), "IngressImpl.smac", "NoAction")
+    entity = builder.build((b"\x01", (0x0A0000000001, 8), (0x101, 0xFF), (1, 2), None))
+    match = entity.table_entry.match
+    assert [field_match.field_id for field_match in match] == [1, 2, 3, 4]
+    assert match[1].lpm == p4r_pb2.FieldMatch.LPM(
+        value=b"\x0a\x00\x00\x00\x00\x00", prefix_len=8
+    )
+    assert match[2].ternary == p4r_pb2.FieldMatch.Ternary(value=b"\x01", mask=b"\xff")
+    assert match[3].range == p4r_pb2.FieldMatch.Range(low=b"\x01", high=b"\x02")
+
+    entity = builder.build((b"\x01", (1, 0), (1, 0), None, None))
+    assert [field_match.field_id for field_match in entity.table_entry.match] == [1]
+    with pytest.raises(ValueError):
+        builder.build((b"\x01", (1, 8)))
+    with pytest.raises(ValueError):
+        builder.build((None, (1, 8), (1, 1), (1, 2), 1))
+    for oversized in (
+        (b"\x01", (1 << 48, 8), None, None, None),
+        (b"\x01", None, (1 << 48, 0xFF), None, None),
+    ):
+        with pytest.raises(ValueError):
+            builder.build(oversized)
+
+
+def test_build_out_of_range(elems_info) -> None:
+    """Test build raises ValueError if a value doesn't fit its bitwidth."""
+    builder = TableEntryBuilder(elems_info, "IngressImpl.dmac", "IngressImpl.fwd")
+    with pytest.raises(ValueError):
+        builder.build((1,), (0x200,))
+
+
+def test_build_action_params_arity(elems_info) -> None:
+    """Test build raises ValueError if action params are missing or extra."""
+    builder = TableEntryBuilder(elems_info, "IngressImpl.dmac", "IngressImpl.fwd")
+    with pytest.raises(ValueError):
+        builder.build((1,), ())
+    with pytest.raises(ValueError):
+        builder.build((1,), (1, 2))
+
+
+def test_build_table_action(elems_info) -> None:
+    """Test build of entries pointing to an action profile member."""
+    builder = TableEntryBuilder(elems_info, "IngressImpl.dmac", None)
+    table_action = p4r_pb2.TableAction(action_profile_member_id=3)
+    entity = builder.build((1,), table_action=table_action)
+    assert entity.table_entry.action == table_action
@@ -1,9 +1,27 @@
 import asyncio
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import grpc
 import p4.v1.p4runtime_pb2 as p4r_pb2
 import pytest
+from google.rpc import code_pb2, status_pb2
+
+from aiop4.exceptions import (
+    BecomePrimaryException,
+    NotPrimaryException,
+    WriteException,
+)
+from aiop4.reconnect import OutagePolicy, ReconnectPolicy
+from aiop4.scheduler import WritePriority
+from aiop4.utils import pipeline_cookie
+
+from .helpers import (
+    ReadCall,
+    mock_serialized_pipeline_call,
+    new_device_config,
+    pushed_pipeline_request,
+    write_rpc_error,
+)
 
 
 async def test_get_capabilities(client) -> None:
@@ -67,6 +85,45 @@ async def test_stream_control(client) -> None:
     ]
     await client.stream_control()
     assert client.stream_channel.read.call_count == 2
+    assert client.queues["arbitration"].qsize() == 1
+
+
+async def test_stream_control_queues(client) -> None:
+    """Test stream_control dispatches each update type to its own queue."""
+    client.configure_queue("packet", 1, "drop_newest")
+    client._stream_channel.read.side_effect = [
+        p4r_pb2.StreamMessageResponse(packet=p4r_pb2.PacketIn()),
+        p4r_pb2.StreamMessageResponse(packet=p4r_pb2.PacketIn()),
+        p4r_pb2.StreamMessageResponse(digest=p4r_pb2.DigestList(digest_id=1)),
+        p4r_pb2.StreamMessageResponse(error=p4r_pb2.StreamError()),
+        grpc.aio.EOF,
+    ]
+    await client.stream_control()
+    assert client.queues["packet"].qsize() == 1
+    assert client.queues["packet"].drops == 1
+    assert client.queues["digest"].get_nowait().digest.digest_id == 1
+    assert client.queues["error"].qsize() == 1
+
+
+async def test_stream_control_handler(client) -> None:
+    """Test stream_control calls registered handlers instead of queueing."""
+    handled, awaited = [], AsyncMock()
+    client.register_handler("digest", handled.append)
+    client.register_handler("packet", awaited)
+    client._stream_channel.read.side_effect = [
+        p4r_pb2.StreamMessageResponse(digest=p4r_pb2.DigestList()),
+        p4r_pb2.StreamMessageResponse(packet=p4r_pb2.PacketIn()),
+        grpc.aio.EOF,
+    ]
+    await client.stream_control()
+    assert len(handled) == 1
+    assert awaited.await_count == 1
+    assert client.queues["digest"].empty()
+    client.unregister_handler("digest")
+    assert "digest" not in client._stream_handlers
+
+    with pytest.raises(ValueError):
+        client.register_handler("unknown", handled.append)
 
 
 async def test_enable_digest(client) -> None:
@@ -78,6 +135,11 @@ async def test_enable_digest(client) -> None:
     assert isinstance(arg, p4r_pb2.WriteRequest)
     assert arg.updates[0].entity.digest_entry.digest_id == _id
 
+    await client.enable_digest(_id, max_list_size=100, max_timeout_ns=1000)
+    config = client._stub.Write.call_args[0][0].updates[0].entity.digest_entry.config
+    assert config.max_list_size == 100
+    assert config.max_timeout_ns == 1000
+
 
 def test_new_table_entry(client, elems_info) -> None:
     """Test new_table_entry."""
@@ -137,7 +199,9 @@ async def test_modify_entity(client):
     entity = p4r_pb2.Entity()
     client._op_entity = AsyncMock()
     await client.modify_entity(entity)
-    client._op_entity.assert_called_with(entity, op_type=p4r_pb2.Update.Type.MODIFY)
+    client._op_entity.assert_called_with(
+        entity, op_type=p4r_pb2.Update.Type.MODIFY, priority=WritePriority.NORMAL
+    )
 
 
 async def test_insert_entity(client):
@@ -145,7 +209,9 @@ async def test_insert_entity(client):
     entity = p4r_pb2.Entity()
     client._op_entity = AsyncMock()
     await client.insert_entity(entity)
-    client._op_entity.assert_called_with(entity, op_type=p4r_pb2.Update.Type.INSERT)
+    client._op_entity.assert_called_with(
+        entity, op_type=p4r_pb2.Update.Type.INSERT, priority=WritePriority.NORMAL
+    )
 
 
 async def test_delete_entity(client):
@@ -153,9 +219,335 @@ async def test_delete_entity(client):
     entity = p4r_pb2.Entity()
     client._op_entity = AsyncMock()
     await client.delete_entity(entity)
-    client._op_entity.assert_called_with(entity, op_type=p4r_pb2.Update.Type.DELETE)
+    client._op_entity.assert_called_with(
+        entity, op_type=p4r_pb2.Update.Type.DELETE, priority=WritePriority.NORMAL
+    )
 
 
 def test_host_device_str(client):
     """Test host_device str."""
     assert client.host_device == f"{client.host}:{client.device_id}"
+
+
+async def test_write_bulk(client):
+    """Test write_bulk chunks entities and maps per-update errors."""
+    exc = write_rpc_error(code_pb2.OK, code_pb2.NOT_FOUND)
+    client._stub.Write.side_effect = [None, exc, None]
+
+    async def entities():
+        for _ in range(5):
+            yield p4r_pb2.Entity()
+
+    result = await client.write_bulk(entities(), max_updates=2, concurrency=1)
+    assert client._stub.Write.call_count == 3
+    assert result.total == 5
+    assert not result.ok
+    assert list(result.errors) == [3]
+    assert result.errors[3].canonical_code == code_pb2.NOT_FOUND
+
+
+async def test_read_entities(client):
+    """Test read_entities yields entities of every ReadResponse."""
+    responses = [
+        p4r_pb2.ReadResponse(entities=[p4r_pb2.Entity(), p4r_pb2.Entity()]),
+        p4r_pb2.ReadResponse(entities=[p4r_pb2.Entity()]),
+    ]
+    client._stub.Read = MagicMock(return_value=ReadCall(responses))
+    entity = p4r_pb2.Entity(table_entry=p4r_pb2.TableEntry())
+    entities = [entity async for entity in client.read_entities(entity)]
+    assert len(entities) == 3
+    req = client._stub.Read.call_args[0][0]
+    assert req.device_id == client.device_id
+    assert req.entities[0] == entity
+    assert client._stub.Read.return_value.cancel.call_count == 1
+
+
+async def test_read_table_entries(client, elems_info):
+    """Test read_table_entries wildcard reads."""
+    client.elems_info = elems_info
+    client._stub.Read = MagicMock(return_value=ReadCall([]))
+    assert not [entity async for entity in client.read_table_entries()]
+    req = client._stub.Read.call_args[0][0]
+    assert req.entities[0].table_entry.table_id == 0
+
+    [entity async for entity in client.read_table_entries("IngressImpl.dmac")]
+    req = client._stub.Read.call_args[0][0]
+    assert req.entities[0].table_entry.table_id == 45595255
+
+
+async def test_read_counter_entries(client, elems_info):
+    """Test read_counter_entries."""
+    client.elems_info = elems_info
+    client._stub.Read = MagicMock(return_value=ReadCall([]))
+    [entity async for entity in client.read_counter_entries("igPortsCounts", 2)]
+    req = client._stub.Read.call_args[0][0]
+    counter_id = elems_info.counters["igPortsCounts"].preamble.id
+    assert req.entities[0].counter_entry.counter_id == counter_id
+    assert req.entities[0].counter_entry.index.index == 2
+
+
+async def test_op_entity_shadow(client):
+    """Test successful writes update the shadow store."""
+    shadow = client.enable_shadow_store()
+    entity = p4r_pb2.Entity(table_entry=p4r_pb2.TableEntry(table_id=1))
+    await client.insert_entity(entity)
+    assert list(shadow.table_entries()) == [entity.table_entry]
+    client._stub.Write.side_effect = grpc.aio.AioRpcError(
+        grpc.StatusCode.UNAVAILABLE, grpc.aio.Metadata(), grpc.aio.Metadata()
+    )
+    with pytest.raises(WriteException):
+        await client.delete_entity(entity)
+    assert len(shadow) == 1
+
+
+async def test_op_entity_errors(client):
+    """Test failed writes raise WriteException with or without batching."""
+    client._stub.Write.side_effect = write_rpc_error(code_pb2.ALREADY_EXISTS)
+    for batching in (False, True):
+        if batching:
+            client.enable_write_batching()
+        with pytest.raises(WriteException) as exc:
+            await client.insert_entity(p4r_pb2.Entity())
+        assert exc.value.errors[0].canonical_code == code_pb2.ALREADY_EXISTS
+        assert isinstance(exc.value.rpc_error, grpc.aio.AioRpcError)
+
+
+async def test_reconcile_shadow(client, elems_info):
+    """Test reconcile_shadow only writes the diff."""
+    client.elems_info = elems_info
+    table_id = elems_info.tables["IngressImpl.dmac"].preamble.id
+    shadow = client.enable_shadow_store()
+    entity = p4r_pb2.Entity(
+        table_entry=p4r_pb2.TableEntry(table_id=table_id, priority=1)
+    )
+    await client.insert_entity(entity)
+    stale = p4r_pb2.Entity(
+        table_entry=p4r_pb2.TableEntry(table_id=table_id, priority=2)
+    )
+    client._stub.Read = MagicMock(
+        return_value=ReadCall([p4r_pb2.ReadResponse(entities=[stale])])
+    )
+    client._stub.Write.reset_mock()
+    results = await client.reconcile_shadow("IngressImpl.dmac")
+    assert [result.total for result in results.values()] == [1, 0, 1]
+    assert client._stub.Write.call_count == 2
+    assert len(shadow) == 1
+
+
+async def test_send_packet_outs(client, elems_info):
+    """Test send_packet_out and send_packet_outs."""
+    client.elems_info = elems_info
+    await client.send_packet_out(b"payload", {"egress_port": 1})
+    assert client._stream_channel.write.call_count == 1
+    arg = client._stream_channel.write.call_args[0][0]
+    assert arg.packet.metadata[0].value == b"\x01"
+
+    await client.send_packet_outs([(b"a", {"egress_port": 2}), (b"b", None)])
+    assert client._stream_channel.write.call_count == 3
+    assert client._stream_channel.write.call_args[0][0].packet.payload == b"b"
+
+
+def test_decode_packet_in(client, elems_info):
+    """Test decode_packet_in."""
+    client.elems_info = elems_info
+    packet = p4r_pb2.PacketIn(
+        payload=b"payload",
+        metadata=[p4r_pb2.PacketMetadata(metadata_id=1, value=b"\x02")],
+    )
+    assert client.decode_packet_in(packet).metadata == {"ingress_port": 2}
+
+
+async def test_stream_control_arbitration_status(client) -> None:
+    """Test arbitration updates with a non OK status clear is_primary."""
+    client._is_primary.set()
+    client._stream_channel.read.side_effect = [
+        p4r_pb2.StreamMessageResponse(
+            arbitration=p4r_pb2.MasterArbitrationUpdate(
+                status=status_pb2.Status(code=code_pb2.ALREADY_EXISTS)
+            )
+        ),
+        grpc.aio.EOF,
+    ]
+    await client.stream_control()
+    assert not client.is_primary()
+
+
+async def test_reconnect(client) -> None:
+    """Test a lost stream reconnects and re-enables digests."""
+    await client.enable_digest(10)
+    client.enable_reconnect(ReconnectPolicy(initial_backoff=0, jitter=0))
+    client._is_primary.set()
+    client._stream_channel.read.side_effect = [grpc.aio.EOF]
+
+    async def try_to_become_primary() -> None:
+        client._is_primary.set()
+
+    client.try_to_become_primary = try_to_become_primary
+    await client.stream_control()
+    assert not client.is_primary()
+    await client._reconnect_task
+    assert client.is_primary()
+    update = client._stub.Write.call_args[0][0].updates[0]
+    assert update.type == p4r_pb2.Update.Type.MODIFY
+    assert update.entity.digest_entry.digest_id == 10
+
+
+async def test_reconnect_gives_up(client) -> None:
+    """Test reconnecting stops after max_attempts."""
+    client.enable_reconnect(
+        ReconnectPolicy(initial_backoff=0, max_attempts=2, arbitration_timeout=0.01)
+    )
+    client.try_to_become_primary = AsyncMock(side_effect=BecomePrimaryException)
+    client._on_stream_lost()
+    await client._reconnect_task
+    assert client.try_to_become_primary.call_count == 2
+    assert not client.is_primary()
+
+
+async def test_reconnect_closes_stale_stream(client) -> None:
+    """Test each reconnection attempt stops the previous stream."""
+    client.enable_reconnect(
+        ReconnectPolicy(initial_backoff=0, max_attempts=1, arbitration_timeout=0.01)
+    )
+    stream_channel = client._stream_channel
+    stream_control_task = asyncio.create_task(asyncio.sleep(10))
+    client._stream_control_task = stream_control_task
+    client.try_to_become_primary = AsyncMock(side_effect=BecomePrimaryException)
+    client._on_stream_lost()
+    await client._reconnect_task
+    assert stream_control_task.cancelled()
+    assert stream_channel.cancel.call_count == 1
+    assert client._stream_control_task is None
+
+
+async def test_reconnect_retries_restore_state(client) -> None:
+    """Test restoring state is retried on the stream that became primary."""
+    client.enable_reconnect(ReconnectPolicy(initial_backoff=0, jitter=0))
+
+    async def try_to_become_primary() -> None:
+        client._is_primary.set()
+        client._stream_control_task = asyncio.create_task(asyncio.sleep(10))
+
+    client.try_to_become_primary = AsyncMock(side_effect=try_to_become_primary)
+    unavailable = grpc.aio.AioRpcError(
+        grpc.StatusCode.UNAVAILABLE, grpc.aio.Metadata(), grpc.aio.Metadata()
+    )
+    client._restore_state = AsyncMock(side_effect=[unavailable, None])
+    client._on_stream_lost()
+    await client._reconnect_task
+    assert client.try_to_become_primary.call_count == 1
+    assert client._restore_state.call_count == 2
+    assert client.is_primary()
+    client._stream_control_task.cancel()
+
+
+async def test_reconnect_stops_on_terminal_errors(client) -> None:
+    """Test reconnecting stops on errors that aren't transient and backups."""
+    client.enable_reconnect(ReconnectPolicy(initial_backoff=0, jitter=0))
+    metrics = client.enable_metrics()
+    client.try_to_become_primary = AsyncMock(side_effect=client._is_primary.set)
+    client._restore_state = AsyncMock(
+        side_effect=write_rpc_error(code_pb2.FAILED_PRECONDITION)
+    )
+    client._on_stream_lost()
+    await client._reconnect_task
+    assert client.try_to_become_primary.call_count == 1
+    assert client._restore_state.call_count == 1
+    assert client.is_primary()
+    assert metrics.rpc_errors["restore_state"] == 1
+
+    client._is_primary.clear()
+    client.try_to_become_primary = AsyncMock()
+    client._on_stream_lost()
+    await client._reconnect_task
+    assert client.try_to_become_primary.call_count == 1
+    assert client._restore_state.call_count == 1
+
+
+async def test_restore_state_skips_outage_wait(client) -> None:
+    """Test writes restoring state aren't held back by the outage policy."""
+    await client.enable_digest(10)
+    client.enable_reconnect(ReconnectPolicy(outage_policy="reject"))
+    client._reconnect_task = asyncio.create_task(client._restore_state())
+    await client._reconnect_task
+    assert client._stub.Write.call_count == 2
+
+
+async def test_write_outage_policy(client) -> None:
+    """Test writes while reconnecting are buffered or rejected."""
+    policy = client.enable_reconnect(
+        ReconnectPolicy(initial_backoff=10, outage_policy="reject")
+    )
+    client._on_stream_lost()
+    with pytest.raises(NotPrimaryException):
+        await client.insert_entity(p4r_pb2.Entity())
+
+    policy.outage_policy = OutagePolicy.BUFFER
+    task = asyncio.create_task(client.insert_entity(p4r_pb2.Entity()))
+    await asyncio.sleep(0)
+    assert not client._stub.Write.call_count
+    client._is_primary.set()
+    await task
+    assert client._stub.Write.call_count == 1
+    client._reconnect_task.cancel()
+
+
+@patch("aiop4.client.load_device_config")
+@patch("aiop4.client.read_p4info")
+async def test_set_fwd_pipeline_skip_if_unchanged(
+    read_p4info, load_device_config, client, p4info, tmp_path
+):
+    """Test set_fwd_pipeline_from_file skips pushing an unchanged pipeline."""
+    read_p4info.return_value = p4info
+    load_device_config.return_value = new_device_config(tmp_path / "a.json", b"{}")
+    call = mock_serialized_pipeline_call(client)
+    cookie = p4r_pb2.ForwardingPipelineConfig.Cookie(
+        cookie=pipeline_cookie(p4info, b"{}")
+    )
+    client._stub.GetForwardingPipelineConfig.return_value = (
+        p4r_pb2.GetForwardingPipelineConfigResponse(
+            config=p4r_pb2.ForwardingPipelineConfig(cookie=cookie)
+        )
+    )
+    response = await client.set_fwd_pipeline_from_file(
+        "p4info.txt", "config.json", skip_if_unchanged=True, mmap_device_config=True
+    )
+    assert response is None
+    assert not call.call_count
+    req = client._stub.GetForwardingPipelineConfig.call_args[0][0]
+    assert req.response_type == req.ResponseType.COOKIE_ONLY
+    assert client.p4info == p4info
+
+    load_device_config.return_value = new_device_config(tmp_path / "b.json", b"{1}")
+    await client.set_fwd_pipeline_from_file(
+        "p4info.txt", "config.json", skip_if_unchanged=True, mmap_device_config=True
+    )
+    assert call.call_count == 1
+    assert not client._stub.SetForwardingPipelineConfig.call_count
+    assert client._stub.GetForwardingPipelineConfig.call_count == 2
+    req = pushed_pipeline_request(call)
+    assert req.device_id == client.device_id
+    assert req.config.p4info == p4info
+    assert req.config.p4_device_config == b"{1}"
+    assert req.config.cookie.cookie == pipeline_cookie(p4info, b"{1}")
+
+    with pytest.raises(ValueError):
+        await client.set_fwd_pipeline_from_file(
+            "p4info.txt", "config.json", cookie=1, skip_if_unchanged=True
+        )
+
+
+@patch("aiop4.client.read_bytes_config")
+@patch("aiop4.client.read_p4info")
+async def test_set_fwd_pipeline_from_file(
+    read_p4info, read_bytes_config, client, p4info
+):
+    """Test set_fwd_pipeline_from_file reads the device config by default."""
+    read_p4info.return_value = p4info
+    read_bytes_config.return_value = b"{}"
+    call = mock_serialized_pipeline_call(client)
+    await client.set_fwd_pipeline_from_file("p4info.txt", "config.json", cookie=7)
+    assert not call.call_count
+    req = client._stub.SetForwardingPipelineConfig.call_args[0][0]
+    assert req.config.p4_device_config == b"{}"
+    assert req.config.cookie.cookie == 7
@@ -0,0 +1,94 @@
+import os
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.protobuf import text_format
+
+from aiop4.device_config import (
+    DeviceConfig,
+    load_device_config,
+    new_pipeline_config,
+    serialize_pipeline_request,
+)
+from aiop4.fake_server import FakeP4RuntimeServer
+from aiop4.utils import pipeline_cookie
+
+from .helpers import new_primary
+
+
+def test_load_device_config_shared(tmp_path) -> None:
+    """Test loaded device configs are shared until the file changes."""
+    path = tmp_path / "config.bin"
+    path.write_bytes(b"\x01" * 1000)
+    device_config = load_device_config(str(path))
+    assert load_device_config(str(path)) is device_config
+    assert bytes(device_config) == b"\x01" * 1000
+
+    new_path = tmp_path / "config.bin.new"
+    new_path.write_bytes(b"\x02" * 10)
+    new_path.replace(path)
+    assert bytes(load_device_config(str(path))) == b"\x02" * 10
+    assert bytes(device_config) == b"\x01" * 1000
+
+    (tmp_path / "empty.bin").write_bytes(b"")
+    assert len(load_device_config(str(tmp_path / "empty.bin"))) == 0
+
+
+def test_serialize_pipeline_request(tmp_path, p4info) -> None:
+    """Test the spliced request parses as the request with the device config."""
+    content = os.urandom(300_000)
+    path = tmp_path / "config.bin"
+    path.write_bytes(content)
+    device_config = DeviceConfig(str(path))
+    config, spliced = new_pipeline_config(p4info, device_config, cookie=7)
+    assert spliced is device_config and not config.p4_device_config
+    req = p4r_pb2.SetForwardingPipelineConfigRequest(
+        device_id=1, election_id=p4r_pb2.Uint128(high=2), action=2, config=config
+    )
+
+    expected = p4r_pb2.SetForwardingPipelineConfigRequest()
+    expected.CopyFrom(req)
+    expected.config.p4_device_config = content
+    assert (
+        p4r_pb2.SetForwardingPipelineConfigRequest.FromString(
+            serialize_pipeline_request(req, device_config)
+        )
+        == expected
+    )
+    assert pipeline_cookie(p4info, device_config) == pipeline_cookie(p4info, content)
+    device_config.close()
+
+
+@pytest.mark.parametrize("mmap_device_config", [False, True])
+async def test_set_fwd_pipeline_from_file(tmp_path, p4info, mmap_device_config) -> None:
+    """Test pushing a read or memory mapped device config to a device."""
+    p4info_path, config_path = tmp_path / "p4info.txt", tmp_path / "config.bin"
+    p4info_path.write_text(text_format.MessageToString(p4info))
+    content = os.urandom(6 * 1024 * 1024)
+    config_path.write_bytes(content)
+    options = [("grpc.max_receive_message_length", -1)]
+    async with FakeP4RuntimeServer(options=options) as server:
+        client = await new_primary(server)
+        metrics = client.enable_metrics()
+        await client.set_fwd_pipeline_from_file(
+            str(p4info_path),
+            str(config_path),
+            skip_if_unchanged=True,
+            mmap_device_config=mmap_device_config,
+        )
+        config = server.device(1).config
+        assert config.p4_device_config == content
+        assert config.cookie.cookie == pipeline_cookie(p4info, content)
+        assert client.p4info == p4info
+        assert metrics.bytes_sent["SetForwardingPipelineConfig"] > len(content)
+
+        assert (
+            await client.set_fwd_pipeline_from_file(
+                str(p4info_path),
+                str(config_path),
+                skip_if_unchanged=True,
+                mmap_device_config=mmap_device_config,
+            )
+            is None
+        )
+        await client.close()
@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from p4.v1 import p4data_pb2
+
+from aiop4.digests import DigestDecoder, DigestEngine, TTLCache
+
+
+def new_digest_list(*items: tuple[bytes, bytes], list_id=1) -> p4r_pb2.DigestList:
+    """Build a digest_t DigestList."""
+    return p4r_pb2.DigestList(
+        digest_id=389049336,
+        list_id=list_id,
+        data=[
+            p4data_pb2.P4Data(
+                struct=p4data_pb2.P4StructLike(
+                    members=[
+                        p4data_pb2.P4Data(bitstring=src_addr),
+                        p4data_pb2.P4Data(bitstring=port),
+                    ]
+                )
+            )
+            for src_addr, port in items
+        ],
+    )
+
+
+def test_digest_decoder(elems_info) -> None:
+    """Test DigestDecoder decodes struct members by name."""
+    decoder = DigestDecoder(elems_info, "digest_t")
+    items = decoder.decode(new_digest_list((b"\x00\x01", b"\x02")))
+    assert items == [{"srcAddr": 1, "ingressPort": 2}]
+
+
+def test_ttl_cache() -> None:
+    """Test TTLCache add, expiry and maxsize."""
+    cache = TTLCache(ttl=60, maxsize=2)
+    assert cache.add(1)
+    assert not cache.add(1)
+    assert cache.add(2) and cache.add(3)
+    assert len(cache) == 2
+    assert 1 not in cache
+
+    cache = TTLCache(ttl=0)
+    assert cache.add(1)
+    assert cache.add(1)
+
+
+@pytest.fixture
+def engine(client, elems_info) -> DigestEngine:
+    """DigestEngine with a mocked digest_t handler."""
+    client.elems_info = elems_info
+    engine = DigestEngine(client, ack_batch_size=2, ack_delay=0.01)
+    engine.register("digest_t", MagicMock())
+    return engine
+
+
+async def test_process_dedup(engine) -> None:
+    """Test already learned items aren't handled again."""
+    handler = engine._handlers[389049336]
+    await engine.process(new_digest_list((b"\x01", b"\x01"), (b"\x02", b"\x01")))
+    await engine.process(new_digest_list((b"\x01", b"\x01"), (b"\x03", b"\x01")))
+    await engine.process(new_digest_list((b"\x01", b"\x01")))
+    assert handler.call_count == 2
+    assert handler.call_args[0][0] == [{"srcAddr": 3, "ingressPort": 1}]
+
+    engine.forget("digest_t", {"srcAddr": 1, "ingressPort": 1})
+    await engine.process(new_digest_list((b"\x01", b"\x01")))
+    assert handler.call_count == 3
+
+
+async def test_process_handler_failure(engine) -> None:
+    """Test items aren't acked nor learned if the handler fails."""
+    engine._handlers[389049336].side_effect = ValueError
+    with pytest.raises(ValueError):
+        await engine.process(new_digest_list((b"\x01", b"\x01")))
+    assert not engine._pending_acks
+    assert not len(engine._caches[389049336])
+
+
+async def test_coalesced_acks(engine, client) -> None:
+    """Test acks are written in batches."""
+    for list_id in range(3):
+        await engine.process(new_digest_list((b"\x01", b"\x01"), list_id=list_id))
+    await asyncio.sleep(0)
+    assert client._stream_channel.write.call_count == 2
+    await engine.flush_acks()
+    assert client._stream_channel.write.call_count == 3
+    acks = [
+        args[0][0].digest_ack for args in client._stream_channel.write.call_args_list
+    ]
+    assert [ack.list_id for ack in acks] == [0, 1, 2]
+
+
+async def test_consume(engine, client) -> None:
+    """Test the engine consumes the digest queue."""
+    await client.queues["digest"].put(
+        p4r_pb2.StreamMessageResponse(digest=new_digest_list((b"\x01", b"\x01")))
+    )
+    engine.start()
+    await asyncio.sleep(0)
+    await engine.stop()
+    assert engine._handlers[389049336].call_count == 1
+    assert client._stream_channel.write.call_count == 1
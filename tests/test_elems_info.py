@@ -1,3 +1,6 @@
+from aiop4.elems_info import ElementsP4Info
+
+
 def test_index_all(elems_info) -> None:
     """Test ElementsP4Info all."""
     assert elems_info
@@ -19,3 +22,50 @@ def test_index_all(elems_info) -> None:
     assert list(elems_info.digests.keys()) == [
         "digest_t",
     ]
+
+
+def test_index_packet_metadata(elems_info) -> None:
+    """Test ElementsP4Info controller packet metadata."""
+    assert list(elems_info.controller_packet_metadata.keys()) == [
+        "packet_in",
+        "packet_out",
+    ]
+    assert elems_info.packet_metadata[("packet_out", "egress_port")].id == 1
+
+
+def test_lazy_indexes(p4info) -> None:
+    """Test ElementsP4Info indexes are built on first access."""
+    elems_info = ElementsP4Info(p4info)
+    assert "tables" not in elems_info.__dict__
+    assert elems_info.table_match_fields
+    assert "tables" in elems_info.__dict__
+    assert "actions" not in elems_info.__dict__
+
+
+def test_index_by_id_name_and_alias(elems_info) -> None:
+    """Test ElementsP4Info index by id, fully qualified name and alias."""
+    table = elems_info.tables["IngressImpl.dmac"]
+    assert elems_info.get("tables", 45595255) is table
+    assert elems_info.get("tables", "IngressImpl.dmac") is table
+    assert elems_info.get("tables", "dmac") is table
+    assert elems_info.ids[45595255] is table
+    assert elems_info.ids[389049336] is elems_info.digests["digest_t"]
+
+
+def test_index_children_by_id(elems_info) -> None:
+    """Test match fields, action params and packet metadata by (parent, id)."""
+    assert elems_info.match_fields_by_id[(45595255, 1)].name == "hdr.ethernet.dstAddr"
+    assert elems_info.action_params_by_id[(19387472, 1)].name == "eg_port"
+    assert elems_info.action_params[("IngressImpl.fwd", "eg_port")].bitwidth == 9
+    packet_in_id = elems_info.controller_packet_metadata["packet_in"].preamble.id
+    assert elems_info.packet_metadata_by_id[(packet_in_id, 1)].name == "ingress_port"
+
+
+def test_index_registers(p4info) -> None:
+    """Test registers are indexed from the P4Info registers."""
+    register = p4info.registers.add()
+    register.preamble.id = 369033213
+    register.preamble.name = "IngressImpl.flows"
+    elems_info = ElementsP4Info(p4info)
+    assert list(elems_info.registers) == ["IngressImpl.flows"]
+    assert elems_info.ids[369033213] is elems_info.registers["IngressImpl.flows"]
@@ -0,0 +1,90 @@
+import ipaddress
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+
+from aiop4.encoding import (
+    decode,
+    encode,
+    encode_many,
+    exact_match,
+    lpm_match,
+    range_match,
+    ternary_match,
+    to_int,
+)
+
+
+def test_to_int() -> None:
+    """Test to_int of every value type."""
+    assert to_int(10) == 10
+    assert to_int(b"\x01\x00") == 0x100
+    assert to_int("00:00:00:00:00:01") == 1
+    assert to_int("00-00-00-00-01-00") == 0x100
+    assert to_int("10.0.0.1") == 0x0A000001
+    assert to_int(ipaddress.ip_address("::1")) == 1
+    assert to_int("0x0a") == 10
+    with pytest.raises(TypeError):
+        to_int(True)
+
+
+def test_encode_canonical() -> None:
+    """Test encode produces canonical bytestrings."""
+    assert encode(0, 9) == b"\x00"
+    assert encode(0x1FF, 9) == b"\x01\xff"
+    assert encode(b"\x00\x00\x01", 16) == b"\x01"
+    assert encode("10.0.0.1", 32) == b"\x0a\x00\x00\x01"
+    assert decode(encode(0x1FF, 9)) == 0x1FF
+
+
+def test_encode_out_of_range() -> None:
+    """Test encode raises ValueError if a value doesn't fit its bitwidth."""
+    with pytest.raises(ValueError):
+        encode(0x200, 9)
+    with pytest.raises(ValueError):
+        encode(-1, 9)
+
+
+def test_encode_cache_is_typed() -> None:
+    """Test cached encodings of ints aren't returned for bools or floats."""
+    assert encode(1, 8) == b"\x01"
+    with pytest.raises(TypeError):
+        encode(True, 8)
+    with pytest.raises(TypeError):
+        encode(1.0, 8)
+
+
+def test_match_helpers() -> None:
+    """Test the field match helpers."""
+    assert exact_match(1, 9) == p4r_pb2.FieldMatch.Exact(value=b"\x01")
+    assert lpm_match("10.1.2.3/8", 32) == p4r_pb2.FieldMatch.LPM(
+        value=b"\x0a\x00\x00\x00", prefix_len=8
+    )
+    assert lpm_match(0x0A010203, 32, 16).value == b"\x0a\x01\x00\x00"
+    assert ternary_match(0x1234, 0xFF00, 16) == p4r_pb2.FieldMatch.Ternary(
+        value=b"\x12\x00", mask=b"\xff\x00"
+    )
+    assert range_match(1, 2, 8) == p4r_pb2.FieldMatch.Range(low=b"\x01", high=b"\x02")
+    assert lpm_match("0.0.0.0/0", 32) is None
+    with pytest.raises(ValueError):
+        lpm_match("10.0.0.0/8", 16)
+    with pytest.raises(ValueError):
+        ternary_match(0x10000, 0xFF, 16)
+    with pytest.raises(ValueError):
+        ternary_match(1, 0x10000, 16)
+    assert ternary_match(0x1234, 0, 16) is None
+    with pytest.raises(ValueError):
+        lpm_match(1, 32)
+    with pytest.raises(ValueError):
+        range_match(2, 1, 8)
+
+
+def test_encode_many() -> None:
+    """Test encode_many of a list and a NumPy array."""
+    values = [0, 1, 0x1FF, 0xFFFFFFFFFFFF]
+    expected = [encode(value, 48) for value in values]
+    assert encode_many(values, 48) == expected
+    np = pytest.importorskip("numpy")
+    assert encode_many(np.array(values, dtype=np.uint64), 48) == expected
+    with pytest.raises(ValueError):
+        encode_many(np.array([0x200]), 9)
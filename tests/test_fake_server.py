@@ -0,0 +1,115 @@
+import asyncio
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.rpc import code_pb2
+
+from aiop4.client import Client
+from aiop4.exceptions import WriteException
+from aiop4.fake_server import FakeP4RuntimeServer
+from aiop4.reconnect import ReconnectPolicy
+
+from .helpers import new_primary
+
+
+@pytest.fixture
+async def server():
+    """Running FakeP4RuntimeServer."""
+    async with FakeP4RuntimeServer() as server:
+        yield server
+
+
+async def test_write_and_read(server, p4info) -> None:
+    """Test table entries are stored, read back and errors are per update."""
+    client = await new_primary(server, p4info)
+    builder = client.table_entry_builder("IngressImpl.dmac", "IngressImpl.fwd")
+    entities = [builder.build((mac,), (1,)) for mac in range(1, 2500)]
+    await client.insert_entity(*entities)
+    assert server.device(1).updates == len(entities)
+    entries = [entity async for entity in client.read_table_entries("IngressImpl.dmac")]
+    assert len(entries) == len(entities)
+
+    with pytest.raises(WriteException) as exc:
+        await client.insert_entity(entities[0], builder.build((0,), (1,)))
+    assert [error.canonical_code for error in exc.value.errors] == [
+        code_pb2.ALREADY_EXISTS,
+        code_pb2.OK,
+    ]
+    counters = [entity async for entity in client.read_counter_entries("igPortsCounts")]
+    assert len(counters) == 512
+    await client.close()
+
+
+async def test_table_size_and_default_entry(server, p4info) -> None:
+    """Test table sizes are enforced and default entries aren't read back."""
+    p4info.tables[1].size = 2
+    client = await new_primary(server, p4info)
+    table = p4info.tables[1].preamble.name
+    builder = client.table_entry_builder(table, "IngressImpl.fwd")
+    await client.insert_entity(builder.build((1,), (1,)), builder.build((2,), (1,)))
+    with pytest.raises(WriteException) as exc:
+        await client.insert_entity(builder.build((3,), (1,)))
+    assert exc.value.errors[0].canonical_code == (code_pb2.RESOURCE_EXHAUSTED)
+    await client.delete_entity(builder.build((1,), (1,)))
+    await client.insert_entity(builder.build((3,), (1,)))
+
+    await client.modify_entity(builder.build((), (2,)))
+    entries = [entity async for entity in client.read_table_entries(table)]
+    assert len(entries) == 2
+    assert not any(entity.table_entry.is_default_action for entity in entries)
+    await client.close()
+
+
+async def test_not_primary(server, p4info) -> None:
+    """Test backups can't write, and become primary once the primary leaves."""
+    primary = await new_primary(server, p4info, election_id=2)
+    backup = Client(server.address, 1, p4r_pb2.Uint128(high=1))
+    with pytest.raises(asyncio.TimeoutError):
+        await backup.become_primary_or_raise(timeout=0.2)
+    backup.elems_info = primary.elems_info
+    with pytest.raises(WriteException):
+        await backup.insert_entity(p4r_pb2.Entity())
+
+    backup = Client(server.address, 1, p4r_pb2.Uint128(high=1))
+    task = asyncio.create_task(backup.try_to_become_primary())
+    await asyncio.sleep(0.1)
+    await primary.close()
+    await asyncio.wait_for(backup._is_primary.wait(), 2)
+    task.cancel()
+    await backup.close()
+
+
+async def test_generate_digests(server, p4info) -> None:
+    """Test generated digests reach the primary and acks are counted."""
+    client = await new_primary(server, p4info)
+    server.generate_digests(1, "digest_t", 1000, list_size=2)
+    msg = await asyncio.wait_for(client.queues["digest"].get(), 2)
+    assert msg.digest.list_id == 1
+    assert len(msg.digest.data) == 2
+    await client.ack_digest_list(msg.digest)
+    await asyncio.sleep(0.05)
+    assert server.device(1).digest_acks == 1
+
+    server.generate_packet_ins(1, 1000, payload=b"ping")
+    msg = await asyncio.wait_for(client.queues["packet"].get(), 2)
+    assert msg.packet.payload == b"ping"
+    await client.close()
+
+
+async def test_reconnect_to_restarted_server(server, p4info) -> None:
+    """Test a client stays primary if a restarted device lost its pipeline."""
+    client = await new_primary(server, p4info)
+    await client.enable_digest(p4info.digests[0].preamble.id)
+    client.enable_reconnect(
+        ReconnectPolicy(initial_backoff=0.05, jitter=0, arbitration_timeout=1)
+    )
+    await server.stop()
+    while not client._reconnecting:
+        await asyncio.sleep(0.01)
+    async with FakeP4RuntimeServer(server.address):
+        await asyncio.wait_for(client._reconnect_task, 5)
+        assert client.is_primary()
+        await asyncio.sleep(0.2)
+        assert client.is_primary()
+        assert not client._reconnecting
+    await client.close()
@@ -0,0 +1,172 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+
+from aiop4.manager import DeviceManager
+from aiop4.utils import pipeline_cookie
+
+from .helpers import (
+    ReadCall,
+    mock_serialized_pipeline_call,
+    new_device_config,
+    pushed_pipeline_request,
+)
+
+
+@pytest.fixture
+def manager() -> DeviceManager:
+    """DeviceManager with two mocked devices."""
+    manager = DeviceManager(channel_options=[("grpc.max_send_message_length", -1)])
+    for port in (9559, 9560):
+        client = manager.add_device(f"localhost:{port}", 1)
+        client._stub = AsyncMock()
+        client._channel = AsyncMock()
+    return manager
+
+
+def test_add_device(manager) -> None:
+    """Test add_device."""
+    assert list(manager.clients) == ["localhost:9559:1", "localhost:9560:1"]
+    with pytest.raises(ValueError):
+        manager.add_device("localhost:9559", 1)
+
+
+async def test_fan_out(manager) -> None:
+    """Test fan_out aggregates results and exceptions per device."""
+    exc = ValueError("failed")
+    manager.clients["localhost:9560:1"]._stub.Capabilities.side_effect = exc
+    results = await manager.fan_out(lambda client: client.get_capabilities())
+    assert not isinstance(results["localhost:9559:1"], Exception)
+    assert results["localhost:9560:1"] is exc
+
+    results = await manager.fan_out(
+        lambda client: client.get_capabilities(), ["localhost:9559:1"]
+    )
+    assert list(results) == ["localhost:9559:1"]
+
+
+@patch("aiop4.manager.read_bytes_config")
+@patch("aiop4.manager.read_p4info")
+async def test_set_fwd_pipeline_from_file(
+    read_p4info, read_bytes_config, manager, p4info
+):
+    """Test pushed pipelines share the same ElementsP4Info and device config."""
+    read_p4info.return_value = p4info
+    read_bytes_config.return_value = b"{}"
+    await manager.set_fwd_pipeline_from_file("p4info.txt", "config.json", cookie=7)
+    assert read_bytes_config.call_count == 1
+    client1, client2 = manager.clients.values()
+    assert client1.elems_info is client2.elems_info
+    assert client1.p4info is p4info
+    for client in (client1, client2):
+        req = client._stub.SetForwardingPipelineConfig.call_args[0][0]
+        assert req.config.p4_device_config == b"{}"
+        assert req.config.cookie.cookie == 7
+    assert not client1._stub.GetForwardingPipelineConfig.call_count
+
+
+@patch("aiop4.manager.load_device_config")
+@patch("aiop4.manager.read_p4info")
+async def test_set_fwd_pipeline_from_file_mmap(
+    read_p4info, load_device_config, manager, p4info, tmp_path
+):
+    """Test pushed memory mapped device configs are spliced into requests."""
+    read_p4info.return_value = p4info
+    load_device_config.return_value = new_device_config(tmp_path / "a.json", b"{}")
+    calls = [mock_serialized_pipeline_call(c) for c in manager.clients.values()]
+    await manager.set_fwd_pipeline_from_file(
+        "p4info.txt", "config.json", cookie=7, mmap_device_config=True
+    )
+    for client, call in zip(manager.clients.values(), calls):
+        assert call.call_count == 1
+        req = pushed_pipeline_request(call)
+        assert req.config.p4_device_config == b"{}"
+        assert req.config.cookie.cookie == 7
+        assert not client._stub.SetForwardingPipelineConfig.call_count
+
+
+async def test_insert_entity(manager) -> None:
+    """Test insert_entity on every device."""
+    entity = p4r_pb2.Entity()
+    await manager.insert_entity(entity)
+    for client in manager.clients.values():
+        assert client._stub.Write.call_args[0][0].updates[0].entity == entity
+
+
+async def test_read_counters(manager, elems_info) -> None:
+    """Test read_counters of every device."""
+    responses = [
+        p4r_pb2.ReadResponse(
+            entities=[p4r_pb2.Entity(counter_entry=p4r_pb2.CounterEntry())]
+        )
+    ]
+    for client in manager.clients.values():
+        client.set_p4info(elems_info.p4info, elems_info)
+        client._stub.Read = MagicMock(side_effect=lambda _: ReadCall(responses))
+    results = await manager.read_counters("igPortsCounts")
+    assert [len(entries) for entries in results.values()] == [1, 1]
+
+
+async def test_close(manager) -> None:
+    """Test close."""
+    clients = list(manager.clients.values())
+    await manager.close()
+    assert not manager.clients
+    assert all(client._channel.close.call_count == 1 for client in clients)
+
+
+@patch("aiop4.manager.load_device_config")
+@patch("aiop4.manager.read_p4info")
+async def test_set_fwd_pipeline_skip_if_unchanged(
+    read_p4info, load_device_config, manager, p4info, tmp_path
+):
+    """Test only devices with a different pipeline cookie are pushed."""
+    read_p4info.return_value = p4info
+    load_device_config.return_value = new_device_config(tmp_path / "a.json", b"{}")
+    client1, client2 = manager.clients.values()
+    call1 = mock_serialized_pipeline_call(client1)
+    call2 = mock_serialized_pipeline_call(client2)
+    client2._stub.GetForwardingPipelineConfig.return_value = (
+        p4r_pb2.GetForwardingPipelineConfigResponse()
+    )
+    client1._stub.GetForwardingPipelineConfig.return_value = (
+        p4r_pb2.GetForwardingPipelineConfigResponse(
+            config=p4r_pb2.ForwardingPipelineConfig(
+                cookie=p4r_pb2.ForwardingPipelineConfig.Cookie(
+                    cookie=pipeline_cookie(p4info, b"{}")
+                )
+            )
+        )
+    )
+    results = await manager.set_fwd_pipeline_from_file(
+        "p4info.txt", "config.json", skip_if_unchanged=True, mmap_device_config=True
+    )
+    assert results[client1.host_device] is None
+    assert not call1.call_count
+    assert call2.call_count == 1
+    assert pushed_pipeline_request(call2).config.cookie.cookie == (
+        pipeline_cookie(p4info, b"{}")
+    )
+    assert client1.elems_info is client2.elems_info
+
+    with pytest.raises(ValueError):
+        await manager.set_fwd_pipeline_from_file(
+            "p4info.txt", "config.json", cookie=1, skip_if_unchanged=True
+        )
+
+
+def test_counter_poller(manager) -> None:
+    """Test counter_poller polls devices added later."""
+    poller = manager.counter_poller(interval=5)
+    manager.add_device("localhost:9561", 1)
+    assert len(poller._clients()) == 3
+    assert poller.interval == 5
+
+
+def test_prometheus_metrics(manager) -> None:
+    """Test prometheus_metrics renders devices with metrics enabled."""
+    assert manager.prometheus_metrics() == "\n"
+    manager.enable_metrics()
+    text = manager.prometheus_metrics()
+    assert 'device="localhost:9559:1"' in text and 'device="localhost:9560:1"' in text
@@ -0,0 +1,78 @@
+import asyncio
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+from google.rpc import code_pb2
+
+from aiop4.exceptions import WriteException
+from aiop4.metrics import Histogram, Metrics, prometheus_text, start_prometheus_server
+
+from .helpers import write_rpc_error
+
+
+def test_histogram() -> None:
+    """Test Histogram cumulative buckets."""
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+    assert histogram.cumulative() == [(1, 2), (10, 3), (float("inf"), 4)]
+    assert (histogram.sum, histogram.count) == (56.5, 4)
+
+
+async def test_client_metrics(client) -> None:
+    """Test a Client records write and stream metrics once enabled."""
+    await client.insert_entity(p4r_pb2.Entity())
+    assert client.metrics is None
+
+    metrics = client.enable_metrics()
+    assert client.enable_metrics() is metrics
+    await client.insert_entity(p4r_pb2.Entity(), p4r_pb2.Entity())
+    client._stub.Write.side_effect = write_rpc_error(code_pb2.INTERNAL)
+    with pytest.raises(WriteException):
+        await client.insert_entity(p4r_pb2.Entity())
+    client._stream_channel.read.side_effect = [
+        p4r_pb2.StreamMessageResponse(packet=p4r_pb2.PacketIn()),
+        grpc.aio.EOF,
+    ]
+    await client.stream_control()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["rpc_latency_seconds"]["Write"]["count"] == 2
+    assert snapshot["rpc_errors"] == {"Write": 1}
+    assert snapshot["updates_per_write"]["sum"] == 3
+    assert snapshot["bytes_sent"]["Write"] > 0
+    assert snapshot["stream_messages_received"] == {"packet": 1}
+    assert snapshot["queue_depth"]["packet"] == 1
+    client.disable_metrics()
+    assert client.metrics is None
+
+
+def test_prometheus_text() -> None:
+    """Test prometheus_text renders every family once."""
+    metrics = Metrics()
+    metrics.observe_rpc("Write", 0.002, bytes_sent=10)
+    metrics.updates_per_write.observe(3)
+    text = prometheus_text({"localhost:9559:1": metrics, "localhost:9560:1": metrics})
+    assert text.count("# TYPE aiop4_rpc_latency_seconds histogram") == 1
+    assert (
+        'aiop4_rpc_latency_seconds_bucket{device="localhost:9559:1",rpc="Write",'
+        'le="0.0025"} 1'
+    ) in text
+    assert 'aiop4_bytes_sent_total{device="localhost:9560:1",rpc="Write"} 10' in text
+
+
+async def test_prometheus_server() -> None:
+    """Test start_prometheus_server serves the metrics over HTTP."""
+    metrics = Metrics()
+    metrics.observe_rpc("Read", 0.1)
+    server = await start_prometheus_server(lambda: {"s1": metrics}, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    response = await reader.read()
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b'aiop4_rpc_latency_seconds_count{device="s1",rpc="Read"} 1' in response
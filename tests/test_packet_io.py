@@ -0,0 +1,29 @@
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from aiop4.packet_io import PacketInDecoder, PacketOutEncoder
+
+
+def test_packet_out_encoder(elems_info) -> None:
+    """Test PacketOutEncoder encodes metadata by name."""
+    encoder = PacketOutEncoder(elems_info)
+    req = encoder.encode(b"payload", {"egress_port": 0x101, "_pad": b"\x00"})
+    assert req.packet.payload == b"payload"
+    assert [(m.metadata_id, m.value) for m in req.packet.metadata] == [
+        (1, b"\x01\x01"),
+        (2, b"\x00"),
+    ]
+
+
+def test_packet_in_decoder(elems_info) -> None:
+    """Test PacketInDecoder decodes metadata into ints by name."""
+    decoder = PacketInDecoder(elems_info)
+    packet = p4r_pb2.PacketIn(
+        payload=b"payload",
+        metadata=[
+            p4r_pb2.PacketMetadata(metadata_id=1, value=b"\x01\x01"),
+            p4r_pb2.PacketMetadata(metadata_id=3, value=b"\x02"),
+        ],
+    )
+    packet_in = decoder.decode(packet)
+    assert packet_in.payload == b"payload"
+    assert packet_in.metadata == {"ingress_port": 0x101, "3": 2}
@@ -0,0 +1,112 @@
+from array import array
+from unittest.mock import MagicMock
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+
+from aiop4 import polling
+from aiop4.elems_info import ElementsP4Info
+from aiop4.polling import CounterPoller, column_deltas
+
+from .helpers import ReadCall
+
+
+def counter_response(counter_id: int, *cells: tuple[int, int]) -> p4r_pb2.ReadResponse:
+    """ReadResponse of counter entries of (index, packet_count) cells."""
+    return p4r_pb2.ReadResponse(
+        entities=[
+            p4r_pb2.Entity(
+                counter_entry=p4r_pb2.CounterEntry(
+                    counter_id=counter_id,
+                    index=p4r_pb2.Index(index=index),
+                    data=p4r_pb2.CounterData(packet_count=packets),
+                )
+            )
+            for index, packets in cells
+        ]
+    )
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_column_deltas(monkeypatch, use_numpy) -> None:
+    """Test column_deltas treats cells that went backwards as reset."""
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(polling, "np", None)
+    current, previous = array("Q", [5, 10, 2]), array("Q", [1, 10, 7])
+    assert list(column_deltas(current, previous)) == [4, 0, 2]
+
+
+async def test_poll_counter_deltas(client, elems_info) -> None:
+    """Test deltas and rates of an indirect counter."""
+    client.elems_info = elems_info
+    poller = CounterPoller([client])
+    poller.add("counters", "igPortsCounts")
+    responses = [
+        counter_response(316239238, (1, 10), (2, 5)),
+        counter_response(316239238, (1, 30), (2, 5), (3, 1)),
+    ]
+    client._stub.Read = MagicMock(side_effect=lambda _: ReadCall([responses.pop(0)]))
+    assert await poller.poll() == []
+    (delta,) = await poller.poll()
+    assert (delta.kind, delta.name) == ("counters", "igPortsCounts")
+    packets = delta.columns["packet_count"]
+    assert len(packets) == 512
+    assert list(packets[:4]) == [0, 20, 0, 1]
+    assert delta.interval > 0
+    assert delta.rates("packet_count")[1] == 20 / delta.interval
+
+
+async def test_poll_direct_counter_slots(client, p4info) -> None:
+    """Test direct counter cells are slots of table entries."""
+    p4info.direct_counters.add(
+        preamble={"id": 330000001, "name": "smacCounts"},
+        direct_table_id=p4info.tables[0].preamble.id,
+    )
+    client.elems_info = ElementsP4Info(p4info)
+    poller = CounterPoller({"s1": client})
+    poller.add("direct_counters", "smacCounts")
+
+    def response(*cells: tuple[bytes, int]) -> p4r_pb2.ReadResponse:
+        return p4r_pb2.ReadResponse(
+            entities=[
+                p4r_pb2.Entity(
+                    direct_counter_entry=p4r_pb2.DirectCounterEntry(
+                        table_entry=p4r_pb2.TableEntry(
+                            table_id=p4info.tables[0].preamble.id,
+                            match=[
+                                p4r_pb2.FieldMatch(field_id=1, exact={"value": mac})
+                            ],
+                        ),
+                        data=p4r_pb2.CounterData(byte_count=byte_count),
+                    )
+                )
+                for mac, byte_count in cells
+            ]
+        )
+
+    responses = [
+        response((b"\x01", 100), (b"\x02", 50)),
+        response((b"\x02", 80)),
+        response((b"\x02", 90), (b"\x03", 10)),
+    ]
+    client._stub.Read = MagicMock(side_effect=lambda _: ReadCall([responses.pop(0)]))
+    await poller.poll()
+    (delta,) = await poller.poll()
+    assert list(delta.columns["byte_count"][:2]) == [0, 30]
+    assert delta.keys[0] is None and delta.keys[1] is not None
+    (delta,) = await poller.poll()
+    assert list(delta.columns["byte_count"][:2]) == [10, 10]
+    assert delta.keys[0] != delta.keys[1]
+
+
+async def test_poll_failure(client, elems_info) -> None:
+    """Test failed reads are omitted from the deltas."""
+    client.elems_info = elems_info
+    poller = CounterPoller([client])
+    poller.add("counters", "igPortsCounts")
+    client._stub.Read = MagicMock(side_effect=RuntimeError)
+    assert await poller.poll() == []
+    with pytest.raises(ValueError):
+        poller.add("registers", "igPortsCounts")
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from aiop4.queues import OverflowPolicy, StreamQueue
+
+
+async def test_drop_newest() -> None:
+    """Test DROP_NEWEST discards new items of a full queue."""
+    queue = StreamQueue(2, OverflowPolicy.DROP_NEWEST)
+    for item in range(4):
+        await queue.put(item)
+    assert queue.drops == 2
+    assert [queue.get_nowait(), queue.get_nowait()] == [0, 1]
+
+
+async def test_drop_oldest() -> None:
+    """Test DROP_OLDEST discards the oldest items of a full queue."""
+    queue = StreamQueue(2, OverflowPolicy.DROP_OLDEST)
+    for item in range(4):
+        await queue.put(item)
+    assert queue.drops == 2
+    assert [queue.get_nowait(), queue.get_nowait()] == [2, 3]
+
+
+async def test_block() -> None:
+    """Test BLOCK waits for a free slot."""
+    queue = StreamQueue(1, "block")
+    await queue.put(0)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(queue.put(1), 0.01)
+    assert not queue.drops
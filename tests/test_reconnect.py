@@ -0,0 +1,35 @@
+import grpc
+from google.rpc import code_pb2
+from grpc.aio import AioRpcError, Metadata
+
+from aiop4.reconnect import ReconnectPolicy
+
+from .helpers import write_rpc_error
+
+
+def test_delays() -> None:
+    """Test exponential backoff delays are capped and jittered."""
+    policy = ReconnectPolicy(
+        initial_backoff=1, max_backoff=4, multiplier=2, jitter=0.1, max_attempts=5
+    )
+    delays = list(policy.delays())
+    assert len(delays) == 5
+    for delay, expected in zip(delays, [1, 2, 4, 4, 4]):
+        assert expected * 0.9 <= delay <= expected * 1.1
+
+
+def test_delays_forever() -> None:
+    """Test delays without max_attempts don't stop."""
+    delays = ReconnectPolicy(jitter=0).delays()
+    assert [next(delays) for _ in range(3)] == [0.5, 1, 2]
+
+
+def test_is_transient() -> None:
+    """Test only errors with retry codes, or per-update ones, are transient."""
+    policy = ReconnectPolicy()
+    unavailable = AioRpcError(grpc.StatusCode.UNAVAILABLE, Metadata(), Metadata())
+    assert policy.is_transient(unavailable)
+    assert policy.is_transient(write_rpc_error(code_pb2.OK, code_pb2.UNAVAILABLE))
+    assert not policy.is_transient(write_rpc_error(code_pb2.ALREADY_EXISTS))
+    failed = AioRpcError(grpc.StatusCode.FAILED_PRECONDITION, Metadata(), Metadata())
+    assert not policy.is_transient(failed)
@@ -0,0 +1,88 @@
+from array import array
+
+import pytest
+
+from aiop4.fake_server import FakeP4RuntimeServer
+from aiop4.registers import cell_entities, register_type
+
+from .helpers import new_primary
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+def add_register(p4info, _id: int, name: str, size: int, bitwidth: int, signed=False):
+    """Add a register of bit<bitwidth> or int<bitwidth> cells to a P4Info."""
+    register = p4info.registers.add()
+    register.preamble.id = _id
+    register.preamble.name = name
+    register.size = size
+    bitstring = register.type_spec.bitstring
+    (bitstring.int if signed else bitstring.bit).bitwidth = bitwidth
+    return register
+
+
+@pytest.fixture
+async def client(p4info):
+    """Client connected to a FakeP4RuntimeServer with registers."""
+    add_register(p4info, 369098753, "flowBytes", 4096, 32)
+    add_register(p4info, 369098754, "flowDelta", 16, 16, signed=True)
+    add_register(p4info, 369098755, "flowKeys", 8, 128)
+    async with FakeP4RuntimeServer() as server:
+        client = await new_primary(server, p4info)
+        yield client
+        await client.close()
+
+
+def test_register_type(p4info) -> None:
+    """Test register bitwidths and unsupported types."""
+    register = add_register(p4info, 1, "r", 1, 12, signed=True)
+    assert register_type(register) == (12, True)
+    register.type_spec.bool.SetInParent()
+    with pytest.raises(ValueError):
+        register_type(register)
+
+
+def test_cell_entities() -> None:
+    """Test register entries of sequences and mappings of values."""
+    entities = list(cell_entities(7, [1, -1], 10, 8, signed=True))
+    assert [entity.register_entry.index.index for entity in entities] == [10, 11]
+    assert entities[1].register_entry.data.bitstring == b"\xff"
+    entities = list(cell_entities(7, {3: 256}, 0, 16))
+    assert entities[0].register_entry.index.index == 3
+    assert entities[0].register_entry.data.bitstring == b"\x01\x00"
+    with pytest.raises(ValueError):
+        list(cell_entities(7, [256], 0, 8))
+    for value in (128, -129):
+        with pytest.raises(ValueError):
+            list(cell_entities(7, [value], 0, 8, signed=True))
+
+
+async def test_write_and_read_register(client) -> None:
+    """Test bulk writes and range reads of a register."""
+    values = np.arange(4096, dtype=np.uint32) * 3 if np else range(0, 3 * 4096, 3)
+    result = await client.write_register("flowBytes", values, max_updates=1000)
+    assert result.ok and result.total == 4096
+
+    cells = await client.read_register("flowBytes")
+    assert isinstance(cells, array) and cells.typecode == "Q"
+    assert list(cells) == list(range(0, 3 * 4096, 3))
+    assert list(await client.read_register("flowBytes", 100, 103)) == [300, 303, 306]
+    assert len(await client.read_register("flowBytes", 1000)) == 3096
+    with pytest.raises(IndexError):
+        await client.read_register("flowBytes", -1)
+    with pytest.raises(ValueError):
+        await client.read_register("flowBytes", 10, 5)
+
+
+async def test_signed_and_wide_registers(client) -> None:
+    """Test int<W> registers and registers wider than 64 bits."""
+    await client.write_register("flowDelta", {2: -5, 3: 7})
+    cells = await client.read_register("flowDelta")
+    assert cells.typecode == "q"
+    assert list(cells[:4]) == [0, 0, -5, 7]
+
+    await client.write_register("flowKeys", [1 << 100], start=7)
+    assert (await client.read_register("flowKeys"))[7] == 1 << 100
@@ -0,0 +1,94 @@
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+
+from aiop4.fake_server import FakeP4RuntimeServer
+from aiop4.replication import (
+    CLONE,
+    MULTICAST,
+    CloneSession,
+    ReplicaDiff,
+    ReplicationManager,
+    to_replicas,
+)
+
+from .helpers import new_primary
+
+
+@pytest.fixture
+async def manager(p4info):
+    """ReplicationManager of a Client connected to a FakeP4RuntimeServer."""
+    async with FakeP4RuntimeServer() as server:
+        client = await new_primary(server, p4info)
+        manager = ReplicationManager(client)
+        manager.device = server.device(1)
+        yield manager
+        await client.close()
+
+
+def stored_replicas(manager, kind: str, _id: int) -> set:
+    """Replicas of a group or session stored by the fake server."""
+    pre_entry = manager.device.entities["packet_replication_engine_entry"][(kind, _id)]
+    entry = getattr(pre_entry, kind)
+    return {(replica.egress_port, replica.instance) for replica in entry.replicas}
+
+
+def test_to_replicas() -> None:
+    """Test ports keep the instance of their current replica."""
+    assert to_replicas([1, 2, (3, 4), 1]) == ((1, 0), (2, 0), (3, 4))
+    assert to_replicas([1, 3], [(1, 5), (2, 0)]) == ((1, 5), (3, 0))
+
+
+async def test_commit_batches_diffs(manager) -> None:
+    """Test only changed groups are written, batched per update type."""
+    for vlan in range(1, 2001):
+        manager.set_multicast_group(vlan, [1, 2, 3])
+    manager.set_clone_session(100, [255], packet_length_bytes=128)
+    results = await manager.commit()
+    assert results["insert"].ok and results["insert"].total == 2001
+    assert manager.device.writes == 3
+    assert stored_replicas(manager, CLONE, 100) == {(255, 0)}
+
+    writes = manager.device.writes
+    for vlan in range(1, 1001):
+        manager.add_ports(vlan, [4])
+    manager.remove_ports(1, [1])
+    manager.delete_multicast_group(2000)
+    assert manager.replica_diffs()[(MULTICAST, 1)] == ReplicaDiff(
+        added=[(4, 0)], removed=[(1, 0)]
+    )
+    results = await manager.commit()
+    assert {name: result.total for name, result in results.items()} == {
+        "modify": 1000,
+        "delete": 1,
+    }
+    assert manager.device.writes == writes + 2
+    assert stored_replicas(manager, MULTICAST, 1) == {(2, 0), (3, 0), (4, 0)}
+    assert (MULTICAST, 2000) not in manager.device.entities[
+        "packet_replication_engine_entry"
+    ]
+    assert not any(manager.pending().values())
+
+
+async def test_commit_failed_updates_are_retried(manager) -> None:
+    """Test failed updates aren't recorded as installed."""
+    manager.set_multicast_group(1, [1])
+    await manager.commit()
+    manager.device.entities["packet_replication_engine_entry"].clear()
+    manager.set_multicast_group(1, [1, 2])
+    results = await manager.commit()
+    assert list(results["modify"].errors) == [0]
+    assert manager.pending()[p4r_pb2.Update.Type.MODIFY] == [(MULTICAST, 1)]
+
+
+async def test_sync(manager) -> None:
+    """Test sync loads the groups and sessions of the device."""
+    await manager.client.insert_multicast_group(1, [1, 2])
+    manager.set_clone_session(5, [(3, 1)], class_of_service=2)
+    await manager.commit()
+
+    other = ReplicationManager(manager.client)
+    await other.sync()
+    assert other.multicast_groups == {1: ((1, 0), (2, 1))}
+    assert other.clone_sessions == {5: CloneSession(((3, 1),), class_of_service=2)}
+    other.set_multicast_group(1, [2, 3])
+    assert other.multicast_groups[1] == ((2, 1), (3, 0))
@@ -0,0 +1,96 @@
+import asyncio
+
+import p4.v1.p4runtime_pb2 as p4r_pb2
+
+from aiop4.scheduler import WritePriority, WriteScheduler
+
+
+async def hold(scheduler, priority, order: list, release: asyncio.Event) -> None:
+    """Hold a slot of a priority until release is set."""
+    async with scheduler.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+
+async def test_priorities_interleave() -> None:
+    """Test CRITICAL bypasses the queue, NORMAL and BULK interleave by weight."""
+    scheduler = WriteScheduler(1, weights={WritePriority.NORMAL: 2})
+    order: list = []
+    release = asyncio.Event()
+    first = asyncio.create_task(hold(scheduler, WritePriority.BULK, order, release))
+    await asyncio.sleep(0)
+
+    sent: list = []
+
+    async def send(priority) -> None:
+        async with scheduler.slot(priority):
+            sent.append(priority)
+
+    tasks = [asyncio.create_task(send(WritePriority.BULK)) for _ in range(3)]
+    tasks += [asyncio.create_task(send(WritePriority.NORMAL)) for _ in range(4)]
+    await asyncio.sleep(0)
+    assert scheduler.qsize() == 7
+    await send(WritePriority.CRITICAL)
+    assert sent == [WritePriority.CRITICAL]
+
+    release.set()
+    await asyncio.gather(first, *tasks)
+    N, B = WritePriority.NORMAL, WritePriority.BULK
+    assert sent[1:] == [N, N, N, B, N, B, B]
+    assert scheduler.in_flight == 0
+    assert scheduler.dispatched == {B: 4, N: 4, WritePriority.CRITICAL: 1}
+
+
+async def test_rate_limit() -> None:
+    """Test max_updates_per_sec delays the WriteRequests of a class."""
+    scheduler = WriteScheduler(
+        max_updates_per_sec={WritePriority.BULK: 1000}, concurrency=10
+    )
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for _ in range(3):
+        async with scheduler.slot(WritePriority.BULK, 20):
+            pass
+    assert loop.time() - started >= 0.035
+    started = loop.time()
+    async with scheduler.slot(WritePriority.NORMAL, 1000):
+        pass
+    assert loop.time() - started < 0.01
+
+
+async def test_cancelled_waiter() -> None:
+    """Test a cancelled waiter doesn't take a slot."""
+    scheduler = WriteScheduler(1)
+    release = asyncio.Event()
+    first = asyncio.create_task(hold(scheduler, WritePriority.BULK, [], release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(scheduler, WritePriority.BULK, [], release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.qsize() == 0
+    release.set()
+    await first
+    assert scheduler.in_flight == 0
+
+
+async def test_client_critical_ahead_of_bulk(client) -> None:
+    """Test a CRITICAL write isn't queued behind a bulk load."""
+    sent: list[int] = []
+
+    async def write(req) -> p4r_pb2.WriteResponse:
+        await asyncio.sleep(0.01)
+        sent.append(len(req.updates))
+        return p4r_pb2.WriteResponse()
+
+    client._stub.Write = write
+    scheduler = client.enable_write_scheduler(1)
+    entities = [p4r_pb2.Entity() for _ in range(10)]
+    bulk = asyncio.create_task(
+        client.write_bulk(entities, max_updates=2, priority=WritePriority.BULK)
+    )
+    await asyncio.sleep(0.005)
+    await client.insert_entity(p4r_pb2.Entity(), priority=WritePriority.CRITICAL)
+    assert len(sent) <= 2
+    assert (await bulk).ok
+    assert scheduler.dispatched[WritePriority.BULK] == 5
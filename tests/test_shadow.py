@@ -0,0 +1,112 @@
+import p4.v1.p4runtime_pb2 as p4r_pb2
+from google.rpc import code_pb2
+
+from aiop4.shadow import ShadowStore, table_entry_key
+
+
+def new_update(op_type: int, mac: bytes, port=b"\x01", table_id=1) -> p4r_pb2.Update:
+    """Build a table entry update."""
+    return p4r_pb2.Update(
+        type=op_type,
+        entity=p4r_pb2.Entity(
+            table_entry=p4r_pb2.TableEntry(
+                table_id=table_id,
+                match=[
+                    p4r_pb2.FieldMatch(
+                        field_id=1, exact=p4r_pb2.FieldMatch.Exact(value=mac)
+                    )
+                ],
+                action=p4r_pb2.TableAction(
+                    action=p4r_pb2.Action(
+                        action_id=2,
+                        params=[p4r_pb2.Action.Param(param_id=1, value=port)],
+                    )
+                ),
+            )
+        ),
+    )
+
+
+def test_table_entry_key() -> None:
+    """Test table_entry_key doesn't depend on the field matches order."""
+    field_matches = [
+        p4r_pb2.FieldMatch(field_id=1, exact=p4r_pb2.FieldMatch.Exact(value=b"a")),
+        p4r_pb2.FieldMatch(field_id=2, exact=p4r_pb2.FieldMatch.Exact(value=b"b")),
+    ]
+    entry = p4r_pb2.TableEntry(table_id=1, match=field_matches)
+    reversed_entry = p4r_pb2.TableEntry(table_id=1, match=field_matches[::-1])
+    assert table_entry_key(entry) == table_entry_key(reversed_entry)
+    entry.priority = 10
+    assert table_entry_key(entry) != table_entry_key(reversed_entry)
+
+
+def test_apply() -> None:
+    """Test apply inserts, modifies and deletes entries."""
+    shadow = ShadowStore()
+    shadow.apply([new_update(p4r_pb2.Update.Type.INSERT, b"\x01")])
+    shadow.apply([new_update(p4r_pb2.Update.Type.MODIFY, b"\x01", b"\x02")])
+    assert len(shadow) == 1
+    entry = next(shadow.table_entries())
+    assert entry.action.action.params[0].value == b"\x02"
+    shadow.apply([new_update(p4r_pb2.Update.Type.DELETE, b"\x01")])
+    assert not len(shadow)
+
+
+def test_apply_errors() -> None:
+    """Test apply skips failed updates."""
+    shadow = ShadowStore()
+    updates = [
+        new_update(p4r_pb2.Update.Type.INSERT, b"\x01"),
+        new_update(p4r_pb2.Update.Type.INSERT, b"\x02"),
+    ]
+    shadow.apply(updates, [p4r_pb2.Error()])
+    assert not len(shadow)
+    errors = [
+        p4r_pb2.Error(canonical_code=code_pb2.ALREADY_EXISTS),
+        p4r_pb2.Error(canonical_code=code_pb2.OK),
+    ]
+    shadow.apply(updates, errors)
+    assert len(shadow) == 1
+    assert next(shadow.table_entries()) == updates[1].entity.table_entry
+
+
+def test_diff() -> None:
+    """Test diff computes the minimal writes."""
+    shadow = ShadowStore()
+    insert = p4r_pb2.Update.Type.INSERT
+    shadow.apply(
+        [
+            new_update(insert, b"\x01"),
+            new_update(insert, b"\x02"),
+            new_update(insert, b"\x03"),
+            new_update(insert, b"\x04", table_id=2),
+        ]
+    )
+    device_entries = [
+        new_update(insert, b"\x01").entity.table_entry,
+        new_update(insert, b"\x02", b"\x09").entity.table_entry,
+        new_update(insert, b"\x05").entity.table_entry,
+    ]
+    diff = shadow.diff(device_entries, table_id=1)
+    assert len(diff) == 3
+    assert diff.modifies[0].table_entry.action.action.params[0].value == b"\x01"
+    assert diff.inserts[0].table_entry.match[0].exact.value == b"\x03"
+    assert diff.deletes[0].table_entry.match[0].exact.value == b"\x05"
+
+    diff = shadow.diff(device_entries)
+    assert len(diff.inserts) == 2
+
+
+def test_diff_canonical_bytestrings() -> None:
+    """Test padded values written match canonical values read back."""
+    shadow = ShadowStore()
+    insert = p4r_pb2.Update.Type.INSERT
+    shadow.apply([new_update(insert, b"\x00\x00\x01", b"\x00\x01")])
+    shadow.apply([new_update(insert, b"\x00\x00", b"\x00\x00")])
+    device_entries = [
+        new_update(insert, b"\x01", b"\x01").entity.table_entry,
+        new_update(insert, b"\x00", b"\x00").entity.table_entry,
+    ]
+    assert not len(shadow.diff(device_entries))
+    device_entries[0].action.action.params[0].value = b"\x02"
+    assert len(shadow.diff(device_entries).modifies) == 1
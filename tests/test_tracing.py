@@ -0,0 +1,59 @@
+import logging
+
+import grpc
+import p4.v1.p4runtime_pb2 as p4r_pb2
+import pytest
+
+from aiop4 import tracing
+from aiop4.tracing import LazyPayload, configure_payload_logging
+
+
+@pytest.fixture(autouse=True)
+def payload_logging():
+    """Restore the default payload logging configuration."""
+    yield
+    configure_payload_logging()
+
+
+def test_lazy_payload() -> None:
+    """Test LazyPayload renders small payloads in full and samples large ones."""
+    small = p4r_pb2.WriteRequest(device_id=1)
+    assert str(LazyPayload(small)) == "device_id: 1"
+
+    configure_payload_logging(max_bytes=8, max_chars=20, sample_every=2)
+    tracing._large_payloads = 0
+    large = p4r_pb2.WriteRequest(device_id=1, updates=[p4r_pb2.Update()] * 10)
+    size = large.ByteSize()
+    sampled, summarized = str(LazyPayload(large)), str(LazyPayload(large))
+    assert sampled.startswith(f"<WriteRequest of {size} bytes> device_id: 1")
+    assert sampled.endswith("...")
+    assert summarized == f"<WriteRequest of {size} bytes>"
+
+
+async def test_write_logging_is_lazy(client, caplog, monkeypatch) -> None:
+    """Test payloads are only rendered if the debug level is enabled."""
+    rendered = []
+    monkeypatch.setattr(LazyPayload, "__str__", lambda self: rendered.append(1) or "")
+    with caplog.at_level(logging.INFO, logger="aiop4.client"):
+        await client.insert_entity(p4r_pb2.Entity())
+    assert not rendered
+    with caplog.at_level(logging.DEBUG, logger="aiop4.client"):
+        await client.insert_entity(p4r_pb2.Entity())
+    assert rendered
+
+
+async def test_trace_hook(client) -> None:
+    """Test the trace hook gets sent and received messages."""
+    traced = []
+    client.set_trace_hook(lambda *args: traced.append(args))
+    await client.insert_entity(p4r_pb2.Entity())
+    client._stream_channel.read.side_effect = [
+        p4r_pb2.StreamMessageResponse(packet=p4r_pb2.PacketIn()),
+        grpc.aio.EOF,
+    ]
+    await client.stream_control()
+    assert [(device, event) for device, event, _ in traced] == [
+        (client.host_device, "Write"),
+        (client.host_device, "StreamChannel.recv"),
+    ]
+    assert isinstance(traced[0][2], p4r_pb2.WriteRequest)
@@ -1,6 +1,14 @@
 from unittest.mock import patch
 
-from aiop4.utils import read_bytes_config, read_p4info_txt
+from aiop4.utils import (
+    pipeline_cookie,
+    read_bytes_config,
+    read_p4info,
+    read_p4info_cached,
+    read_p4info_txt,
+)
+
+from .data import p4info_data
 
 
 @patch("aiop4.utils.Path")
@@ -17,3 +25,37 @@ def test_read_bytes_config(path) -> None:
     """Test read_bytes_config."""
     assert read_bytes_config("some_json_path")
     assert path.call_count == 1
+
+
+def test_read_p4info_cached(tmp_path) -> None:
+    """Test read_p4info_cached loads the binary cache of unchanged files."""
+    p4info_path = tmp_path / "p4info.txt"
+    p4info_path.write_text(p4info_data())
+    cache_dir = tmp_path / "cache"
+    p4info = read_p4info_cached(str(p4info_path), str(cache_dir))
+    assert len(list(cache_dir.iterdir())) == 1
+
+    with patch("aiop4.utils.text_format") as text_format:
+        assert read_p4info_cached(str(p4info_path), str(cache_dir)) == p4info
+        assert read_p4info(str(p4info_path), str(cache_dir)) == p4info
+        assert not text_format.Parse.call_count
+
+    p4info_path.write_text(p4info_data().replace("IngressImpl.smac", "smac"))
+    assert read_p4info_cached(str(p4info_path), str(cache_dir)) != p4info
+    assert len(list(cache_dir.iterdir())) == 2
+
+
+def test_read_p4info_cached_next_to_file(tmp_path) -> None:
+    """Test read_p4info_cached defaults to caching next to the file."""
+    p4info_path = tmp_path / "p4info.txt"
+    p4info_path.write_text(p4info_data())
+    assert read_p4info_cached(str(p4info_path))
+    assert len(list(tmp_path.glob(".p4info.txt.*.bin"))) == 1
+
+
+def test_pipeline_cookie(p4info) -> None:
+    """Test pipeline_cookie is a uint64 content hash."""
+    cookie = pipeline_cookie(p4info, b"{}")
+    assert 0 <= cookie < 2**64
+    assert cookie == pipeline_cookie(p4info, b"{}")
+    assert cookie != pipeline_cookie(p4info, b"{ }")